@@ -1,16 +1,120 @@
 
 import numpy as np
 import sys
-import googlemaps
-import statistics
-import webbrowser
 import json
-from datetime import datetime
-from itertools import permutations
+import heapq
+import time
+import random
+import threading
+import csv
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from datetime import datetime, timedelta
+from itertools import permutations, chain, islice
+from functools import lru_cache, wraps
+from bisect import bisect_right
+from math import factorial
+from collections import deque
+from urllib.parse import urlencode
+
+
+class Instrumentation:
+    '''
+    Opt-in call counts, wall times, and work counters (such as permutations evaluated and nearest neighbor queries) for the hot paths of
+    downloading travel times and planning routes. Nothing is recorded until enable() is called, and while it is disabled each instrumented
+    function only checks Instrumentation.enabled. Wall times are inclusive, so the time of single_payload_and_dist() includes the time of the
+    optimizers that it calls. Work done in the worker processes of a RoutePool is not recorded.
+    '''
+
+    enabled = False
+    __lock = threading.Lock()
+    __calls = {}
+    __seconds = {}
+    __counters = {}
+
+    @staticmethod
+    def enable(reset: bool = True) -> None:
+        '''Starts recording. If reset is True, then everything recorded earlier is discarded first.'''
+        if reset:
+            Instrumentation.reset()
+        Instrumentation.enabled = True
+
+    @staticmethod
+    def disable() -> None:
+        '''Stops recording. Everything recorded so far is kept until reset() is called.'''
+        Instrumentation.enabled = False
+
+    @staticmethod
+    def reset() -> None:
+        '''Discards everything recorded so far.'''
+        with Instrumentation.__lock:
+            Instrumentation.__calls.clear()
+            Instrumentation.__seconds.clear()
+            Instrumentation.__counters.clear()
+
+    @staticmethod
+    def count(name: str, n: int = 1) -> None:
+        '''Adds n to the counter called name. Callers on hot paths should check Instrumentation.enabled first.'''
+        if Instrumentation.enabled:
+            with Instrumentation.__lock:
+                Instrumentation.__counters[name] = Instrumentation.__counters.get(name, 0) + int(n)
+
+    @staticmethod
+    def record(name: str, seconds: float) -> None:
+        '''Records one call of the function called name that took seconds of wall time.'''
+        with Instrumentation.__lock:
+            Instrumentation.__calls[name] = Instrumentation.__calls.get(name, 0) + 1
+            Instrumentation.__seconds[name] = Instrumentation.__seconds.get(name, 0.0) + seconds
+
+    @staticmethod
+    def timed(name: str):
+        '''A decorator that records the number of calls and the wall time of a function under name while instrumentation is enabled.'''
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not Instrumentation.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    Instrumentation.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def report() -> dict:
+        '''
+        Returns everything recorded so far.
+
+        Returns
+        -------
+        dict
+            A dict with a \'Timings\' dict, which maps each function name to its \'Calls\', \'Total Seconds\', and \'Average Seconds\',
+            and a \'Counters\' dict, which maps each counter name to its value.
+        '''
+        with Instrumentation.__lock:
+            timings = {name: {'Calls': calls, 'Total Seconds': Instrumentation.__seconds[name], 'Average Seconds': Instrumentation.__seconds[name] / calls}
+                       for name, calls in Instrumentation.__calls.items()}
+            return {'Timings': dict(sorted(timings.items(), key=lambda t: -t[1]['Total Seconds'])), 'Counters': dict(sorted(Instrumentation.__counters.items()))}
+
+    @staticmethod
+    def print_report(file=sys.stderr) -> None:
+        '''Prints the report() as a table.'''
+        report = Instrumentation.report()
+        print(f'{"Function":<50}{"Calls":>12}{"Total Seconds":>16}{"Average Seconds":>18}', file=file)
+        for name, timing in report['Timings'].items():
+            print(f'{name:<50}{timing["Calls"]:>12}{timing["Total Seconds"]:>16.4f}{timing["Average Seconds"]:>18.6f}', file=file)
+        print(f'{"Counter":<50}{"Value":>12}', file=file)
+        for name, value in report['Counters'].items():
+            print(f'{name:<50}{value:>12}', file=file)
 
 
 class Location:
 
+    __slots__ = ('name', 'address')
+
     def __init__(self, name: str, address: str):
         self.name = name
         self.address = address
@@ -25,14 +129,30 @@ class Location:
         return not self.__eq__(other)
 
     def __str__(self) -> str:
-        return str(vars(self))
+        return str(self.json())
 
     def __repr__(self) -> str:
         return self.__str__()
 
+    def json(self) -> dict:
+        return {field: getattr(self, field) for cls in reversed(type(self).__mro__) for field in getattr(cls, '__slots__', ())}
+
+    @staticmethod
+    def build(json_data: dict):
+        '''Builds an instance of a Location, DeliveryLocation, or DistributionCenter object from a dict object.'''
+        if json_data.__contains__('name') and json_data.__contains__('address'):
+            if json_data.__contains__('packages'):
+                return DeliveryLocation(json_data['name'], json_data['address'], json_data['packages'])
+            if json_data.__contains__('inventory'):
+                return DistributionCenter(json_data['name'], json_data['address'], json_data['inventory'])
+            return Location(json_data['name'], json_data['address'])
+        return None
+
 
 class DeliveryLocation(Location):
 
+    __slots__ = ('packages',)
+
     def __init__(self, name: str, address: str, packages: int | str = 0):
         super().__init__(name, address)
         self.packages = int(packages)
@@ -40,11 +160,236 @@ class DeliveryLocation(Location):
 
 class DistributionCenter(Location):
 
+    __slots__ = ('inventory',)
+
     def __init__(self, name: str, address: str, inventory: int | str = 0):
         super().__init__(name, address)
         self.inventory = int(inventory)
 
 
+class LocationStore:
+    '''
+    A columnar store of locations, where the integer id of each location is its position in the store (and its row and column in a
+    TravelMatrix). The type, packages, and inventory of every location are held in numpy arrays, so package sums and min/max filters
+    are single vectorized operations, and only the names and addresses are kept as Python strings. Location, DeliveryLocation, and
+    DistributionCenter objects are created on demand as lightweight records for the public API, and changing them does not change the store.
+    Delivery time windows are also held in the store (see set_time_windows()), since the records do not have them.
+    '''
+
+    # the type of each location, as stored in kinds()
+    LOCATION, DELIVERY_LOCATION, DISTRIBUTION_CENTER = 0, 1, 2
+
+    # the closing time of a location that does not have a time window
+    ALWAYS_OPEN = np.iinfo(np.int64).max // 4
+
+    def __init__(self, locations=()):
+        '''
+        Parameters
+        ----------
+        locations: Iterable[Location] = ()
+            The locations to add to the store, in id order. No two locations may have the same address.
+        '''
+        self.__names, self.__addresses, self.__ids = [], [], {}
+        self.__kinds = np.zeros(0, dtype=np.int8)
+        self.__packages = np.zeros(0, dtype=np.int64)
+        self.__inventory = np.zeros(0, dtype=np.int64)
+        self.__opens = np.zeros(0, dtype=np.int64)
+        self.__closes = np.zeros(0, dtype=np.int64)
+        self.__windowed = False
+        for location in locations:
+            self.add(location)
+
+    def __len__(self) -> int:
+        return len(self.__addresses)
+
+    def __contains__(self, location) -> bool:
+        return (location.address if isinstance(location, Location) else location) in self.__ids
+
+    def __getitem__(self, index: int) -> Location:
+        '''Returns a new Location, DeliveryLocation, or DistributionCenter object for the location whose id is index.'''
+        i = range(len(self))[index]
+        kind = self.__kinds[i]
+        if kind == LocationStore.DELIVERY_LOCATION:
+            return DeliveryLocation(self.__names[i], self.__addresses[i], self.__packages[i])
+        if kind == LocationStore.DISTRIBUTION_CENTER:
+            return DistributionCenter(self.__names[i], self.__addresses[i], self.__inventory[i])
+        return Location(self.__names[i], self.__addresses[i])
+
+    def __getstate__(self) -> dict:
+        n = len(self)
+        return {'names': self.__names, 'addresses': self.__addresses, 'kinds': self.__kinds[:n], 'packages': self.__packages[:n], 'inventory': self.__inventory[:n],
+                'opens': self.__opens[:n], 'closes': self.__closes[:n]}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__names, self.__addresses = state['names'], state['addresses']
+        self.__ids = {address: i for i, address in enumerate(self.__addresses)}
+        self.__kinds, self.__packages, self.__inventory = state['kinds'], state['packages'], state['inventory']
+        self.__opens, self.__closes = state['opens'], state['closes']
+        self.__windowed = bool(np.any(self.__opens > 0) or np.any(self.__closes < LocationStore.ALWAYS_OPEN))
+
+    def __reserve(self, n: int) -> None:
+        '''Grows the arrays (by at least doubling them) so that they can hold n locations.'''
+        if n > self.__kinds.size:
+            size = max(n, 2 * self.__kinds.size, 16)
+            self.__kinds = np.concatenate([self.__kinds, np.zeros(size - self.__kinds.size, dtype=self.__kinds.dtype)])
+            self.__packages = np.concatenate([self.__packages, np.zeros(size - self.__packages.size, dtype=self.__packages.dtype)])
+            self.__inventory = np.concatenate([self.__inventory, np.zeros(size - self.__inventory.size, dtype=self.__inventory.dtype)])
+            self.__opens = np.concatenate([self.__opens, np.zeros(size - self.__opens.size, dtype=self.__opens.dtype)])
+            self.__closes = np.concatenate([self.__closes, np.full(size - self.__closes.size, LocationStore.ALWAYS_OPEN, dtype=self.__closes.dtype)])
+
+    def add(self, location: Location) -> int:
+        '''Adds a copy of location to the store and returns its id. Raises a ValueError if the store already has a location with the same address.'''
+        if not isinstance(location, Location):
+            raise TypeError('location must be a Location type.')
+        if location.address in self.__ids:
+            raise ValueError('locations must not contain more than one location with the same address.')
+        i = len(self)
+        self.__reserve(i + 1)
+        if isinstance(location, DeliveryLocation):
+            self.__kinds[i], self.__packages[i] = LocationStore.DELIVERY_LOCATION, location.packages
+        elif isinstance(location, DistributionCenter):
+            self.__kinds[i], self.__inventory[i] = LocationStore.DISTRIBUTION_CENTER, location.inventory
+        self.__ids[location.address] = i
+        self.__names.append(location.name)
+        self.__addresses.append(location.address)
+        return i
+
+    def add_packages(self, indexes, packages) -> None:
+        '''
+        Adds packages to the delivery locations whose ids are indexes, such as when a customer places more than one order. indexes and packages
+        may be single values or arrays of the same length, and an id may appear more than once.
+        '''
+        indexes = np.atleast_1d(np.asarray(indexes, dtype=np.intp))
+        if indexes.size and (indexes.min() < 0 or indexes.max() >= len(self)):
+            raise IndexError('indexes contains an id that is not in the store.')
+        if np.any(self.__kinds[indexes] != LocationStore.DELIVERY_LOCATION):
+            raise ValueError('packages can only be added to a delivery location.')
+        np.add.at(self.__packages, indexes, packages)
+
+    def set_packages(self, indexes, packages) -> None:
+        '''Replaces the packages of the delivery locations whose ids are indexes, such as when an order is cancelled (zero packages).'''
+        indexes = np.atleast_1d(np.asarray(indexes, dtype=np.intp))
+        if indexes.size and (indexes.min() < 0 or indexes.max() >= len(self)):
+            raise IndexError('indexes contains an id that is not in the store.')
+        if np.any(self.__kinds[indexes] != LocationStore.DELIVERY_LOCATION):
+            raise ValueError('packages can only be set for a delivery location.')
+        if np.any(np.asarray(packages) < 0):
+            raise ValueError('packages must not be negative.')
+        self.__packages[indexes] = packages
+
+    def copy(self):
+        '''Returns a new LocationStore with its own copy of every location, so that changing one store does not change the other.'''
+        copy = LocationStore()
+        copy.__setstate__({key: (value.copy() if isinstance(value, np.ndarray) else list(value)) for key, value in self.__getstate__().items()})
+        return copy
+
+    def set_time_windows(self, indexes, opens, closes) -> None:
+        '''
+        Sets the delivery time windows of the locations whose ids are indexes. opens and closes are the earliest and latest times (in seconds
+        after midnight of the day the routes start) that a delivery may begin, and may be single values or arrays of the same length as indexes.
+        A truck that arrives early waits until the window opens. Use ALWAYS_OPEN as the closing time of a window that never closes.
+        '''
+        indexes = np.atleast_1d(np.asarray(indexes, dtype=np.intp))
+        opens, closes = np.broadcast_to(np.asarray(opens, dtype=np.int64), indexes.shape), np.broadcast_to(np.asarray(closes, dtype=np.int64), indexes.shape)
+        if indexes.size and (indexes.min() < 0 or indexes.max() >= len(self)):
+            raise IndexError('indexes contains an id that is not in the store.')
+        if np.any(opens < 0) or np.any(opens > closes):
+            raise ValueError('Every time window must open at or after midnight, and before it closes.')
+        self.__opens[indexes], self.__closes[indexes] = opens, closes
+        self.__windowed = bool(np.any(self.__opens[:len(self)] > 0) or np.any(self.__closes[:len(self)] < LocationStore.ALWAYS_OPEN))
+
+    def copy_time_windows(self, other) -> None:
+        '''Copies the time window of every location in other (another LocationStore) to the location in this store with the same address, if there is one.'''
+        opens, closes = other.time_windows()
+        found = [(self.__ids[address], i) for i, address in enumerate(other.addresses()) if address in self.__ids]
+        if found:
+            ids, others = np.array(found, dtype=np.intp).T
+            self.set_time_windows(ids, opens[others], closes[others])
+
+    def time_windows(self) -> tuple[np.ndarray, np.ndarray]:
+        '''Returns read-only arrays of the opening and closing time of every location's time window, in id order.'''
+        return LocationStore.__view(self.__opens[:len(self)]), LocationStore.__view(self.__closes[:len(self)])
+
+    def has_time_windows(self) -> bool:
+        '''Returns true if any location has a time window that does not span the whole schedule.'''
+        return self.__windowed
+
+    def id(self, location) -> int:
+        '''Returns the id of location, which may be a Location object or an address. Raises a KeyError if it is not in the store.'''
+        return self.__ids[location.address if isinstance(location, Location) else location]
+
+    def records(self) -> list[Location]:
+        '''Returns a new Location object for every location in the store, in id order.'''
+        return [self[i] for i in range(len(self))]
+
+    def names(self) -> list[str]:
+        '''Returns the name of every location, in id order.'''
+        return list(self.__names)
+
+    def addresses(self) -> list[str]:
+        '''Returns the address of every location, in id order.'''
+        return list(self.__addresses)
+
+    def kinds(self) -> np.ndarray:
+        '''Returns a read-only array of the type (LOCATION, DELIVERY_LOCATION, or DISTRIBUTION_CENTER) of every location, in id order.'''
+        return LocationStore.__view(self.__kinds[:len(self)])
+
+    def packages(self) -> np.ndarray:
+        '''Returns a read-only array of the packages of every location (zero for locations that are not delivery locations), in id order.'''
+        return LocationStore.__view(self.__packages[:len(self)])
+
+    def inventory(self) -> np.ndarray:
+        '''Returns a read-only array of the inventory of every location (zero for locations that are not distribution centers), in id order.'''
+        return LocationStore.__view(self.__inventory[:len(self)])
+
+    def count(self, location_type: type = None) -> int:
+        '''Returns the number of locations that are instances of location_type, or the number of all locations if location_type is None.'''
+        if location_type is None or location_type is Location:
+            return len(self)
+        if location_type is DeliveryLocation:
+            return int(np.count_nonzero(self.kinds() == LocationStore.DELIVERY_LOCATION))
+        if location_type is DistributionCenter:
+            return int(np.count_nonzero(self.kinds() == LocationStore.DISTRIBUTION_CENTER))
+        return sum(1 for loc in self.records() if isinstance(loc, location_type))
+
+    @staticmethod
+    def __view(array: np.ndarray) -> np.ndarray:
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+
+class Vehicle:
+    '''A type of delivery vehicle in a fleet, such as a box truck or a van.'''
+
+    def __init__(self, name: str, capacity: int | str, count: int | str | None = None):
+        '''
+        Parameters
+        ----------
+        name: str
+            The name (or description) of the vehicle type.
+
+        capacity: int | str
+            The maximum number of packages that a vehicle of this type can hold.
+
+        count: int | str | None = None
+            The number of routes that vehicles of this type can run. If None, then the number of routes is unlimited.
+        '''
+        self.name = name
+        self.capacity = int(capacity)
+        self.count = None if count is None else int(count)
+        if self.capacity < 1:
+            raise ValueError('capacity must be at least one.')
+        if self.count is not None and self.count < 0:
+            raise ValueError('count must not be negative.')
+
+    def __str__(self) -> str:
+        return str(vars(self))
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
 class Trip:
     '''A class that represents the travel time from an origin to a destination. It also models an edge in a TravelMatrix object.'''
 
@@ -65,7 +410,7 @@ class Trip:
         self.destination = destination
 
     def __hash__(self) -> int:
-        return hash(str(self.origin) + str(self.destination))
+        return hash((self.origin, self.destination))
 
     def __eq__(self, other) -> bool:
         return isinstance(other, Trip) and self.origin == other.origin and self.destination == other.destination and self.travelTime == other.travelTime
@@ -79,42 +424,209 @@ class Trip:
     def __repr__(self) -> str:
         return self.__str__()
 
-    def json(self) -> str:
-        j = vars(self)
-        j['origin'] = vars(j['origin'])
-        j['destination'] = vars(j['destination'])
-        return vars(self)
+    def json(self) -> dict:
+        return {'travelTime': self.travelTime, 'origin': self.origin.json(), 'destination': self.destination.json()}
 
     @staticmethod
     def build(json_data: dict):
         '''Builds an instance of a Trip object from a dict object.'''
+        return Trip(Location.build(json_data['origin']), Location.build(json_data['destination']), json_data['travelTime'])
 
-        def build_location(jd: dict):
-            if jd.__contains__('name') and jd.__contains__('address'):
-                if jd.__contains__('packages'):
-                    return DeliveryLocation(jd['name'], jd['address'], jd['packages'])
-                if jd.__contains__('inventory'):
-                    return DistributionCenter(jd['name'], jd['address'], jd['inventory'])
-                return Location(jd['name'], jd['address'])
-            return None
 
-        return Trip(build_location(json_data['origin']), build_location(json_data['destination']), json_data['travelTime'])
+# the number of seconds in a day, after which the layers of a time-dependent TravelMatrix repeat
+SECONDS_PER_DAY = 24 * 3600
+
+
+def seconds_of_day(time_of_day: datetime | str | int) -> int:
+    '''Returns the number of seconds after midnight of a datetime, of a time of day written as "HH:MM" or "HH:MM:SS", or of a number of seconds (which is returned as is).'''
+    if isinstance(time_of_day, datetime):
+        return time_of_day.hour * 3600 + time_of_day.minute * 60 + time_of_day.second
+    if isinstance(time_of_day, str):
+        parts = time_of_day.strip().split(':')
+        if not 2 <= len(parts) <= 3 or not all(part.isdigit() for part in parts):
+            raise ValueError(f'"{time_of_day}" is not a time of day in HH:MM or HH:MM:SS format.')
+        hours, minutes, seconds = (int(part) for part in (parts + ['0'])[:3])
+        if hours > 23 or minutes > 59 or seconds > 59:
+            raise ValueError(f'"{time_of_day}" is not a time of day in HH:MM or HH:MM:SS format.')
+        return hours * 3600 + minutes * 60 + seconds
+    return int(time_of_day)
+
+
+# the mean radius of the earth in meters
+EARTH_RADIUS = 6371008.8
+
+
+def haversine_distances(origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+    '''
+    Returns the great circle distances in meters between origins and destinations, which are arrays of (latitude, longitude) pairs
+    in degrees whose last dimension has a length of two. The other dimensions are broadcast together.
+    '''
+    origins, destinations = np.radians(origins), np.radians(destinations)
+    lat1, lng1, lat2, lng2 = origins[..., 0], origins[..., 1], destinations[..., 0], destinations[..., 1]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+
+class SparseTravelTimes:
+    '''
+    A read-only, square array of travel times that only stores some pairs of locations, such as the travel times from each location to its
+    nearest neighbors and to and from each distribution center. The travel time of any other pair is estimated from the straight line
+    (haversine) distance between the two locations times a speed factor in seconds per meter, plus a fixed number of seconds. Indexing with an (origins, destinations)
+    tuple of indexes or index arrays, including np.ix_(), works like indexing a np.ndarray, so a TravelMatrix (and a RoutePlanner) can use
+    it in place of a dense array. The stored pairs are kept as a sorted array of keys and looked up with a vectorized binary search.
+    '''
+
+    # the speed factor used when there are not enough stored pairs to fit one to: about 10 m/s on the road, or 8 m/s in a straight line
+    DEFAULT_SECONDS_PER_METER = 0.125
+
+    def __init__(self, coordinates: np.ndarray, origins, destinations, travel_times, seconds_per_meter: float = None, offset: float = 0.0):
+        '''
+        Parameters
+        ----------
+        coordinates: np.ndarray
+            An n x 2 array of the (latitude, longitude) of each location in degrees, where n is the number of locations.
+
+        origins, destinations, travel_times
+            Arrays of the same length containing the stored pairs, so that travel_times[i] is the travel time from origins[i] to
+            destinations[i]. If a pair appears more than once, then the first travel time is kept.
+
+        seconds_per_meter: float = None
+            The speed factor used to estimate the travel times that are not stored. If None, then it and offset are fitted to the
+            stored pairs (see calibrate()).
+
+        offset: float = 0.0
+            The number of seconds added to every estimated travel time, such as the time to park. Ignored if seconds_per_meter is None.
+        '''
+        coordinates = np.asarray(coordinates, dtype=float)
+        if coordinates.ndim != 2 or coordinates.shape[1] != 2:
+            raise ValueError('coordinates must be an n x 2 array of (latitude, longitude) pairs.')
+        n = coordinates.shape[0]
+        origins, destinations = np.asarray(origins, dtype=np.int64).ravel(), np.asarray(destinations, dtype=np.int64).ravel()
+        travel_times = np.asarray(travel_times, dtype=np.int64).ravel()
+        if not origins.size == destinations.size == travel_times.size:
+            raise ValueError('origins, destinations, and travel_times must have the same length.')
+        if origins.size and (min(origins.min(), destinations.min()) < 0 or max(origins.max(), destinations.max()) >= n):
+            raise ValueError('origins and destinations must be valid indexes in coordinates.')
+        keys = origins * n + destinations
+        order = np.argsort(keys, kind='stable')
+        keys, travel_times = keys[order], travel_times[order]
+        first = np.ones(keys.size, dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        self.__coordinates = coordinates
+        self.__keys, self.__values = keys[first], travel_times[first]
+        self.shape = (n, n)
+        self.ndim = 2
+        self.dtype = np.dtype(np.int64)
+        self.seconds_per_meter, self.offset = self.calibrate() if seconds_per_meter is None else (float(seconds_per_meter), float(offset))
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    @property
+    def nnz(self) -> int:
+        '''The number of stored pairs.'''
+        return self.__keys.size
+
+    @property
+    def nbytes(self) -> int:
+        '''The number of bytes used by the stored pairs and the coordinates.'''
+        return self.__keys.nbytes + self.__values.nbytes + self.__coordinates.nbytes
+
+    def coordinates(self) -> np.ndarray:
+        '''Returns a read-only view of the (latitude, longitude) of each location.'''
+        view = self.__coordinates.view()
+        view.flags.writeable = False
+        return view
+
+    def pairs(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''Returns the origins, destinations, and travel times of the stored pairs, sorted by origin and then destination.'''
+        n = self.shape[0]
+        return self.__keys // n, self.__keys % n, self.__values.copy()
+
+    def calibrate(self) -> tuple[float, float]:
+        '''
+        Returns the seconds per meter and the offset (in seconds) that best fit the stored travel times to the straight line distances
+        by least squares. Both are kept non-negative, and DEFAULT_SECONDS_PER_METER is returned if the distances are all about the same.
+        '''
+        origins, destinations, travel_times = self.pairs()
+        distances = haversine_distances(self.__coordinates[origins], self.__coordinates[destinations])
+        if distances.size < 2 or np.ptp(distances) < 100:
+            return SparseTravelTimes.DEFAULT_SECONDS_PER_METER, 0.0
+        seconds_per_meter, offset = np.polyfit(distances, travel_times, 1)
+        if seconds_per_meter <= 0:
+            return float(np.sum(travel_times) / np.sum(distances)) if np.sum(distances) > 0 else SparseTravelTimes.DEFAULT_SECONDS_PER_METER, 0.0
+        if offset < 0:
+            return float(np.dot(distances, travel_times) / np.dot(distances, distances)), 0.0
+        return float(seconds_per_meter), float(offset)
+
+    def estimate(self, origins, destinations) -> np.ndarray:
+        '''Returns the estimated travel times from origins to destinations, which are broadcast together, whether or not they are stored.'''
+        origins, destinations = np.broadcast_arrays(np.asarray(origins, dtype=np.intp), np.asarray(destinations, dtype=np.intp))
+        travel_times = np.rint(haversine_distances(self.__coordinates[origins], self.__coordinates[destinations]) * self.seconds_per_meter + self.offset).astype(np.int64)
+        travel_times[origins == destinations] = 0
+        return travel_times
+
+    def is_stored(self, origins, destinations) -> np.ndarray:
+        '''Returns a boolean array that is True for each (broadcast) pair of origins and destinations whose travel time is stored.'''
+        return self.__find(origins, destinations)[2]
+
+    def __find(self, origins, destinations) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        '''Returns the broadcast origins and destinations, whether each pair is stored, and the position of its key if it is.'''
+        origins, destinations = np.broadcast_arrays(np.asarray(origins, dtype=np.intp), np.asarray(destinations, dtype=np.intp))
+        n = self.shape[0]
+        if origins.size and (min(origins.min(), destinations.min()) < 0 or max(origins.max(), destinations.max()) >= n):
+            raise IndexError(f'index out of bounds for a travel matrix with {n} locations.')
+        keys = origins.astype(np.int64) * n + destinations
+        at = np.minimum(np.searchsorted(self.__keys, keys), max(0, self.__keys.size - 1))
+        found = self.__keys[at] == keys if self.__keys.size else np.zeros(keys.shape, dtype=bool)
+        return origins, destinations, found, at
+
+    def __getitem__(self, key) -> np.ndarray:
+        if not isinstance(key, tuple) or len(key) != 2:
+            raise IndexError('a SparseTravelTimes object must be indexed with an (origins, destinations) tuple.')
+        origins, destinations, found, at = self.__find(*key)
+        travel_times = np.empty(found.shape, dtype=np.int64)
+        travel_times[found] = self.__values[at[found]]
+        travel_times[~found] = self.estimate(origins[~found], destinations[~found])
+        return travel_times[()] if travel_times.ndim == 0 else travel_times
 
 
 class TravelMatrix:
-    '''An implementation of a directed, weighed adjacency matrix.'''
+    '''
+    An implementation of a directed, weighed adjacency matrix. The travel times may depend on the time of day, in which case the matrix
+    holds one layer of travel times per departure-time bucket, and the methods that take a clock pick the layer that each trip starts in.
+    All the other methods use the layer that contains the departure time (see set_departure_time()).
+    '''
 
-    def __init__(self, trips: set[Trip]):
+    @Instrumentation.timed('TravelMatrix.__init__')
+    def __init__(self, trips: set[Trip] = None, locations: list[Location] = None, matrix: np.ndarray = None, layer_times: list[int] = None):
         '''
         Constructs and returns an instance of a TravelMatrix object, which is an implementation
         of a directed, weighed adjacency matrix.
 
         Parameters
         ----------
-        trips: set[Trip]
+        trips: set[Trip] = None
             A set of Trip objects representing the edges in directed, weighed adjacency matrix.
+
+        locations: list[Location] | LocationStore = None
+            Only used when trips is None. A list of Location objects (or a LocationStore), where the index of each location is its row and column in matrix.
+
+        matrix: np.ndarray | SparseTravelTimes = None
+            Only used when trips is None. A square, 2-D array of travel times, where matrix[x][y] is the travel time from locations[x] to locations[y],
+            or a SparseTravelTimes object that stores only some of them. It may also be a 3-D array, where matrix[k] is the square array of the
+            travel times of trips that start at or after layer_times[k] and before the next layer.
+
+        layer_times: list[int] = None
+            Only used when matrix is a 3-D array. The time of day (in seconds after midnight, in increasing order) at which each layer of matrix
+            starts. Trips that start before the first layer use the last one, since the layers repeat every day.
         '''
 
+        self.__departure_time, self.__unload_time = 0, 0
+        if trips is None:
+            self.__init_from_array(locations, matrix, layer_times)
+            return
+
         if not isinstance(trips, set):
             raise TypeError('trips must be a set type.')
 
@@ -126,86 +638,401 @@ class TravelMatrix:
             locations.add(t.origin)
             locations.add(t.destination)
 
-        # initialize the arrays of starting points and destinations
-        self.__locations = np.array(list(locations), dtype=Location)
+        # initialize the columnar store of locations, which also maps each address to its index
+        self.__store = LocationStore(locations)
 
         # initialize the adjacency matrix of travel times with zeros
-        self.__matrix = np.zeros((self.__locations.size, self.__locations.size), dtype=int)
+        self.__matrix = np.zeros((len(self.__store), len(self.__store)), dtype=int)
+
+        # fill the matrix with a single vectorized write instead of one assignment per trip
+        x = np.fromiter((self.__store.id(t.origin) for t in trips), dtype=np.intp, count=len(trips))
+        y = np.fromiter((self.__store.id(t.destination) for t in trips), dtype=np.intp, count=len(trips))
+        self.__matrix[x, y] = np.fromiter((t.travelTime for t in trips), dtype=int, count=len(trips))
+        self.__layers, self.__layer_times, self.__layer_of = self.__matrix[None], np.zeros(1, dtype=np.int64), None
+
+    def __init_from_array(self, locations: list[Location] | LocationStore, matrix: np.ndarray | SparseTravelTimes, layer_times: list[int] = None) -> None:
+        '''Initializes the travel matrix from a list (or store) of locations and a square (or layered) array of travel times without creating any Trip objects.'''
+        if isinstance(locations, list):
+            locations = LocationStore(locations)
+        elif not isinstance(locations, LocationStore):
+            raise TypeError('locations must be a list[Location] or a LocationStore type.')
+        if not isinstance(matrix, SparseTravelTimes):
+            matrix = np.asarray(matrix)
+        if matrix.ndim == 3 and isinstance(matrix, np.ndarray):
+            layers = matrix
+            if layer_times is None or len(layer_times) != layers.shape[0]:
+                raise ValueError('layer_times must contain the time of day at which each layer of a 3-D matrix starts.')
+            layer_times = np.array([seconds_of_day(t) for t in layer_times], dtype=np.int64)
+            if layer_times.size == 0 or layer_times.min() < 0 or layer_times.max() >= SECONDS_PER_DAY or np.any(np.diff(layer_times) <= 0):
+                raise ValueError('layer_times must be increasing times of day between midnight and the end of the day.')
+            matrix = layers[0]
+        elif layer_times is not None and len(layer_times) > 1:
+            raise ValueError('layer_times can only be used with a 3-D matrix.')
+        else:
+            layers, layer_times = (None if isinstance(matrix, SparseTravelTimes) else matrix[None]), np.zeros(1, dtype=np.int64)
+        if matrix.shape != (len(locations), len(locations)):
+            raise ValueError(f'matrix must be a square array with one row and one column per location, not an array with shape {matrix.shape}.')
+        if not np.issubdtype(matrix.dtype, np.integer):
+            raise TypeError(f'matrix must be an array of integers, not {matrix.dtype}.')
+        self.__store = locations
+        self.__matrix = matrix
+        self.__layers, self.__layer_times = layers, layer_times
+        # the layer of each second of the day, so that picking the layers of many trips is a single gather instead of a binary search
+        self.__layer_of = ((np.searchsorted(layer_times, np.arange(SECONDS_PER_DAY), side='right') - 1) % layer_times.size).astype(np.int16) if layer_times.size > 1 else None
+
+    @classmethod
+    def from_array(cls, locations: list[Location] | LocationStore, matrix: np.ndarray | SparseTravelTimes, layer_times: list[int] = None):
+        '''
+        Constructs a travel matrix (or an instance of a subclass, such as a RoutePlanner) directly from an array of travel times.
 
-        # initialize a dict to map customers to their array index
-        index = {self.__locations[i]: i for i in range(self.__locations.size)}
+        Parameters
+        ----------
+        locations: list[Location] | LocationStore
+            A list of Location objects (or a LocationStore), where the index of each location is its row and column in matrix.
+            A LocationStore is used as is (not copied).
 
-        for t in trips:
-            x = index[t.origin]
-            y = index[t.destination]
-            self.__matrix[x][y] = t.travelTime
+        matrix: np.ndarray
+            A square, 2-D array of integer travel times, where matrix[x][y] is the travel time from locations[x] to locations[y].
+            The array is used as is (not copied), so a np.memmap stays memory-mapped. A SparseTravelTimes object may be used instead.
+            A 3-D array holds one layer of travel times per departure-time bucket (see TravelMatrix.__init__()).
+
+        layer_times: list[int] = None
+            The time of day (in seconds after midnight, or as "HH:MM") at which each layer of a 3-D matrix starts.
+        '''
+        return cls(locations=locations, matrix=matrix, layer_times=layer_times)
+
+    @classmethod
+    def from_triples(cls, locations: list[Location] | LocationStore, triples, chunk_size: int = 65536):
+        '''
+        Constructs a travel matrix (or an instance of a subclass, such as a RoutePlanner) from a stream of (origin, destination, travel time)
+        triples, where origin and destination are indexes in locations. The triples are consumed in chunks, and each chunk is written
+        into the matrix with a single vectorized assignment. Pairs that do not appear in triples have a travel time of zero.
+
+        Parameters
+        ----------
+        locations: list[Location] | LocationStore
+            A list of Location objects (or a LocationStore), where the index of each location is its row and column in the matrix.
+
+        triples: Iterable[tuple[int, int, int]]
+            An iterable of (origin, destination, travel time) tuples.
+
+        chunk_size: int = 65536
+            The number of triples to consume at a time.
+        '''
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least one.')
+        n = len(locations)
+        matrix = np.zeros((n, n), dtype=int)
+        triples = iter(triples)
+        while True:
+            chunk = np.fromiter(chain.from_iterable(islice(triples, chunk_size)), dtype=np.int64).reshape(-1, 3)
+            if chunk.shape[0] == 0:
+                break
+            if chunk[:, :2].min() < 0 or chunk[:, :2].max() >= n:
+                raise ValueError('triples contains an origin or destination that is not a valid index in locations.')
+            matrix[chunk[:, 0], chunk[:, 1]] = chunk[:, 2]
+        return cls.from_array(locations, matrix)
+
+    def locations(self) -> list[Location]:
+        '''Returns a list of all Location objects in the travel matrix, in index order.'''
+        return self.__store.records()
+
+    def location_store(self) -> LocationStore:
+        '''Returns the columnar store of the locations in the travel matrix, where the id of each location is its index.'''
+        return self.__store
+
+    def copy(self):
+        '''
+        Returns a new travel matrix (an instance of the same class) with its own copy of the locations, so that packages and time windows can be
+        changed without changing this one. The travel times are shared rather than copied, since they are never changed.
+        '''
+        layered = self.__layer_times.size > 1
+        copy = type(self).from_array(self.__store.copy(), self.__layers if layered else self.__matrix, self.__layer_times.tolist() if layered else None)
+        copy.set_departure_time(self.__departure_time, self.__unload_time)
+        return copy
+
+    def array(self) -> np.ndarray:
+        '''Returns a read-only view of the square array of travel times (of the departure time's layer). Raises a TypeError if the travel matrix is sparse.'''
+        if self.is_sparse():
+            raise TypeError('A sparse travel matrix does not have a dense array of travel times.')
+        view = self.__matrix.view()
+        view.flags.writeable = False
+        return view
+
+    def layered_array(self) -> np.ndarray:
+        '''Returns a read-only view of the 3-D array of the travel times in every layer, which has a single layer if the travel times do not depend on the time of day.'''
+        if self.is_sparse():
+            raise TypeError('A sparse travel matrix does not have a dense array of travel times.')
+        view = self.__layers.view()
+        view.flags.writeable = False
+        return view
+
+    def layer_count(self) -> int:
+        '''Returns the number of departure-time buckets, each with its own layer of travel times.'''
+        return self.__layer_times.size
+
+    def layer_times(self) -> np.ndarray:
+        '''Returns a read-only array of the time of day (in seconds after midnight) at which each layer starts.'''
+        view = self.__layer_times.view()
+        view.flags.writeable = False
+        return view
+
+    def layer(self, clock) -> np.ndarray:
+        '''Returns the layer in which a trip starting at each of clock (in seconds after midnight of the day the routes start, which may be past midnight) is taken.'''
+        if self.__layer_of is None:
+            return np.zeros(np.shape(clock), dtype=np.intp)
+        return self.__layer_of[np.asarray(clock) % SECONDS_PER_DAY]
+
+    def set_departure_time(self, departure_time: datetime | str | int = 0, avg_unload_time: int = 0) -> None:
+        '''
+        Sets the time of day at which the delivery routes start, and the average time it takes to unload a package, which together drive the
+        clock of every route (see route_schedules()). The layer that contains departure_time becomes the one used by the methods that do not take a clock.
+        '''
+        departure_time = seconds_of_day(departure_time)
+        if not 0 <= departure_time < SECONDS_PER_DAY:
+            raise ValueError('departure_time must be a time of day between midnight and the end of the day.')
+        self.__departure_time, self.__unload_time = departure_time, int(avg_unload_time)
+        if self.__layers is not None:
+            self.__matrix = self.__layers[int(self.layer(departure_time))]
+
+    def departure_time(self) -> int:
+        '''Returns the time of day (in seconds after midnight) at which the delivery routes start.'''
+        return self.__departure_time
+
+    def avg_unload_time(self) -> int:
+        '''Returns the average time it takes to unload a package, which is used by route_schedules().'''
+        return self.__unload_time
+
+    def is_time_dependent(self) -> bool:
+        '''Returns true if the travel times depend on the time of day or any location has a time window, so routes must be timed with a clock.'''
+        return self.__layer_times.size > 1 or self.__store.has_time_windows()
+
+    def is_sparse(self) -> bool:
+        '''Returns true if only some of the travel times are known and the rest are estimated (see SparseTravelTimes).'''
+        return isinstance(self.__matrix, SparseTravelTimes)
+
+    def sparse_travel_times(self) -> SparseTravelTimes | None:
+        '''Returns the SparseTravelTimes object that holds the travel times, or None if the travel matrix is not sparse.'''
+        return self.__matrix if self.is_sparse() else None
+
+    def trips(self) -> set[Trip]:
+        '''Creates and returns a set of Trip objects for every pair of different locations in the travel matrix (only the known pairs if it is sparse).'''
+        locations = self.locations()
+        if self.is_sparse():
+            origins, destinations, travel_times = self.__matrix.pairs()
+            return set(Trip(locations[x], locations[y], t) for x, y, t in zip(origins.tolist(), destinations.tolist(), travel_times.tolist()) if x != y)
+        n = len(locations)
+        return set(Trip(locations[x], locations[y], self.__matrix[x, y]) for x in range(n) for y in range(n) if x != y)
 
     def location(self, index: int) -> Location:
         '''Returns the Location object at 'index' in the travel matrix.'''
-        return self.__locations[index]
+        return self.__store[index]
 
     def location_count(self, location_type: type = None) -> int:
         '''
         Returns the total number of locations of location_type in the travel matrix.
         If location_type == None, then the total number of locations is returned
         '''
-        return self.__locations.size if location_type is None else sum(1 for loc in self.__locations if isinstance(loc, location_type))
+        return self.__store.count(location_type)
 
     def travel_time(self, origin: int, destination: int) -> int:
         '''Returns the travel time going from origin to destination.'''
-        return self.__matrix[origin][destination]
+        return self.__matrix[origin, destination]
 
     def total_travel_time(self, locations: list[int]) -> int:
         '''Returns the total travel time between all locations in a list of locations.'''
-        return sum(self.__matrix[locations[x]][locations[x + 1]] for x in range(len(locations) - 1))
+        locations = self.indexes(locations)
+        return int(self.__matrix[locations[:-1], locations[1:]].sum())
+
+    def packages(self, locations) -> np.ndarray:
+        '''Returns an array containing the number of packages at each of locations. Locations that are not DeliveryLocation objects have zero packages.'''
+        return self.__store.packages()[self.indexes(locations)]
 
     def total_packages(self, locations: list[int]) -> int:
         '''Calculates the sum of all packages to be delivered in a list of locations.'''
-        return sum(self.__locations[x].packages for x in locations if hasattr(self.__locations[x], 'packages'))
+        return int(self.packages(locations).sum())
 
     def is_deliverable(self, location: int, min_packages: int = 0, max_packages: int = sys.maxsize) -> bool:
         '''Returns true if location is a DeliveryLocation object where min_packages <= packages <= max_packages'''
         if min_packages > max_packages:
             raise ValueError('min_packages must be less than max_packages')
-        loc = self.__locations[location]
-        return True if isinstance(loc, DeliveryLocation) and loc.packages >= min_packages and loc.packages <= max_packages else False
+        packages = self.__store.packages()[location]
+        return bool(self.__store.kinds()[location] == LocationStore.DELIVERY_LOCATION and min_packages <= packages <= max_packages)
 
     def delivery_locations(self, min_packages: int = 0, max_packages: int = sys.maxsize) -> list[int]:
         '''Returns a list of indexes corresponding to delivery locations where min_packages <= packages <= max_packages.'''
-        return [i for i in range(self.location_count()) if self.is_deliverable(i, min_packages, max_packages)]
+        if min_packages > max_packages:
+            raise ValueError('min_packages must be less than max_packages')
+        packages = self.__store.packages()
+        return np.flatnonzero((self.__store.kinds() == LocationStore.DELIVERY_LOCATION) & (packages >= min_packages) & (packages <= max_packages)).tolist()
 
     def has_inventory(self, location: int, min_inventory: int = 0, max_inventory: int = sys.maxsize) -> bool:
         '''Returns true if location is a DistributionCenter object where min_inventory <= inventory <= max_inventory.'''
         if min_inventory > max_inventory:
             raise ValueError('min_inventory must be less than max_inventory')
-        loc = self.__locations[location]
-        return True if isinstance(loc, DistributionCenter) and loc.inventory >= min_inventory and loc.inventory <= max_inventory else False
+        inventory = self.__store.inventory()[location]
+        return bool(self.__store.kinds()[location] == LocationStore.DISTRIBUTION_CENTER and min_inventory <= inventory <= max_inventory)
 
     def distribution_centers(self, min_inventory: int = 0, max_inventory: int = sys.maxsize) -> list[int]:
         '''Returns a list of indexes corresponding to distribution centers where min_inventory <= inventory <= max_inventory.'''
-        return [i for i in range(self.location_count()) if self.has_inventory(i, min_inventory, max_inventory)]
-
-    def nearest_neighbor(self, origin: int, destinations: list[int] = []) -> tuple[int, int] | None:
-        '''Returns a tuple containing the index in destinations and the travel time that is closest to origin.'''
-        min_travelTime = sys.maxsize
-        nearest = None
-        for dst in destinations:
-            if dst != origin:
-                travelTime = self.travel_time(origin, dst)
-                if travelTime < min_travelTime:
-                    min_travelTime = travelTime
-                    nearest = dst
-        return None if nearest is None else (nearest, min_travelTime)
-
-    def farthest_outlier(self, destinations: list[int] = []) -> int:
-        outlier = -1
-        max_avg = -1
-        for y in destinations:
-            avg = statistics.mean(self.travel_time(x, y) for x in destinations if x != y)
-            if avg > max_avg:
-                outlier = y
-                max_avg = avg
-        return outlier
+        if min_inventory > max_inventory:
+            raise ValueError('min_inventory must be less than max_inventory')
+        inventory = self.__store.inventory()
+        return np.flatnonzero((self.__store.kinds() == LocationStore.DISTRIBUTION_CENTER) & (inventory >= min_inventory) & (inventory <= max_inventory)).tolist()
+
+    def indexes(self, locations) -> np.ndarray:
+        '''
+        Converts locations to an array of location indexes. locations may be a list, set, or array of indexes, or a boolean
+        mask with one element per location in the travel matrix. Lists and sets keep their iteration order.
+        '''
+        if isinstance(locations, np.ndarray):
+            if locations.dtype == bool:
+                if locations.shape != (len(self.__store),):
+                    raise ValueError('A boolean mask must have one element per location in the travel matrix.')
+                return np.flatnonzero(locations)
+            return locations.astype(np.intp, copy=False).ravel()
+        return np.fromiter(locations, dtype=np.intp)
+
+    def travel_times(self, origins, destinations) -> np.ndarray:
+        '''
+        Returns the travel times from each of origins to each of destinations as a len(origins) x len(destinations) array.
+        If origins is a single index, then a 1-D array of the travel times from origins to each of destinations is returned.
+        '''
+        if isinstance(origins, (int, np.integer)):
+            return self.__matrix[origins, self.indexes(destinations)]
+        return self.__matrix[np.ix_(self.indexes(origins), self.indexes(destinations))]
+
+    def pairwise_travel_times(self, origins, destinations) -> np.ndarray:
+        '''Returns an array where element i is the travel time from origins[i] to destinations[i].'''
+        return self.__matrix[self.indexes(origins), self.indexes(destinations)]
+
+    def timed_travel_times(self, origins, destinations, clock) -> np.ndarray:
+        '''Returns an array where element i is the travel time from origins[i] to destinations[i] of a trip that starts at clock[i] (see layer()).'''
+        if self.__layers is None:
+            return self.pairwise_travel_times(origins, destinations)
+        return self.__layers[self.layer(clock), self.indexes(origins), self.indexes(destinations)]
+
+    def layered_travel_times(self, origins, destinations) -> np.ndarray:
+        '''Returns the travel times from each of origins to each of destinations in every layer, as a layers x len(origins) x len(destinations) array.'''
+        if self.__layers is None:
+            return self.travel_times(origins, destinations)[None]
+        return self.__layers[:, self.indexes(origins)][:, :, self.indexes(destinations)]
+
+    def route_schedules(self, routes: list[list[int]], departure_time: int = None, avg_unload_time: int = None) -> dict:
+        '''
+        Times many routes at once by running their clocks side by side. Each step advances every route by one stop: the layer of each trip is
+        chosen from its route's clock with one vectorized lookup, a truck that arrives before a time window opens waits, and a truck that
+        arrives after it closes is late by the difference. Unloading takes packages * avg_unload_time at each stop.
+
+        Parameters
+        ----------
+        routes: list[list[int]]
+            The routes, each a list of location indexes that starts and ends at a distribution center.
+
+        departure_time: int = None
+            The time (in seconds after midnight) at which every route starts. If None, then departure_time() is used.
+
+        avg_unload_time: int = None
+            The average time it takes to unload a package. If None, then avg_unload_time() is used.
+
+        Returns
+        -------
+        dict
+            Arrays with one element per route: the time each route \'Returns\' to the distribution center, and its total \'Travel Time\',
+            \'Wait Time\', and \'Late Time\' (the sum of the number of seconds it arrives after each time window closes), and the time of
+            each stop\'s \'Arrivals\' as a len(routes) x (length of the longest route) array, padded with -1.
+        '''
+        departure_time = self.__departure_time if departure_time is None else departure_time
+        avg_unload_time = self.__unload_time if avg_unload_time is None else avg_unload_time
+        lengths = np.fromiter((len(route) for route in routes), dtype=np.intp, count=len(routes))
+        width = int(lengths.max()) if lengths.size else 0
+        stops = np.full((lengths.size, width), -1, dtype=np.intp)
+        stops[np.arange(width) < lengths[:, None]] = np.fromiter(chain.from_iterable(routes), dtype=np.intp, count=int(lengths.sum()))
+        opens, closes = self.__store.time_windows()
+        service = self.__store.packages() * avg_unload_time
+        clock = np.full(lengths.size, departure_time, dtype=np.int64)
+        travel, wait, late = np.zeros_like(clock), np.zeros_like(clock), np.zeros_like(clock)
+        arrivals = np.full(stops.shape, -1, dtype=np.int64)
+        if width:
+            arrivals[:, 0] = departure_time
+        for k in range(1, width):
+            moving = np.flatnonzero(lengths > k)
+            origins, destinations = stops[moving, k - 1], stops[moving, k]
+            travel_times = self.timed_travel_times(origins, destinations, clock[moving])
+            arrive = clock[moving] + travel_times
+            start = np.maximum(arrive, opens[destinations])
+            travel[moving] += travel_times
+            wait[moving] += start - arrive
+            late[moving] += np.maximum(arrive - closes[destinations], 0)
+            arrivals[moving, k] = arrive
+            clock[moving] = start + service[destinations]
+        return {'Returns': clock, 'Travel Time': travel, 'Wait Time': wait, 'Late Time': late, 'Arrivals': arrivals}
+
+    def known_pairs(self, locations) -> tuple[np.ndarray, np.ndarray] | None:
+        '''
+        Returns the pairs of different locations whose travel times are known rather than estimated, as two arrays of positions in locations
+        (not indexes in the travel matrix), or None if every travel time is known because the travel matrix is not sparse.
+        '''
+        if not self.is_sparse():
+            return None
+        locations = self.indexes(locations)
+        position = np.full(self.location_count(), -1, dtype=np.intp)
+        position[locations] = np.arange(locations.size)
+        origins, destinations, _ = self.__matrix.pairs()
+        origins, destinations = position[origins], position[destinations]
+        keep = (origins >= 0) & (destinations >= 0) & (origins != destinations)
+        return origins[keep], destinations[keep]
+
+    def nearest_neighbor(self, origin: int, destinations=[]) -> tuple[int, int] | None:
+        '''
+        Returns a tuple containing the index in destinations and the travel time that is closest to origin.
+        destinations may be a list, set, or array of indexes, or a boolean mask (see TravelMatrix.indexes()).
+        '''
+        if Instrumentation.enabled:
+            Instrumentation.count('Nearest Neighbor Queries')
+        destinations = self.indexes(destinations)
+        destinations = destinations[destinations != origin]
+        if destinations.size == 0:
+            return None
+        travel_times = self.__matrix[origin, destinations]
+        nearest = int(np.argmin(travel_times))
+        return (int(destinations[nearest]), int(travel_times[nearest]))
+
+    def nearest_neighbors(self, origins, destinations) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Answers nearest_neighbor() for many origins in one call.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            An array containing the index of the nearest destination for each origin and an array containing the travel times
+            to them. The index is -1 (and the travel time is meaningless) for an origin whose only destination is itself.
+        '''
+        origins, destinations = self.indexes(origins), self.indexes(destinations)
+        if Instrumentation.enabled:
+            Instrumentation.count('Nearest Neighbor Queries', origins.size)
+        if destinations.size == 0:
+            return np.full(origins.size, -1, dtype=np.intp), np.zeros(origins.size, dtype=self.__matrix.dtype)
+        travel_times = np.array(self.__matrix[np.ix_(origins, destinations)], dtype=np.int64)
+        itself = origins[:, None] == destinations[None, :]
+        travel_times[itself] = np.iinfo(np.int64).max
+        nearest = np.argmin(travel_times, axis=1)
+        rows = np.arange(origins.size)
+        found = ~itself[rows, nearest]
+        return np.where(found, destinations[nearest], -1), travel_times[rows, nearest]
+
+    def farthest_outlier(self, destinations=[]) -> int:
+        '''
+        Returns the location in destinations with the greatest average travel time from all of the other locations in destinations,
+        or -1 if destinations is empty. destinations may be a list, set, or array of indexes, or a boolean mask.
+        '''
+        destinations = self.indexes(destinations)
+        if destinations.size < 2:
+            return int(destinations[0]) if destinations.size else -1
+        travel_times = self.__matrix[np.ix_(destinations, destinations)]
+        itself = destinations[:, None] == destinations[None, :]
+        averages = np.where(itself, 0, travel_times).sum(axis=0) / (destinations.size - itself.sum(axis=0))
+        return int(destinations[np.argmax(averages)])
 
 
 class TreeBuilder:
@@ -227,6 +1054,7 @@ class TreeBuilder:
                 yield node
 
     @staticmethod
+    @Instrumentation.timed('TreeBuilder.minimum_spanning_tree')
     def minimum_spanning_tree(matrix: TravelMatrix, root_location: int, undelivered_locations: set[int], max_payload: int = sys.maxsize) -> Node:
         '''
         Builds a minimum spanning tree consisting of vertexes (Locations) in the graph (TravelMatrix). This method is used by a RoutePlanner
@@ -254,48 +1082,102 @@ class TreeBuilder:
         TreeBuilder.Node
             The root node of the minimum spanning tree.
         '''
-        # create the root node
-        root_node = TreeBuilder.Node(root_location)
+        order, parents, _ = TreeBuilder.prim(matrix, root_location, undelivered_locations, max_payload)
+
+        # return the root of the minimum spanning tree
+        return TreeBuilder.link(order, parents)
+
+    @staticmethod
+    def link(order: list[int], parents: list[int]) -> Node:
+        '''Links the flat arrays returned by prim() into a tree of TreeBuilder.Node objects and returns the root node.'''
+        nodes = {order[0]: TreeBuilder.Node(order[0])}
+        for location, parent in zip(order[1:], parents[1:]):
+            nodes[location] = TreeBuilder.Node(location)
+            nodes[parent].children.append(nodes[location])
+        return nodes[order[0]]
+
+    @staticmethod
+    @Instrumentation.timed('TreeBuilder.prim')
+    def prim(matrix: TravelMatrix, root_location: int, undelivered_locations, max_payload: int = sys.maxsize) -> tuple[list[int], list[int], int | None]:
+        '''
+        Builds the same capacity limited minimum spanning tree as minimum_spanning_tree() with Prim's algorithm in O(n^2) time, and returns
+        it as flat arrays instead of TreeBuilder.Node objects. An array holds the travel time from the tree to each remaining location and
+        the tree location it is closest to. Both are updated with vectorized numpy operations each time a location is added to the tree.
 
-        # make a list of all locations that we haven't delivered to yet
-        remaining_locations = [i for i in undelivered_locations if i != root_location]
+        Parameters
+        ----------
+        matrix: TravelMatrix
+            An adjacency matrix in the form of a TravelMatrix object.
 
-        # initiate the number of packages with that of the root node
-        num_packages = matrix.location(root_location).packages if isinstance(matrix.location(root_location), DeliveryLocation) else 0
+        root_location: int
+            The index of the location that serves as the root of the tree.
+
+        undelivered_locations
+            The indexes of the locations that are candidates for inclusion in the tree. Ties are resolved in iteration order.
+
+        max_payload: int = sys.maxsize
+            The tree stops growing as soon as the next nearest location would make the total number of packages exceed this value.
 
-        # keep going until no vertices remain
-        while len(remaining_locations) > 0:
+        Returns
+        -------
+        tuple[list[int], list[int], int | None]
+            The locations in the order they were added to the tree (starting with root_location), the parent of each of those
+            locations (-1 for the root), and the location that would have exceeded max_payload (None if every location fit).
+        '''
+        candidates = matrix.indexes(undelivered_locations)
+        candidates = candidates[candidates != root_location]
+        packages = matrix.packages(candidates)
 
-            nearest_neighbor = (None, None, sys.maxsize)
+        # the travel time from the tree to each candidate, and the location in the tree that it is closest to
+        key = np.array(matrix.travel_times(root_location, candidates), dtype=np.int64)
+        parent = np.full(candidates.size, root_location, dtype=np.intp)
+        in_tree = np.zeros(candidates.size, dtype=bool)
 
-            # traverse the tree in preorder
-            for node in root_node.preorder_traversal():
+        order, parents = [root_location], [-1]
+        num_packages = int(matrix.packages([root_location])[0])
 
-                destination, travel_time = matrix.nearest_neighbor(node.value, remaining_locations)
-                if travel_time < nearest_neighbor[2]:
-                    nearest_neighbor = (node, destination, travel_time)
+        for _ in range(candidates.size):
 
-            # accumulate the number of packages
-            num_packages += matrix.location(nearest_neighbor[1]).packages if isinstance(matrix.location(nearest_neighbor[1]), DeliveryLocation) else 0
+            # find the candidate that is nearest to the tree
+            nearest = int(np.argmin(key))
+            if Instrumentation.enabled:
+                Instrumentation.count('Nearest Neighbor Queries')
 
             # if we've delivered too many packages, then return to the caller
+            num_packages += int(packages[nearest])
             if num_packages > max_payload:
-                break
+                return order, parents, int(candidates[nearest])
 
-            # otherwise add nearest_neighbor to the tree
-            nearest_neighbor[0].children.append(TreeBuilder.Node(nearest_neighbor[1]))
+            # otherwise add the nearest candidate to the tree
+            location = int(candidates[nearest])
+            order.append(location)
+            parents.append(int(parent[nearest]))
+            in_tree[nearest] = True
+            key[nearest] = np.iinfo(np.int64).max
 
-            # and remove the best edge from the list of remaining vertices
-            remaining_locations.remove(nearest_neighbor[1])
+            # update the candidates that are closer to the new location than to the rest of the tree
+            travel_times = matrix.travel_times(location, candidates)
+            closer = (travel_times < key) & ~in_tree
+            key[closer] = travel_times[closer]
+            parent[closer] = location
 
-        # return the root of the minimum spanning tree
-        return root_node
+        return order, parents, None
+
+
+def google_maps_client(google_api_key: str):
+    '''
+    Returns a googlemaps.Client for google_api_key. The googlemaps module (and the requests module that it uses) is only imported the
+    first time this function is called, so planning routes from a file does not pay for importing them.
+    '''
+    import googlemaps
+    return googlemaps.Client(key=google_api_key)
 
 
 class GoogleMapsTripSetBuilder:
 
     @staticmethod
-    def build(google_api_key: str, customer_orders: set[DeliveryLocation], distribution_centers: set[DistributionCenter]) -> set[Trip]:
+    @Instrumentation.timed('GoogleMapsTripSetBuilder.build')
+    def build(google_api_key: str, customer_orders: set[DeliveryLocation], distribution_centers: set[DistributionCenter], departure_time: datetime = None) -> set[Trip]:
         '''
         Uses Google Maps to build a set of Trip objects.
 
@@ -322,6 +1204,9 @@ class GoogleMapsTripSetBuilder:
         distribution_centers: set[DistributionCenter]
             A set of DistributionCenter objects containing the inventory to be delivered to the customers.
 
+        departure_time: datetime = None
+            The time at which the trips start, which determines the traffic. If None, then the current time is used when the download begins.
+
         Returns
         -------
         A set of Trip objects representing all travel times between all permutations of locations (DeliveryLocations and DistributionCenters).
@@ -358,12 +1243,14 @@ class GoogleMapsTripSetBuilder:
         print("Please be patient. There are", num_trips, "combinations to download.", file=sys.stderr)
 
         # get our google maps client
-        gmaps = googlemaps.Client(key=google_api_key)
+        gmaps = google_maps_client(google_api_key)
+        departure_time = datetime.now() if departure_time is None else departure_time
 
         # iterate over every pair of customer addresses (no loops allowed!) and get the data from google maps
         prev_percent = 0.0
         for n, trip in enumerate(((s, d) for s in locations for d in locations if s != d), 1):
-            directions = gmaps.directions(trip[0].address, trip[1].address, mode='driving', departure_time=datetime.now())
+            Instrumentation.count('Directions API Requests')
+            directions = gmaps.directions(trip[0].address, trip[1].address, mode='driving', departure_time=departure_time)
             travel_time = 0
             legs = directions[0]['legs']
             for leg in legs:
@@ -379,112 +1266,1418 @@ class GoogleMapsTripSetBuilder:
         return trips
 
 
-class RoutePlanner(TravelMatrix):
-    '''
-    A subclass of TravelMatix used to calculate delivery routes.
-    '''
+class TokenBucket:
+    '''A thread safe token bucket used to limit the rate at which requests are sent to Google Maps.'''
 
-    def __init__(self, trips: set[Trip]):
-        super().__init__(trips)
+    def __init__(self, rate: float, capacity: int = 1):
+        '''
+        Parameters
+        ----------
+        rate: float
+            The number of tokens added to the bucket per second.
 
-    def brute_force_optimize(self, route: list[int], distribution_center: int) -> list[int]:
+        capacity: int = 1
+            The maximum number of tokens the bucket can hold, which is the largest burst of requests allowed.
         '''
-        Attempts to shorten the travel time by trying every permutation of the locations in routes.
-        This function should not be called unless len(routes)<9. Otherwise, the time required to perform the
-        calculation becomes infeasable.
+        if rate <= 0:
+            raise ValueError('rate must be greater than zero.')
+        if capacity < 1:
+            raise ValueError('capacity must be at least one.')
+        self.rate = float(rate)
+        self.capacity = int(capacity)
+        self.__tokens = float(capacity)
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> None:
+        '''Removes one token from the bucket, blocking until one is available.'''
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+                self.__updated = now
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+                wait = (1 - self.__tokens) / self.rate
+            time.sleep(wait)
+
+
+class TravelTimeCache:
+    '''
+    A persistent SQLite cache of travel times keyed by origin address, destination address, and time-of-day bucket.
+    Entries older than the time-to-live are evicted, so GoogleMapsTravelMatrixBuilder only downloads the pairs that are
+    missing or stale. The number of cache hits and misses is counted to show how many requests the cache saved.
+    '''
 
+    def __init__(self, file_name: str, ttl: float = 30 * 24 * 3600, bucket_minutes: int = 60):
+        '''
         Parameters
         ----------
-        route: list[int]
-            A list of location indexes.
+        file_name: str
+            The path and filename of the SQLite database file. It is created if it does not exist.
 
-        distribution_center: int
-            The index of the distribution center that serves at the starting and ending location in the route.
-            The distribution center should not be included in route when passed to this function.
+        ttl: float = 30 * 24 * 3600
+            The number of seconds a travel time stays in the cache before it is considered stale.
 
-        Returns
-        -------
-        list[int]
-            A copy of routes with the locations rearranged to result in a shorting travel time.
+        bucket_minutes: int = 60
+            The width of the time-of-day buckets, in minutes. Travel times for departure times in the same bucket are shared.
         '''
-        best_route = [x for x in route]
-        best_route.insert(0, distribution_center)
-        best_route.append(distribution_center)
-        for combo in permutations(route, len(route)):
-            temp = [x for x in combo]
-            temp.insert(0, distribution_center)
-            temp.append(distribution_center)
-            if self.total_travel_time(temp) < self.total_travel_time(best_route):
-                best_route = temp
-        return best_route
+        if ttl <= 0:
+            raise ValueError('ttl must be greater than zero.')
+        if bucket_minutes < 1 or bucket_minutes > 24 * 60:
+            raise ValueError('bucket_minutes must be between 1 and 1440.')
+        self.ttl = ttl
+        self.bucket_minutes = bucket_minutes
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        import sqlite3
+        self.__db = sqlite3.connect(file_name, check_same_thread=False)
+        self.__db.execute('''CREATE TABLE IF NOT EXISTS travel_times (
+            origin TEXT NOT NULL, destination TEXT NOT NULL, bucket INTEGER NOT NULL, travel_time INTEGER NOT NULL, fetched REAL NOT NULL,
+            PRIMARY KEY (origin, destination, bucket))''')
+        self.evict()
+
+    def close(self) -> None:
+        '''Closes the database file.'''
+        self.__db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def bucket(self, departure_time: datetime) -> int:
+        '''Returns the time-of-day bucket containing departure_time.'''
+        return (departure_time.hour * 60 + departure_time.minute) // self.bucket_minutes
+
+    def evict(self) -> int:
+        '''Deletes every travel time that is older than the time-to-live and returns the number of travel times deleted.'''
+        with self.__lock, self.__db:
+            return self.__db.execute('DELETE FROM travel_times WHERE fetched < ?', (time.time() - self.ttl,)).rowcount
+
+    def read(self, locations: list[Location], matrix: np.ndarray, departure_time: datetime) -> np.ndarray:
+        '''
+        Copies the cached travel times between locations into matrix and returns a boolean array, with the same shape as
+        matrix, that is True for every pair of locations that was found in the cache. The hits and misses are counted.
+        '''
+        found = np.zeros(matrix.shape, dtype=bool)
+        with self.__lock:
+            self.__db.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (address TEXT PRIMARY KEY, idx INTEGER NOT NULL)')
+            self.__db.execute('DELETE FROM wanted')
+            self.__db.executemany('INSERT OR IGNORE INTO wanted VALUES (?, ?)', ((loc.address, i) for i, loc in enumerate(locations)))
+            rows = self.__db.execute('''SELECT o.idx, d.idx, t.travel_time FROM travel_times t
+                JOIN wanted o ON t.origin = o.address JOIN wanted d ON t.destination = d.address
+                WHERE t.bucket = ? AND t.fetched >= ?''', (self.bucket(departure_time), time.time() - self.ttl)).fetchall()
+        if len(rows):
+            rows = np.array(rows, dtype=np.int64)
+            matrix[rows[:, 0], rows[:, 1]] = rows[:, 2]
+            found[rows[:, 0], rows[:, 1]] = True
+        np.fill_diagonal(found, False)
+        n = len(locations)
+        hits = int(found.sum())
+        self.hits += hits
+        self.misses += n * n - n - hits
+        return found
+
+    def write(self, origins: list[Location], destinations: list[Location], travel_times: np.ndarray, departure_time: datetime) -> None:
+        '''Saves a tile of travel times, as returned by GoogleMapsTravelMatrixBuilder.tile_travel_times(), to the cache.'''
+        bucket = self.bucket(departure_time)
+        fetched = time.time()
+        values = [(o.address, d.address, bucket, int(travel_times[x][y]), fetched) for x, o in enumerate(origins) for y, d in enumerate(destinations) if o != d]
+        with self.__lock, self.__db:
+            self.__db.executemany('INSERT OR REPLACE INTO travel_times VALUES (?, ?, ?, ?, ?)', values)
+
+    def stats(self) -> dict:
+        '''Returns a dict containing the number of hits and misses, and the hit rate.'''
+        total = self.hits + self.misses
+        return {'Hits': self.hits, 'Misses': self.misses, 'Hit Rate': self.hits / total if total else 0.0}
+
+
+class TravelTimeFetcher:
+    '''
+    Downloads tiles of travel times from the Distance Matrix API with a pool of worker threads. Requests are rate limited with a
+    TokenBucket, quota and transient errors are retried with exponential backoff, and every completed tile can be appended to a
+    checkpoint file so that an interrupted download resumes where it stopped.
+    '''
 
-    def triangle_optimize(self, route: list[int], distribution_center: int) -> list[int]:
-        best_route = [x for x in route]
-        best_route.insert(0, distribution_center)
-        best_route.append(distribution_center)
-        # iterate over each adjacent triplet in the route
-        # if we go past the second to get the the third, then swap them.
-        for i in range(len(best_route) - 3):
-            # get the length of all three sides of the "triangle"
-            a, b, c = best_route[i:i + 3]
-            x = self.travel_time(a, b)
-            y = self.travel_time(b, c)
-            z = self.travel_time(a, c)
-            # if z is not the hypotenuse, then swap b and c
-            if z != max(x, y, z):
-                best_route[i + 1], best_route[i + 2] = best_route[i + 2], best_route[i + 1]
-        return best_route
+    # the statuses of googlemaps.exceptions.ApiError that are worth retrying
+    TRANSIENT_STATUSES = ('OVER_QUERY_LIMIT', 'UNKNOWN_ERROR', 'RESOURCE_EXHAUSTED')
 
-    def routes_starting_at_each(self, distribution_center: int, delivery_locations: set[int], max_payload: int = sys.maxsize) -> list[list[int]]:
+    def __init__(self, client, workers: int = 1, rate_limit: float = None, max_retries: int = 5, backoff: float = 1.0, checkpoint_file: str = None, cache: TravelTimeCache = None):
         '''
-        Returns a list of delivery routes containing one route with each location in
-        undelivered_locations as the starting point. Each route is limited by max_payload.
-
         Parameters
         ----------
-        distribution_center: int
-            The index of the distribution center in the travel matrix.
+        client
+            An object with a distance_matrix(origins, destinations, mode, departure_time) method, such as a googlemaps.Client.
 
-        delivery_locations: set[int]
-            A set containing the indexes of the the delivery locations to include the delivery routes.
+        workers: int = 1
+            The number of requests that may be waiting on the network at the same time.
 
-        max_payload: int = sys.maxsize
-            The maximum payload of the delivery truck.
+        rate_limit: float = None
+            The maximum number of requests per second. If None, then requests are not rate limited.
 
-        Returns
-        -------
-        list[list[int]]
-            A list of delivery routes sorted in ascending order by travel time per bag.
-        '''
-        if not isinstance(distribution_center, int) or not isinstance(self.location(distribution_center), DistributionCenter):
-            raise ValueError('distribution_center must be an index of a DistributionCenter object in the adjacency matrix')
-        routes = []
-        for location in delivery_locations:
-            rootNode = TreeBuilder.minimum_spanning_tree(self, location, delivery_locations, max_payload)
-            route = [node.value for node in rootNode.preorder_traversal()]  # build a route by iterating over the minimum spanning tree in preorder
-            # try to improve the route before yielding it to the caller
-            if len(route) < 9:
-                route = self.brute_force_optimize(route, distribution_center)
-            elif len(route) >= 2:
-                route = self.triangle_optimize(route, distribution_center)
-            else:
-                route.insert(0, distribution_center)
-                route.append(distribution_center)
-            routes.append(route)
-        routes.sort(key=lambda t: self.total_travel_time(t) / self.total_packages(t))
-        return routes
+        max_retries: int = 5
+            The number of times a request is retried after a quota or transient error before giving up.
 
-    def single_payload_and_dist(self, distribution_center: int, min_packages: int, max_packages: int, max_payload: int, avg_unload_time: int = 0) -> dict:
-        '''
-        Calculates delivery routes when all delivery trucks have the same maximum capacity and there is only one distribution center.
-        Delivery routes are calculated for customers whose number of packages is: min_packages <= packages <= max_packages.
+        backoff: float = 1.0
+            The number of seconds to wait before the first retry. The wait doubles (plus some jitter) after each failed retry.
 
-        Parameters
-        ----------
-        distribution_center: int
-            The index of the distribution center.
+        checkpoint_file: str = None
+            The path and filename of a file to which completed tiles are appended. If None, then no checkpoint is kept.
 
-        min_packages: int
+        cache: TravelTimeCache = None
+            A cache to which completed tiles are saved. If None, then completed tiles are not cached.
+        '''
+        if workers < 1:
+            raise ValueError('workers must be at least one.')
+        if max_retries < 0:
+            raise ValueError('max_retries must not be negative.')
+        self.client = client
+        self.workers = workers
+        self.bucket = None if rate_limit is None else TokenBucket(rate_limit, max(1, workers))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.checkpoint_file = checkpoint_file
+        self.cache = cache
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def is_transient(err: Exception) -> bool:
+        '''Returns true if err is a quota or transient error, which means that the request should be retried.'''
+        if isinstance(err, (TimeoutError, ConnectionError)):
+            return True
+        # googlemaps is only imported by google_maps_client(), and no other client raises its exceptions
+        googlemaps = sys.modules.get('googlemaps')
+        if googlemaps is None:
+            return False
+        if isinstance(err, (googlemaps.exceptions.Timeout, googlemaps.exceptions.TransportError)):
+            return True
+        return isinstance(err, googlemaps.exceptions.ApiError) and err.status in TravelTimeFetcher.TRANSIENT_STATUSES
+
+    def read_checkpoint(self, locations: list[Location], matrix: np.ndarray) -> np.ndarray:
+        '''
+        Copies the travel times saved in the checkpoint file into matrix and returns a boolean array, with the same shape as matrix,
+        that is True for every pair of locations that has already been downloaded. Pairs whose addresses are not in locations are ignored.
+        '''
+        done = np.zeros(matrix.shape, dtype=bool)
+        np.fill_diagonal(done, True)
+        if self.checkpoint_file is None:
+            return done
+        index = {loc.address: i for i, loc in enumerate(locations)}
+        try:
+            with open(self.checkpoint_file, 'rt') as f:
+                for line in f:
+                    try:
+                        tile = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # the last line is incomplete if we crashed while writing it
+                    rows = [(x, index[a]) for x, a in enumerate(tile['origins']) if a in index]
+                    cols = [(y, index[a]) for y, a in enumerate(tile['destinations']) if a in index]
+                    if len(rows) and len(cols):
+                        travel_times = np.array(tile['travelTimes'], dtype=int)
+                        origins, destinations = [i for _, i in rows], [i for _, i in cols]
+                        matrix[np.ix_(origins, destinations)] = travel_times[np.ix_([x for x, _ in rows], [y for y, _ in cols])]
+                        done[np.ix_(origins, destinations)] = True
+        except FileNotFoundError:
+            pass
+        return done
+
+    def __write_checkpoint(self, origins: list[Location], destinations: list[Location], travel_times: np.ndarray) -> None:
+        '''Appends a completed tile to the checkpoint file. The caller must hold self.__lock.'''
+        if self.checkpoint_file is not None:
+            tile = {'origins': [loc.address for loc in origins], 'destinations': [loc.address for loc in destinations], 'travelTimes': travel_times.tolist()}
+            with open(self.checkpoint_file, 'at') as f:
+                f.write(json.dumps(tile) + '\n')
+                f.flush()
+
+    def __retry(self, request, counter: str):
+        '''Calls request() and returns its result, rate limiting each attempt and retrying quota and transient errors with exponential backoff.'''
+        for attempt in range(self.max_retries + 1):
+            if self.bucket is not None:
+                self.bucket.acquire()
+            Instrumentation.count(counter)
+            try:
+                return request()
+            except Exception as err:
+                if attempt == self.max_retries or not TravelTimeFetcher.is_transient(err):
+                    raise
+                time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random() / 2))
+
+    def __request(self, origins: list[Location], destinations: list[Location], departure_time: datetime) -> np.ndarray:
+        '''Requests one tile of travel times.'''
+        def request() -> np.ndarray:
+            response = self.client.distance_matrix([loc.address for loc in origins], [loc.address for loc in destinations], mode='driving', departure_time=departure_time)
+            return GoogleMapsTravelMatrixBuilder.tile_travel_times(response, origins, destinations)
+        return self.__retry(request, 'Distance Matrix API Requests')
+
+    @Instrumentation.timed('TravelTimeFetcher.geocode')
+    def geocode(self, locations: list[Location]) -> np.ndarray:
+        '''
+        Looks up the (latitude, longitude) of each of locations with the client\'s geocode(address) method, which returns a response in the
+        same format as googlemaps.Client.geocode(), and returns them as an n x 2 array in degrees. Raises a ValueError if an address is not found.
+        '''
+        def request(location: Location) -> tuple[float, float]:
+            results = self.__retry(lambda: self.client.geocode(location.address), 'Geocoding API Requests')
+            if not results:
+                raise ValueError(f'Unable to find the coordinates of "{location.address}".')
+            point = results[0]['geometry']['location']
+            return float(point['lat']), float(point['lng'])
+
+        coordinates = np.zeros((len(locations), 2), dtype=float)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for i, point in enumerate(executor.map(request, locations)):
+                coordinates[i] = point
+                if (i + 1) % 100 == 0 or i + 1 == len(locations):
+                    print('\rGeocoding addresses with google.com/maps... ', round((i + 1) / len(locations) * 100, 1), '% complete', end='', file=sys.stderr)
+        if len(locations):
+            print('', file=sys.stderr)
+        return coordinates
+
+    @Instrumentation.timed('TravelTimeFetcher.fetch')
+    def fetch(self, locations: list[Location], matrix: np.ndarray, tiles: list[tuple[list[int], list[int]]], departure_time: datetime) -> None:
+        '''
+        Downloads every tile and writes its travel times into matrix.
+
+        Parameters
+        ----------
+        locations: list[Location]
+            The locations, where the index of each location is its row and column in matrix.
+
+        matrix: np.ndarray
+            The square array of travel times to fill, or any object that supports assigning a block of travel times to matrix[np.ix_(origins, destinations)].
+
+        tiles: list[tuple[list[int], list[int]]]
+            The (origins, destinations) tiles to download, as returned by GoogleMapsTravelMatrixBuilder.tiles().
+
+        departure_time: datetime
+            The departure time used for every request.
+        '''
+        if len(tiles) == 0:
+            return
+
+        def download(tile: tuple[list[int], list[int]]) -> None:
+            origins, destinations = [locations[i] for i in tile[0]], [locations[i] for i in tile[1]]
+            travel_times = self.__request(origins, destinations, departure_time)
+            # each tile covers a different block of the matrix, so the workers never write to the same elements
+            matrix[np.ix_(tile[0], tile[1])] = travel_times
+            with self.__lock:
+                self.__write_checkpoint(origins, destinations, travel_times)
+            if self.cache is not None:
+                self.cache.write(origins, destinations, travel_times, departure_time)
+
+        prev_percent = 0.0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(download, tile) for tile in tiles]
+            try:
+                for n, future in enumerate(as_completed(futures), 1):
+                    future.result()
+                    curr_percent = round(n / len(tiles) * 100, 1)
+                    if curr_percent > prev_percent:
+                        print('\rDownloading travel times from google.com/maps... ', curr_percent, '% complete', end='', file=sys.stderr)
+                    prev_percent = curr_percent
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+            finally:
+                print('', file=sys.stderr)
+
+
+class GoogleMapsTravelMatrixBuilder:
+    '''
+    Uses the Google Distance Matrix API to fill a matrix of travel times in origin x destination tiles, instead of
+    making one Directions API request for every pair of locations like GoogleMapsTripSetBuilder does.
+
+    See the Google Distance Matrix API Developer Guide located at
+        https://developers.google.com/maps/documentation/distance-matrix/overview
+    '''
+
+    # the usage limits of the Distance Matrix API: at most 25 origins or 25 destinations, and at most 100 elements, per request
+    MAX_DIMENSION = 25
+    MAX_ELEMENTS = 100
+
+    @staticmethod
+    def tiles(origins: list[int], destinations: list[int], max_elements: int = MAX_ELEMENTS, max_dimension: int = MAX_DIMENSION) -> list[tuple[list[int], list[int]]]:
+        '''
+        Splits origins x destinations into tiles that each fit within a single Distance Matrix API request.
+
+        Parameters
+        ----------
+        origins: list[int]
+            The indexes of the origins (rows of the matrix) to cover.
+
+        destinations: list[int]
+            The indexes of the destinations (columns of the matrix) to cover.
+
+        max_elements: int = MAX_ELEMENTS
+            The maximum number of origins times destinations in a single request.
+
+        max_dimension: int = MAX_DIMENSION
+            The maximum number of origins, or destinations, in a single request.
+
+        Returns
+        -------
+        list[tuple[list[int], list[int]]]
+            A list of (origins, destinations) tuples, one per request.
+        '''
+        if len(origins) == 0 or len(destinations) == 0:
+            return []
+        # keep the tiles as square as possible, unless there are only a few origins
+        rows = min(len(origins), max_dimension, max(1, int(max_elements ** 0.5)))
+        cols = min(len(destinations), max_dimension, max(1, max_elements // rows))
+        return [(origins[r:r + rows], destinations[c:c + cols]) for r in range(0, len(origins), rows) for c in range(0, len(destinations), cols)]
+
+    @staticmethod
+    def missing_tiles(missing: np.ndarray, max_elements: int = MAX_ELEMENTS, max_dimension: int = MAX_DIMENSION) -> list[tuple[list[int], list[int]]]:
+        '''
+        Returns the tiles needed to download the pairs of locations that are True in missing, which is a square boolean array.
+        Each tile of the full matrix that contains a missing pair is shrunk to the origins and destinations that have a missing
+        pair in the tile, so that pairs which are already known are requested as rarely as possible.
+        '''
+        indexes = list(range(missing.shape[0]))
+        tiles = []
+        for origins, destinations in GoogleMapsTravelMatrixBuilder.tiles(indexes, indexes, max_elements, max_dimension):
+            block = missing[np.ix_(origins, destinations)]
+            if block.any():
+                tiles.append(([origins[x] for x in np.flatnonzero(block.any(axis=1))], [destinations[y] for y in np.flatnonzero(block.any(axis=0))]))
+        return tiles
+
+    @staticmethod
+    def tile_travel_times(response: dict, origins: list[Location], destinations: list[Location]) -> np.ndarray:
+        '''Converts a Distance Matrix API response into a len(origins) x len(destinations) array of travel times in seconds.'''
+        rows = response['rows']
+        if len(rows) != len(origins):
+            raise ValueError(f'Expected {len(origins)} rows in the distance matrix response, but received {len(rows)}.')
+        travel_times = np.zeros((len(origins), len(destinations)), dtype=int)
+        for x, row in enumerate(rows):
+            elements = row['elements']
+            if len(elements) != len(destinations):
+                raise ValueError(f'Expected {len(destinations)} elements in the distance matrix response, but received {len(elements)}.')
+            for y, element in enumerate(elements):
+                if origins[x] == destinations[y]:
+                    continue
+                if element.get('status', 'OK') != 'OK':
+                    raise ValueError(f'Unable to find a route from "{origins[x].address}" to "{destinations[y].address}" ({element["status"]}).')
+                travel_times[x][y] = int(element['duration']['value'])
+        return travel_times
+
+    @staticmethod
+    @Instrumentation.timed('GoogleMapsTravelMatrixBuilder.build')
+    def build(google_api_key: str, customer_orders: set[DeliveryLocation], distribution_centers: set[DistributionCenter], client=None,
+              workers: int = 1, rate_limit: float = None, checkpoint_file: str = None, cache: TravelTimeCache = None, departure_times: list[datetime] = None) -> tuple[list[Location], np.ndarray]:
+        '''
+        Uses the Google Distance Matrix API to build a matrix of travel times between every pair of locations.
+
+        Parameters
+        ----------
+        google_api_key: str
+            Your google api key. Ignored if client is not None.
+
+        customer_orders: set[DeliveryLocation]
+            A set of DeliveryLocation objects representing all customer order that need to be delivered.
+
+        distribution_centers: set[DistributionCenter]
+            A set of DistributionCenter objects containing the inventory to be delivered to the customers.
+
+        client = None
+            The object used to make the requests. It must have a distance_matrix(origins, destinations, mode, departure_time) method that
+            returns a response in the same format as googlemaps.Client.distance_matrix(), which makes it possible to replay canned responses.
+            If None, then a googlemaps.Client is created with google_api_key.
+
+        workers: int = 1
+            The number of requests that may be waiting on the network at the same time.
+
+        rate_limit: float = None
+            The maximum number of requests per second. If None, then requests are not rate limited.
+
+        checkpoint_file: str = None
+            The path and filename of a checkpoint file. Tiles that were saved to the file by an earlier, interrupted call are not
+            downloaded again, and newly downloaded tiles are appended to it. If None, then no checkpoint is kept.
+
+        cache: TravelTimeCache = None
+            A persistent cache of travel times. Only the pairs that are missing from the cache, or stale, are downloaded, and
+            the downloaded travel times are added to the cache. If None, then every pair is downloaded.
+
+        departure_times: list[datetime] = None
+            The start of each departure-time bucket, in increasing order of time of day (see departure_buckets()). One layer of travel times is
+            downloaded per bucket, using traffic at that time. If None, then a single layer is downloaded for the current time. A checkpoint
+            file can only be used with a single layer.
+
+        Returns
+        -------
+        tuple[list[Location], np.ndarray]
+            A list of all locations and a square array where matrix[x][y] is the travel time from locations[x] to locations[y]. If departure_times
+            is not None, then the array has one such layer per departure time instead. Pass both to RoutePlanner.from_array() to plan routes,
+            along with layer_times=departure_times in the latter case.
+        '''
+
+        if client is None and not isinstance(google_api_key, str):
+            raise TypeError('google_api_key must be a string type.')
+
+        if not isinstance(customer_orders, set):
+            raise TypeError('customer_orders must be a set[DeliveryLocation] type.')
+
+        if not isinstance(distribution_centers, set):
+            raise TypeError('distribution_centers must be a set[DistributionCenter] type.')
+
+        for d in distribution_centers:
+            if not isinstance(d, DistributionCenter):
+                raise ValueError('distribution_centers contains an object that is not of type DistributionCenter')
+
+        for c in customer_orders:
+            if not isinstance(c, DeliveryLocation):
+                raise ValueError('customer_orders contains an object that is not of type DeliveryLocation')
+
+        # sort the locations so that the tiles line up with those in the checkpoint file when resuming
+        locations = sorted(distribution_centers, key=lambda loc: loc.address)
+        locations.extend(sorted((c for c in customer_orders if c not in distribution_centers), key=lambda loc: loc.address))
+
+        if client is None:
+            client = google_maps_client(google_api_key)
+
+        layered = departure_times is not None
+        departure_times = list(departure_times) if layered else [datetime.now()]
+        if not len(departure_times) or np.any(np.diff([seconds_of_day(t) for t in departure_times]) <= 0):
+            raise ValueError('departure_times must be in increasing order of time of day.')
+        if checkpoint_file is not None and len(departure_times) > 1:
+            raise ValueError('A checkpoint file can only be used with a single departure time.')
+        layers = np.zeros((len(departure_times), len(locations), len(locations)), dtype=int)
+        fetcher = TravelTimeFetcher(client, workers, rate_limit, checkpoint_file=checkpoint_file, cache=cache)
+        for matrix, departure_time in zip(layers, departure_times):
+            done = fetcher.read_checkpoint(locations, matrix)
+            if cache is not None:
+                done |= cache.read(locations, matrix, departure_time)
+                stats = cache.stats()
+                print('Found', stats['Hits'], 'travel times in the cache and', stats['Misses'], 'are missing or stale.', file=sys.stderr)
+
+            # only download the pairs that are not already in the checkpoint file or the cache
+            tiles = GoogleMapsTravelMatrixBuilder.missing_tiles(~done)
+
+            # ask the user to be patient because the download process takes time.
+            print("Querying google maps for the travel times between each of", len(locations), f"locations departing at {departure_time:%H:%M}." if layered else "locations.", file=sys.stderr)
+            print("Please be patient. There are", len(tiles), "requests to download.", file=sys.stderr)
+
+            fetcher.fetch(locations, matrix, tiles, departure_time)
+
+        return locations, (layers if layered else layers[0])
+
+    @staticmethod
+    @Instrumentation.timed('GoogleMapsTravelMatrixBuilder.extend')
+    def extend(google_api_key: str, matrix: TravelMatrix, new_locations: list[Location], client=None, workers: int = 1, rate_limit: float = None) -> tuple[LocationStore, np.ndarray]:
+        '''
+        Adds locations to a travel matrix by downloading only the travel times to and from new_locations, instead of the whole matrix again.
+
+        Parameters
+        ----------
+        google_api_key: str
+            Your google api key. Ignored if client is not None.
+
+        matrix: TravelMatrix
+            The travel matrix to extend, which is not changed. It must not be sparse.
+
+        new_locations: list[Location]
+            The locations to add, none of which may already be in matrix.
+
+        client = None
+            The object used to make the requests (see build()). If None, then a googlemaps.Client is created with google_api_key.
+
+        workers: int = 1
+            The number of requests that may be waiting on the network at the same time.
+
+        rate_limit: float = None
+            The maximum number of requests per second. If None, then requests are not rate limited.
+
+        Returns
+        -------
+        tuple[LocationStore, np.ndarray]
+            A copy of the locations of matrix with new_locations added at the end, and the larger array of travel times, which has one layer per
+            departure-time bucket if matrix does. Pass both to RoutePlanner.from_array(), along with layer_times=matrix.layer_times() in the latter case.
+        '''
+        if matrix.is_sparse():
+            raise TypeError('A sparse travel matrix cannot be extended.')
+        if client is None and not isinstance(google_api_key, str):
+            raise TypeError('google_api_key must be a string type.')
+        store = matrix.location_store().copy()
+        for location in new_locations:
+            store.add(location)
+        old, n = matrix.location_count(), len(store)
+        layered = matrix.layer_count() > 1
+        layers = np.zeros((matrix.layer_count(), n, n), dtype=int)
+        layers[:, :old, :old] = matrix.layered_array()
+        new, everything = list(range(old, n)), list(range(n))
+        tiles = GoogleMapsTravelMatrixBuilder.tiles(new, everything) + GoogleMapsTravelMatrixBuilder.tiles(list(range(old)), new)
+        departure_times = GoogleMapsTravelMatrixBuilder.departure_buckets(matrix.layer_times()) if layered else [datetime.now()]
+        if client is None:
+            client = google_maps_client(google_api_key)
+        fetcher = TravelTimeFetcher(client, workers, rate_limit)
+        locations = store.records()
+        for layer, departure_time in zip(layers, departure_times):
+            fetcher.fetch(locations, layer, tiles, departure_time)
+        return store, (layers if layered else layers[0])
+
+    @staticmethod
+    def departure_buckets(times_of_day: list[str | int], now: datetime = None) -> list[datetime]:
+        '''
+        Returns the next time (after now, or after the current time if now is None) that each of times_of_day (as "HH:MM" or seconds after
+        midnight) occurs, in the same order, which can be passed to build() since the Distance Matrix API only predicts traffic in the future.
+        '''
+        now = datetime.now() if now is None else now
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        buckets = []
+        for time_of_day in times_of_day:
+            bucket = midnight + timedelta(seconds=seconds_of_day(time_of_day))
+            buckets.append(bucket if bucket > now else bucket + timedelta(days=1))
+        return buckets
+
+
+class GoogleMapsSparseMatrixBuilder:
+    '''
+    Builds a sparse travel matrix with the Google Distance Matrix API. Only the travel times from each delivery location to its k nearest
+    neighbors (by straight line distance) and to and from every distribution center are downloaded, which is about n * (k + 2) travel times
+    instead of n^2 - n, and the rest are estimated by SparseTravelTimes.
+    '''
+
+    class TileCollector:
+        '''Collects the tiles written by TravelTimeFetcher.fetch() as (origin, destination, travel time) triples instead of filling a dense array.'''
+
+        def __init__(self):
+            self.blocks = []
+
+        def __setitem__(self, key: tuple[np.ndarray, np.ndarray], travel_times: np.ndarray) -> None:
+            origins, destinations = np.broadcast_arrays(*key)
+            # list.append() is atomic, so the worker threads of the fetcher can share a collector
+            self.blocks.append((origins.ravel(), destinations.ravel(), np.asarray(travel_times).ravel()))
+
+        def triples(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+            '''Returns the origins, destinations, and travel times of every pair of different locations collected so far.'''
+            if not self.blocks:
+                return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.int64)
+            origins, destinations, travel_times = (np.concatenate(column) for column in zip(*self.blocks))
+            different = origins != destinations
+            return origins[different], destinations[different], travel_times[different]
+
+    @staticmethod
+    def nearest_by_distance(coordinates: np.ndarray, origins, destinations, k: int, chunk_size: int = 256) -> np.ndarray:
+        '''
+        Returns a len(origins) x k array containing the k destinations that are closest to each origin by straight line distance, nearest first.
+        An origin is never its own neighbor, and k is reduced if there are not enough destinations. The distances are computed chunk_size origins
+        at a time, so memory stays bounded for large numbers of locations.
+        '''
+        origins, destinations = np.asarray(origins, dtype=np.intp), np.asarray(destinations, dtype=np.intp)
+        k = max(0, min(k, destinations.size - 1))
+        nearest = np.zeros((origins.size, k), dtype=np.intp)
+        if k == 0:
+            return nearest
+        for start in range(0, origins.size, chunk_size):
+            rows = origins[start:start + chunk_size]
+            distances = haversine_distances(coordinates[rows][:, None, :], coordinates[destinations][None, :, :])
+            distances[rows[:, None] == destinations[None, :]] = np.inf
+            closest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            closest = np.take_along_axis(closest, np.argsort(np.take_along_axis(distances, closest, axis=1), axis=1, kind='stable'), axis=1)
+            nearest[start:start + rows.size] = destinations[closest]
+        return nearest
+
+    @staticmethod
+    def neighbor_tiles(origins: list[int], neighbors: list[list[int]], max_elements: int = GoogleMapsTravelMatrixBuilder.MAX_ELEMENTS,
+                       max_dimension: int = GoogleMapsTravelMatrixBuilder.MAX_DIMENSION) -> list[tuple[list[int], list[int]]]:
+        '''
+        Packs the pairs (origins[i], neighbors[i][j]) into as few Distance Matrix API requests as it can. Each tile starts with an origin and
+        its neighbors, and then takes in those neighbors as more origins (nearby locations share most of their neighbors) as long as the tile
+        stays within max_elements and max_dimension. Every pair is covered by exactly one tile, and the extra pairs in a tile are downloaded for free.
+        '''
+        if any(len(n) > min(max_dimension, max_elements) for n in neighbors):
+            raise ValueError(f'Each location may have at most {min(max_dimension, max_elements)} neighbors.')
+        row = {o: i for i, o in enumerate(origins)}
+        grouped, tiles = set(), []
+        for i, origin in enumerate(origins):
+            if origin in grouped:
+                continue
+            group, union = [origin], list(neighbors[i])
+            grouped.add(origin)
+            seen = set(union)
+            for other in neighbors[i]:
+                if other in grouped or other not in row:
+                    continue
+                new = [d for d in neighbors[row[other]] if d not in seen]
+                if len(group) + 1 > max_dimension or len(union) + len(new) > max_dimension or (len(group) + 1) * (len(union) + len(new)) > max_elements:
+                    continue
+                group.append(other)
+                grouped.add(other)
+                union.extend(new)
+                seen.update(new)
+            if union:
+                tiles.append((group, union))
+        return tiles
+
+    @staticmethod
+    @Instrumentation.timed('GoogleMapsSparseMatrixBuilder.build')
+    def build(google_api_key: str, customer_orders: set[DeliveryLocation], distribution_centers: set[DistributionCenter], k: int = 10, client=None,
+              workers: int = 1, rate_limit: float = None, coordinates: dict[str, tuple[float, float]] = None) -> tuple[list[Location], SparseTravelTimes]:
+        '''
+        Uses the Google Geocoding and Distance Matrix APIs to build a sparse matrix of travel times.
+
+        Parameters
+        ----------
+        google_api_key: str
+            Your google api key. Ignored if client is not None.
+
+        customer_orders: set[DeliveryLocation]
+            A set of DeliveryLocation objects representing all customer order that need to be delivered.
+
+        distribution_centers: set[DistributionCenter]
+            A set of DistributionCenter objects containing the inventory to be delivered to the customers.
+
+        k: int = 10
+            The number of nearest neighbors of each delivery location whose travel times are downloaded. At most 25.
+
+        client = None
+            The object used to make the requests. It must have geocode(address) and distance_matrix(origins, destinations, mode, departure_time)
+            methods that return responses in the same format as a googlemaps.Client. If None, then a googlemaps.Client is created with google_api_key.
+
+        workers: int = 1
+            The number of requests that may be waiting on the network at the same time.
+
+        rate_limit: float = None
+            The maximum number of requests per second. If None, then requests are not rate limited.
+
+        coordinates: dict[str, tuple[float, float]] = None
+            The (latitude, longitude) of each address, if they are already known. If None, then every address is geocoded.
+
+        Returns
+        -------
+        tuple[list[Location], SparseTravelTimes]
+            A list of all locations and their sparse travel times. Pass both to RoutePlanner.from_array() to plan routes.
+        '''
+
+        if client is None and not isinstance(google_api_key, str):
+            raise TypeError('google_api_key must be a string type.')
+
+        if not isinstance(customer_orders, set):
+            raise TypeError('customer_orders must be a set[DeliveryLocation] type.')
+
+        if not isinstance(distribution_centers, set):
+            raise TypeError('distribution_centers must be a set[DistributionCenter] type.')
+
+        for d in distribution_centers:
+            if not isinstance(d, DistributionCenter):
+                raise ValueError('distribution_centers contains an object that is not of type DistributionCenter')
+
+        for c in customer_orders:
+            if not isinstance(c, DeliveryLocation):
+                raise ValueError('customer_orders contains an object that is not of type DeliveryLocation')
+
+        if k < 1 or k > GoogleMapsTravelMatrixBuilder.MAX_DIMENSION:
+            raise ValueError(f'k must be between 1 and {GoogleMapsTravelMatrixBuilder.MAX_DIMENSION}.')
+
+        locations = sorted(distribution_centers, key=lambda loc: loc.address)
+        locations.extend(sorted((c for c in customer_orders if c not in distribution_centers), key=lambda loc: loc.address))
+        n, depots = len(locations), len(distribution_centers)
+
+        if client is None:
+            client = google_maps_client(google_api_key)
+        fetcher = TravelTimeFetcher(client, workers, rate_limit)
+
+        if coordinates is None:
+            coordinates = fetcher.geocode(locations)
+        else:
+            coordinates = np.array([coordinates[loc.address] for loc in locations], dtype=float).reshape(n, 2)
+
+        # the rows and columns of the distribution centers, and the nearest neighbors of each customer
+        everyone, customers = list(range(n)), list(range(depots, n))
+        tiles = GoogleMapsTravelMatrixBuilder.tiles(everyone[:depots], everyone) + GoogleMapsTravelMatrixBuilder.tiles(customers, everyone[:depots])
+        neighbors = GoogleMapsSparseMatrixBuilder.nearest_by_distance(coordinates, customers, customers, k)
+        tiles += GoogleMapsSparseMatrixBuilder.neighbor_tiles(customers, neighbors.tolist())
+
+        elements = sum(len(o) * len(d) for o, d in tiles)
+        print("Querying google maps for", elements, "of the", n * n - n, "travel times between", n, "locations.", file=sys.stderr)
+        print("Please be patient. There are", len(tiles), "requests to download.", file=sys.stderr)
+
+        collector = GoogleMapsSparseMatrixBuilder.TileCollector()
+        fetcher.fetch(locations, collector, tiles, datetime.now())
+
+        return locations, SparseTravelTimes(coordinates, *collector.triples())
+
+
+@lru_cache(maxsize=None)
+def _held_karp_layers(k: int) -> list[tuple[int, np.ndarray, np.ndarray]]:
+    '''
+    Returns the order in which RoutePlanner.held_karp_optimize() fills its table for k stops. Each tuple (j, masks, prev) holds the
+    last stop j, every bitmask of visited stops that contains j (in order of increasing size), and the same bitmasks without j.
+    '''
+    masks = np.arange(1 << k)
+    sizes = np.zeros(1 << k, dtype=np.int64)
+    for j in range(k):
+        sizes += (masks >> j) & 1
+    layers = []
+    for size in range(2, k + 1):
+        layer = masks[sizes == size]
+        for j in range(k):
+            sel = layer[((layer >> j) & 1) == 1]
+            layers.append((j, sel, sel ^ (1 << j)))
+    return layers
+
+
+# the RoutePlanner used by each RoutePool worker process, which is created once by _init_route_worker()
+_route_worker = {}
+
+
+def _init_route_worker(shm_name: str, shape: tuple[int, ...], dtype: str, locations: LocationStore, sparse: SparseTravelTimes = None,
+                       layer_times: list[int] = None, departure: tuple[int, int] = (0, 0)) -> None:
+    '''
+    Attaches a RoutePool worker process to the shared travel matrix (which has one layer per departure-time bucket if layer_times
+    is not None), or to its own copy of a sparse travel matrix, which is small. departure is the (departure time, average unload time) of the planner.
+    '''
+    if sparse is not None:
+        _route_worker['planner'] = RoutePlanner.from_array(locations, sparse)
+    else:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        matrix = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        matrix.flags.writeable = False
+        _route_worker['shm'] = shm
+        _route_worker['planner'] = RoutePlanner.from_array(locations, matrix, layer_times)
+    _route_worker['planner'].set_departure_time(*departure)
+
+
+def _build_candidate_routes(starts: list[int], distribution_center: int, delivery_locations: list[int], max_payload: int) -> list[tuple[list[int], set[int]]]:
+    '''Builds the candidate route for each of starts in a RoutePool worker process.'''
+    planner = _route_worker['planner']
+    return [planner.candidate_route(start, distribution_center, delivery_locations, max_payload) for start in starts]
+
+
+def _plan_routes(distribution_center: int, delivery_locations: list[int], max_payload: int, strategy: str) -> list[list[int]]:
+    '''Plans every route of a distribution center in a RoutePool worker process.'''
+    return list(_route_worker['planner'].iter_routes(distribution_center, delivery_locations, max_payload, strategy))
+
+
+class RoutePool:
+    '''
+    A pool of worker processes that build candidate routes, or plan distribution centers, in parallel. The travel matrix is copied into shared memory once and
+    the locations are sent to each worker once, when it starts, so the RoutePlanner is never pickled per task. Results are returned
+    in the same order as the starting locations, which makes them identical to building the candidate routes serially.
+    '''
+
+    def __init__(self, planner, workers: int):
+        '''
+        Parameters
+        ----------
+        planner: RoutePlanner
+            The route planner whose travel matrix is shared with the workers.
+
+        workers: int
+            The number of worker processes.
+        '''
+        if workers < 1:
+            raise ValueError('workers must be at least one.')
+        self.workers = workers
+        departure = (planner.departure_time(), planner.avg_unload_time())
+        if planner.is_sparse():
+            self.__shm = None
+            initargs = (None, None, None, planner.location_store(), planner.sparse_travel_times(), None, departure)
+        else:
+            layered = planner.layer_count() > 1
+            matrix = planner.layered_array() if layered else planner.array()
+            self.__shm = shared_memory.SharedMemory(create=True, size=max(1, matrix.nbytes))
+            np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=self.__shm.buf)[:] = matrix
+            initargs = (self.__shm.name, matrix.shape, matrix.dtype.str, planner.location_store(), None, planner.layer_times().tolist() if layered else None, departure)
+        from concurrent.futures import ProcessPoolExecutor
+        self.__executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_route_worker, initargs=initargs)
+
+    def close(self) -> None:
+        '''Shuts down the worker processes and releases the shared memory.'''
+        self.__executor.shutdown()
+        if self.__shm is not None:
+            self.__shm.close()
+            self.__shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def candidate_routes(self, starts: list[int], distribution_center: int, delivery_locations, max_payload: int = sys.maxsize) -> list[tuple[list[int], set[int]]]:
+        '''Returns the result of RoutePlanner.candidate_route() for each of starts, in the same order as starts.'''
+        starts = list(starts)
+        delivery_locations = list(delivery_locations)
+        size = max(1, -(-len(starts) // (self.workers * 4)))
+        chunks = [starts[i:i + size] for i in range(0, len(starts), size)]
+        futures = [self.__executor.submit(_build_candidate_routes, chunk, distribution_center, delivery_locations, max_payload) for chunk in chunks]
+        return [result for future in futures for result in future.result()]
+
+    def plans(self, tasks: list[tuple[int, list[int], int, str]]) -> list[list[list[int]]]:
+        '''
+        Plans the routes of several distribution centers at the same time. Each task is a (distribution center, delivery locations,
+        max payload, strategy) tuple, and the routes planned by RoutePlanner.iter_routes() are returned in the same order as tasks.
+        '''
+        futures = [self.__executor.submit(_plan_routes, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+class CandidateRoutes:
+    '''
+    A priority queue of candidate delivery routes, one starting at each undelivered location, keyed by travel time per package.
+    When a route is popped, its stops are removed from the undelivered locations and only the candidates that depend on those
+    stops are invalidated, so the cost of each pass scales with the number of affected candidates rather than with the number of locations.
+    '''
+
+    def __init__(self, planner, distribution_center: int, undelivered_locations: set[int], max_payload: int = sys.maxsize, pool: RoutePool = None):
+        '''
+        Parameters
+        ----------
+        planner: RoutePlanner
+            The route planner used to build the candidate routes.
+
+        distribution_center: int
+            The index of the distribution center that every route starts and ends at.
+
+        undelivered_locations: set[int]
+            The indexes of the delivery locations to plan routes for. The set is not modified.
+
+        max_payload: int = sys.maxsize
+            The maximum payload of the delivery truck.
+
+        pool: RoutePool = None
+            If not None, then the initial candidate routes are built in parallel by the worker processes in pool.
+        '''
+        if not isinstance(distribution_center, int) or not isinstance(planner.location(distribution_center), DistributionCenter):
+            raise ValueError('distribution_center must be an index of a DistributionCenter object in the adjacency matrix')
+        self.planner = planner
+        self.distribution_center = distribution_center
+        self.max_payload = max_payload
+        self.undelivered = set(undelivered_locations)
+        self.__heap = []
+        self.__routes = {}
+        self.__versions = {}
+        self.__depends_on = {}
+        self.__dependents = {}
+        self.__stale = set()
+        starts = sorted(self.undelivered)
+        if pool is None:
+            for start in starts:
+                self.__build(start)
+        else:
+            for start, candidate in zip(starts, pool.candidate_routes(starts, distribution_center, starts, max_payload)):
+                self.__push(start, *candidate)
+
+    def __len__(self) -> int:
+        return len(self.undelivered)
+
+    def __build(self, start: int) -> None:
+        '''(Re)builds the candidate route that starts at start and pushes it onto the heap.'''
+        self.__push(start, *self.planner.candidate_route(start, self.distribution_center, sorted(self.undelivered), self.max_payload))
+
+    def __push(self, start: int, route: list[int], depends_on: set[int]) -> None:
+        '''Replaces the candidate route that starts at start and pushes it onto the heap.'''
+        for location in self.__depends_on.get(start, ()):
+            self.__dependents.get(location, set()).discard(start)
+        self.__routes[start] = route
+        self.__depends_on[start] = depends_on
+        self.__versions[start] = self.__versions.get(start, 0) + 1
+        for location in depends_on:
+            self.__dependents.setdefault(location, set()).add(start)
+        heapq.heappush(self.__heap, (self.planner.time_per_package(route), start, self.__versions[start]))
+
+    def peek(self) -> list[int]:
+        '''Returns the candidate route with the lowest travel time per package without removing it, rebuilding stale candidates as needed.'''
+        while len(self.__heap):
+            _, start, version = self.__heap[0]
+            if start not in self.undelivered or version != self.__versions[start]:
+                heapq.heappop(self.__heap)
+            elif start in self.__stale:
+                heapq.heappop(self.__heap)
+                self.__stale.discard(start)
+                self.__build(start)
+            else:
+                return self.__routes[start]
+        raise IndexError('peek at an empty CandidateRoutes')
+
+    def pop(self) -> list[int]:
+        '''
+        Removes and returns the candidate route with the lowest travel time per package. The candidates that depend on its stops
+        are marked as stale, and a stale candidate is only rebuilt when it reaches the top of the queue.
+        '''
+        route = self.peek()
+        self.remove(route[1:len(route) - 1])
+        return route
+
+    def remove(self, stops) -> None:
+        '''Removes stops from the undelivered locations (for example, because another vehicle delivered them) and marks the candidates that depend on them as stale.'''
+        stops = set(stops) & self.undelivered
+        self.undelivered.difference_update(stops)
+        # mark the candidates that depend on any of the locations that were just delivered as stale
+        for location in stops:
+            self.__stale.update(self.__dependents.pop(location, ()))
+            self.__stale.discard(location)
+            self.__routes.pop(location, None)
+            for other in self.__depends_on.pop(location, ()):
+                self.__dependents.get(other, set()).discard(location)
+
+
+class RoutePlanner(TravelMatrix):
+    '''
+    A subclass of TravelMatix used to calculate delivery routes.
+    '''
+
+    # routes with up to this many stops are optimized exactly by held_karp_optimize()
+    EXACT_OPTIMIZE_LIMIT = 14
+
+    # the number of seconds that local_search_optimize() may spend on each route with more than EXACT_OPTIMIZE_LIMIT stops
+    LOCAL_SEARCH_TIME_BUDGET = 1.0
+
+    # the maximum number of optimal orderings remembered by held_karp_optimize()
+    TOUR_CACHE_SIZE = 100000
+
+    # when ranking timed routes, each second that a route is late for a time window counts as this many seconds of travel time
+    LATE_PENALTY = 10
+
+    # at the start of anytime_single_dist(), a plan this fraction longer than the best one found so far may still be accepted (the threshold shrinks to zero)
+    ANYTIME_THRESHOLD = 0.001
+
+    def __init__(self, trips: set[Trip] = None, locations: list[Location] = None, matrix: np.ndarray = None, layer_times: list[int] = None):
+        super().__init__(trips, locations, matrix, layer_times)
+        self.__tours = {}
+
+    @Instrumentation.timed('RoutePlanner.brute_force_optimize')
+    def brute_force_optimize(self, route: list[int], distribution_center: int) -> list[int]:
+        '''
+        Attempts to shorten the travel time by trying every permutation of the locations in routes.
+        This function should not be called unless len(routes)<9. Otherwise, the time required to perform the
+        calculation becomes infeasable. held_karp_optimize() finds the same travel time much faster.
+
+        Parameters
+        ----------
+        route: list[int]
+            A list of location indexes.
+
+        distribution_center: int
+            The index of the distribution center that serves at the starting and ending location in the route.
+            The distribution center should not be included in route when passed to this function.
+
+        Returns
+        -------
+        list[int]
+            A copy of routes with the locations rearranged to result in a shorting travel time.
+        '''
+        best_route = [x for x in route]
+        best_route.insert(0, distribution_center)
+        best_route.append(distribution_center)
+        if Instrumentation.enabled:
+            Instrumentation.count('Permutations Evaluated', factorial(len(route)))
+        for combo in permutations(route, len(route)):
+            temp = [x for x in combo]
+            temp.insert(0, distribution_center)
+            temp.append(distribution_center)
+            if self.total_travel_time(temp) < self.total_travel_time(best_route):
+                best_route = temp
+        return best_route
+
+    @Instrumentation.timed('RoutePlanner.held_karp_optimize')
+    def held_karp_optimize(self, route: list[int], distribution_center: int) -> list[int]:
+        '''
+        Finds the ordering of the locations in route with the shortest travel time using Held-Karp dynamic programming over bitmasks
+        of visited stops, which takes O(2^n * n^2) time instead of the O(n!) time of brute_force_optimize(). Each layer of the table
+        is filled with vectorized numpy operations. Optimal orderings are remembered by distribution center and set of stops,
+        so the same set of stops is never solved twice.
+
+        If the travel matrix is time dependent (see TravelMatrix.is_time_dependent()), then the table holds the earliest time that the
+        truck can leave each stop instead, the layer of every trip is picked from that clock, and orderings that arrive after a time
+        window closes are ruled out, so the route that returns to the distribution center first is found. If no ordering meets every
+        time window, then the ordering with the shortest travel time in the departure time\'s layer is returned.
+
+        Parameters
+        ----------
+        route: list[int]
+            A list of location indexes.
+
+        distribution_center: int
+            The index of the distribution center that serves at the starting and ending location in the route.
+            The distribution center should not be included in route when passed to this function.
+
+        Returns
+        -------
+        list[int]
+            A copy of route with the locations rearranged to result in the shortest travel time.
+        '''
+        timed = self.is_time_dependent()
+        key = (distribution_center, frozenset(route), (self.departure_time(), self.avg_unload_time()) if timed else None)
+        tour = self.__tours.get(key)
+        if Instrumentation.enabled:
+            Instrumentation.count('Held-Karp Cache Hits' if tour is not None else 'Held-Karp Cache Misses')
+        if tour is None:
+            tour = self.__timed_held_karp(sorted(route), distribution_center) if timed else None
+            if tour is None:
+                tour = self.__held_karp(sorted(route), distribution_center)
+            if len(self.__tours) >= self.TOUR_CACHE_SIZE:
+                self.__tours.clear()
+            self.__tours[key] = tour
+        return [distribution_center, *tour, distribution_center]
+
+    def __held_karp(self, stops: list[int], distribution_center: int) -> tuple[int]:
+        '''Returns the optimal ordering of stops, starting and ending at distribution_center.'''
+        k = len(stops)
+        if k < 2:
+            return tuple(stops)
+        if Instrumentation.enabled:
+            Instrumentation.count('Held-Karp Subproblems', (1 << k) * k)
+        travel_times = np.array(self.travel_times([distribution_center, *stops], [distribution_center, *stops]), dtype=np.int64)
+        departures, returns, between = travel_times[0, 1:], travel_times[1:, 0], travel_times[1:, 1:]
+
+        # best[mask][j] is the shortest travel time from the distribution center through the stops in mask, ending at stop j
+        infinity = np.iinfo(np.int64).max // 4
+        best = np.full((1 << k, k), infinity, dtype=np.int64)
+        previous = np.zeros((1 << k, k), dtype=np.int8)
+        best[1 << np.arange(k), np.arange(k)] = departures
+        for j, masks, prev in _held_karp_layers(k):
+            # best[prev] is infinite for every stop that is not in prev, including j
+            candidates = best[prev] + between[:, j]
+            nearest = np.argmin(candidates, axis=1)
+            best[masks, j] = candidates[np.arange(masks.size), nearest]
+            previous[masks, j] = nearest
+
+        # walk backwards from the best last stop
+        mask = (1 << k) - 1
+        j = int(np.argmin(best[mask] + returns))
+        tour = []
+        while mask:
+            tour.append(stops[j])
+            mask, j = mask ^ (1 << j), int(previous[mask, j])
+        return tuple(reversed(tour))
+
+    def __timed_held_karp(self, stops: list[int], distribution_center: int) -> tuple[int] | None:
+        '''Returns the ordering of stops that returns to distribution_center first without missing a time window, or None if there is no such ordering.'''
+        k = len(stops)
+        if k == 0:
+            return ()
+        if Instrumentation.enabled:
+            Instrumentation.count('Held-Karp Subproblems', (1 << k) * k)
+        nodes = [distribution_center, *stops]
+        travel_times = np.array(self.layered_travel_times(nodes, nodes), dtype=np.int64)
+        opens, closes = (window[stops] for window in self.location_store().time_windows())
+        service = self.packages(stops) * self.avg_unload_time()
+        departure = self.departure_time()
+        infinity = np.iinfo(np.int64).max // 4
+
+        def leave(clock: np.ndarray, j) -> np.ndarray:
+            '''Returns the time the truck leaves stop j after arriving at clock, which is infinite if it missed the time window.'''
+            return np.where((clock < infinity) & (clock <= closes[j]), np.maximum(clock, opens[j]) + service[j], infinity)
+
+        # best[mask][j] is the earliest time the truck can leave stop j after visiting the stops in mask, ending at stop j
+        best = np.full((1 << k, k), infinity, dtype=np.int64)
+        previous = np.zeros((1 << k, k), dtype=np.int8)
+        best[1 << np.arange(k), np.arange(k)] = leave(departure + travel_times[int(self.layer(departure)), 0, 1:], np.arange(k))
+        rows = np.arange(1, k + 1)
+        for j, masks, prev in _held_karp_layers(k):
+            # the layer of the trip from each stop i to j is picked from the time the truck leaves i
+            clock = best[prev]
+            candidates = leave(clock + travel_times[self.layer(clock), rows, j + 1], j)
+            nearest = np.argmin(candidates, axis=1)
+            best[masks, j] = candidates[np.arange(masks.size), nearest]
+            previous[masks, j] = nearest
+
+        mask = (1 << k) - 1
+        clock = best[mask]
+        returns = np.where(clock < infinity, clock + travel_times[self.layer(clock), rows, 0], infinity)
+        j = int(np.argmin(returns))
+        if returns[j] >= infinity:
+            return None
+        tour = []
+        while mask:
+            tour.append(stops[j])
+            mask, j = mask ^ (1 << j), int(previous[mask, j])
+        return tuple(reversed(tour))
+
+    @Instrumentation.timed('RoutePlanner.local_search_optimize')
+    def local_search_optimize(self, route: list[int], distribution_center: int, time_budget: float = None, neighbors: int = 8) -> list[int]:
+        '''
+        Shortens the travel time of a route with a local search that applies 2-opt (reverse a segment), Or-opt (move a segment of up to
+        three stops, optionally reversed), and relocate (move a single stop) moves until no move improves the route or the time budget
+        runs out. Only moves that connect a stop to one of its nearest neighbors are tried, and stops whose neighborhood did not change
+        since they were last searched are skipped ("don't look" bits). The change in travel time of each move is evaluated in O(1) time
+        from the matrix and from prefix sums of the route's travel times in both directions, so asymmetric travel times are respected.
+        If the travel matrix is time dependent, then moves are found in the departure time\'s layer, but a move is only kept if the timed
+        route (see TravelMatrix.route_schedules()) is less late for its time windows, or as late and back at the distribution center sooner.
+
+        Parameters
+        ----------
+        route: list[int]
+            A list of location indexes.
+
+        distribution_center: int
+            The index of the distribution center that serves at the starting and ending location in the route.
+            The distribution center should not be included in route when passed to this function.
+
+        time_budget: float = None
+            The maximum number of seconds to search. If None, then the search runs until no move improves the route.
+
+        neighbors: int = 8
+            The number of nearest neighbors of each stop that moves are tried with.
+
+        Returns
+        -------
+        list[int]
+            A copy of route with the locations rearranged to result in a shorter (or equal) travel time.
+        '''
+        m = len(route)
+        if m < 3:
+            return self.held_karp_optimize(route, distribution_center)
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+
+        # work with local ids, where 0 is the distribution center and 1..m are the stops
+        nodes = [distribution_center, *route]
+        travel_times = np.array(self.travel_times(nodes, nodes), dtype=np.int64)
+        d = travel_times.tolist()
+        closeness = np.minimum(travel_times, travel_times.T)
+        np.fill_diagonal(closeness, np.iinfo(np.int64).max)
+        nearest = np.argsort(closeness, axis=1, kind='stable')[:, :min(neighbors, m)].tolist()
+
+        tour = list(range(m + 1)) + [0]
+        last = len(tour) - 1
+
+        timed = self.is_time_dependent()
+        if timed:
+            layers = np.array(self.layered_travel_times(nodes, nodes), dtype=np.int64).tolist()
+            layer_times = self.layer_times().tolist()
+            opens, closes = (window[nodes].tolist() for window in self.location_store().time_windows())
+            service = (self.packages(nodes) * self.avg_unload_time()).tolist()
+
+        def timed_cost() -> tuple[int, int]:
+            '''Returns the number of seconds that the tour is late for its time windows and the time it returns to the distribution center.'''
+            clock, late = self.departure_time(), 0
+            for a, b in zip(tour, tour[1:]):
+                arrive = clock + layers[bisect_right(layer_times, clock % SECONDS_PER_DAY) - 1][a][b]
+                late += max(arrive - closes[b], 0)
+                clock = max(arrive, opens[b]) + service[b]
+            return late, clock
+
+        def index() -> tuple[list[int], list[int], list[int]]:
+            '''Returns the position of each stop and the prefix sums of the tour's travel times forwards and backwards.'''
+            pos = [0] * (m + 1)
+            fwd, bwd = [0] * (last + 1), [0] * (last + 1)
+            for p in range(1, last + 1):
+                pos[tour[p]] = p
+                fwd[p] = fwd[p - 1] + d[tour[p - 1]][tour[p]]
+                bwd[p] = bwd[p - 1] + d[tour[p]][tour[p - 1]]
+            pos[0] = 0
+            return pos, fwd, bwd
+
+        def two_opt(i: int, j: int) -> int:
+            '''Returns the change in travel time from reversing tour[i..j].'''
+            a, b, e, f = tour[i - 1], tour[i], tour[j], tour[j + 1]
+            return d[a][e] + d[b][f] - d[a][b] - d[e][f] + (bwd[j] - bwd[i]) - (fwd[j] - fwd[i])
+
+        def or_opt(s: int, e: int, t: int, reverse: bool) -> int:
+            '''Returns the change in travel time from moving tour[s..e] (reversed if reverse is True) between tour[t] and tour[t + 1].'''
+            p, x, y, q, u, v = tour[s - 1], tour[s], tour[e], tour[e + 1], tour[t], tour[t + 1]
+            removed = d[p][x] + d[y][q] - d[p][q]
+            if reverse:
+                return d[u][y] + d[x][v] - d[u][v] + (bwd[e] - bwd[s]) - (fwd[e] - fwd[s]) - removed
+            return d[u][x] + d[y][v] - d[u][v] - removed
+
+        def moves(x: int):
+            '''Yields (delta, move) for every move that connects stop x to one of its nearest neighbors.'''
+            px = pos[x]
+            for y in nearest[x]:
+                for py in ((0, last) if y == 0 else (pos[y],)):
+                    # 2-opt moves that create the edge x -> y or y -> x
+                    for i, j in ((px + 1, py), (px, py - 1), (py + 1, px), (py, px - 1)):
+                        if 1 <= i < j <= last - 1:
+                            yield two_opt(i, j), ('2-opt', i, j)
+                    # Or-opt and relocate moves of a segment that starts or ends at x, to just before or after y
+                    for length in range(1, 4):
+                        for s, e in ((px, px + length - 1), (px - length + 1, px)) if length > 1 else ((px, px),):
+                            if s < 1 or e > last - 1:
+                                continue
+                            for t in (py - 1, py):
+                                if 0 <= t <= last - 1 and not s - 1 <= t <= e:
+                                    yield or_opt(s, e, t, False), ('or-opt', s, e, t, False)
+                                    if length > 1:
+                                        yield or_opt(s, e, t, True), ('or-opt', s, e, t, True)
+
+        def apply(move: tuple) -> list[int]:
+            '''Applies move to the tour and returns the stops at the ends of the edges that changed.'''
+            nonlocal tour
+            if move[0] == '2-opt':
+                _, i, j = move
+                touched = [tour[i - 1], tour[i], tour[j], tour[j + 1]]
+                tour[i:j + 1] = tour[i:j + 1][::-1]
+                return touched
+            _, s, e, t, reverse = move
+            touched = [tour[s - 1], tour[s], tour[e], tour[e + 1], tour[t], tour[t + 1]]
+            segment = tour[s:e + 1][::-1] if reverse else tour[s:e + 1]
+            rest = tour[:s] + tour[e + 1:]
+            t = t if t < s else t - len(segment)
+            tour = rest[:t + 1] + segment + rest[t + 1:]
+            return touched
+
+        pos, fwd, bwd = index()
+        cost = timed_cost() if timed else None
+        active = deque(range(1, m + 1))
+        queued = [False] + [True] * m
+        while len(active) and (deadline is None or time.perf_counter() < deadline):
+            x = active.popleft()
+            queued[x] = False
+            for delta, move in moves(x):
+                if delta < 0:
+                    before = tour[:] if timed else None
+                    touched = apply(move)
+                    if timed:
+                        after = timed_cost()
+                        if after >= cost:
+                            tour = before
+                            continue
+                        cost = after
+                    if Instrumentation.enabled:
+                        Instrumentation.count('Local Search Moves Applied')
+                    for stop in touched + [x]:
+                        if stop and not queued[stop]:
+                            queued[stop] = True
+                            active.append(stop)
+                    pos, fwd, bwd = index()
+                    break
+        return [nodes[i] for i in tour]
+
+    @Instrumentation.timed('RoutePlanner.triangle_optimize')
+    def triangle_optimize(self, route: list[int], distribution_center: int) -> list[int]:
+        best_route = [x for x in route]
+        best_route.insert(0, distribution_center)
+        best_route.append(distribution_center)
+        # iterate over each adjacent triplet in the route
+        # if we go past the second to get the the third, then swap them.
+        for i in range(len(best_route) - 3):
+            # get the length of all three sides of the "triangle"
+            a, b, c = best_route[i:i + 3]
+            x = self.travel_time(a, b)
+            y = self.travel_time(b, c)
+            z = self.travel_time(a, c)
+            # if z is not the hypotenuse, then swap b and c
+            if z != max(x, y, z):
+                best_route[i + 1], best_route[i + 2] = best_route[i + 2], best_route[i + 1]
+        return best_route
+
+    def optimize_route(self, route: list[int], distribution_center: int) -> list[int]:
+        '''
+        Tries to shorten the travel time of a route with the optimizer best suited to its length, and returns a copy of the route that
+        starts and ends at distribution_center. The distribution center should not be included in route when passed to this function.
+        '''
+        if len(route) <= self.EXACT_OPTIMIZE_LIMIT:
+            return self.held_karp_optimize(route, distribution_center)
+        return self.local_search_optimize(route, distribution_center, self.LOCAL_SEARCH_TIME_BUDGET)
+
+    @Instrumentation.timed('RoutePlanner.candidate_route')
+    def candidate_route(self, start: int, distribution_center: int, delivery_locations, max_payload: int = sys.maxsize) -> tuple[list[int], set[int]]:
+        '''
+        Builds a minimum spanning tree rooted at start, limited by max_payload, and turns it into an optimized delivery route.
+
+        Returns
+        -------
+        tuple[list[int], set[int]]
+            The route, which starts and ends at distribution_center, and the set of delivery locations that the route depends on.
+            The latter contains every stop on the route plus the location that did not fit on the truck (if any). The route can
+            only change if one of these locations is removed from delivery_locations.
+        '''
+        order, parents, overflow = TreeBuilder.prim(self, start, delivery_locations, max_payload)
+        route = [node.value for node in TreeBuilder.link(order, parents).preorder_traversal()]  # build a route by iterating over the minimum spanning tree in preorder
+        depends_on = set(order)
+        if overflow is not None:
+            depends_on.add(overflow)
+        return self.optimize_route(route, distribution_center), depends_on
+
+    def time_per_package(self, route: list[int]) -> float:
+        '''
+        Returns the travel time of route divided by the number of packages delivered on it, which is used to rank routes. If the travel matrix
+        is time dependent, then the route is timed with a clock, and the seconds it is late for time windows are added (times LATE_PENALTY).
+        '''
+        return float(self.times_per_package([route])[0])
+
+    def times_per_package(self, routes: list[list[int]]) -> np.ndarray:
+        '''Returns time_per_package() of each of routes as an array, timing all of the routes at once if the travel matrix is time dependent.'''
+        packages = np.fromiter((self.total_packages(route) for route in routes), dtype=np.int64, count=len(routes))
+        if self.is_time_dependent():
+            schedule = self.route_schedules(routes)
+            travel_times = schedule['Travel Time'] + self.LATE_PENALTY * schedule['Late Time']
+        else:
+            travel_times = np.fromiter((self.total_travel_time(route) for route in routes), dtype=np.int64, count=len(routes))
+        return np.where(packages > 0, travel_times / np.maximum(packages, 1), np.inf)
+
+    def routes_starting_at_each(self, distribution_center: int, delivery_locations: set[int], max_payload: int = sys.maxsize, pool: RoutePool = None) -> list[list[int]]:
+        '''
+        Returns a list of delivery routes containing one route with each location in
+        undelivered_locations as the starting point. Each route is limited by max_payload.
+
+        Parameters
+        ----------
+        distribution_center: int
+            The index of the distribution center in the travel matrix.
+
+        delivery_locations: set[int]
+            A set containing the indexes of the the delivery locations to include the delivery routes.
+
+        max_payload: int = sys.maxsize
+            The maximum payload of the delivery truck.
+
+        pool: RoutePool = None
+            If not None, then the routes are built in parallel by the worker processes in pool.
+
+        Returns
+        -------
+        list[list[int]]
+            A list of delivery routes sorted in ascending order by travel time per bag.
+        '''
+        if not isinstance(distribution_center, int) or not isinstance(self.location(distribution_center), DistributionCenter):
+            raise ValueError('distribution_center must be an index of a DistributionCenter object in the adjacency matrix')
+        if pool is None:
+            routes = [self.candidate_route(location, distribution_center, delivery_locations, max_payload)[0] for location in delivery_locations]
+        else:
+            routes = [route for route, _ in pool.candidate_routes(delivery_locations, distribution_center, delivery_locations, max_payload)]
+        return [routes[i] for i in np.argsort(self.times_per_package(routes), kind='stable')]
+
+    def add_route(self, routes: dict, route: list[int], avg_unload_time: int = 0) -> dict:
+        '''
+        Appends route to the \'Routes\' in routes, which has the format returned by single_payload_and_dist(), updates the totals, and returns the new route.
+        If the travel matrix is time dependent, then the route is timed with a clock that starts at the departure time (see TravelMatrix.route_schedules()),
+        its delivery time includes any time spent waiting for a time window to open, and it also has a \'Departure Time\', \'Return Time\',
+        \'Wait Time\', and \'Late Time\'.
+        '''
+        packages = self.total_packages(route)
+        unload_time = packages * avg_unload_time
+        timing = {}
+        if self.is_time_dependent():
+            schedule = self.route_schedules([route], avg_unload_time=avg_unload_time)
+            travel_time = int(schedule['Travel Time'][0])
+            delivery_time = int(schedule['Returns'][0]) - self.departure_time()
+            timing = {'Departure Time': self.departure_time(), 'Return Time': int(schedule['Returns'][0]), 'Wait Time': int(schedule['Wait Time'][0]), 'Late Time': int(schedule['Late Time'][0])}
+        else:
+            travel_time = self.total_travel_time(route)
+            delivery_time = travel_time + unload_time
+        routes['Total Packages'] += packages
+        routes['Total Travel Time'] += travel_time
+        routes['Total Unload Time'] += unload_time
+        routes['Total Delivery Time'] += delivery_time
+        routes['Routes'].append({
+            'Packages': packages,
+            'Travel Time': travel_time,
+            'Unload Time': unload_time,
+            'Delivery Time': delivery_time,
+            **timing,
+            'Delivery Locations': [self.location(i) for i in route]
+        })
+        return routes['Routes'][-1]
+
+    @Instrumentation.timed('RoutePlanner.single_payload_and_dist')
+    def single_payload_and_dist(self, distribution_center: int, min_packages: int, max_packages: int, max_payload: int, avg_unload_time: int = 0, incremental: bool = False, workers: int = 1) -> dict:
+        '''
+        Calculates delivery routes when all delivery trucks have the same maximum capacity and there is only one distribution center.
+        Delivery routes are calculated for customers whose number of packages is: min_packages <= packages <= max_packages.
+
+        Parameters
+        ----------
+        distribution_center: int
+            The index of the distribution center.
+
+        min_packages: int
             The minimum number of packages necessary to include a customer in the delivery routes.
 
         max_packages: int
@@ -496,52 +2689,902 @@ class RoutePlanner(TravelMatrix):
         avg_unload_time: int = 0
             The average amount of time that it takes to unload a package from the truck.
 
+        incremental: bool = False
+            If True, then the candidate routes are kept in a CandidateRoutes priority queue between passes and only the candidates
+            that depend on the locations just assigned to a route are rebuilt, instead of rebuilding every candidate route on every pass.
+            This trades plan quality for speed: the routes are usually somewhat longer than those planned by rebuilding every candidate.
+
+        workers: int = 1
+            The number of processes used to build candidate routes. If greater than one, then the candidate routes are built by a RoutePool.
+            The routes are identical to those calculated with a single process.
+
         Yields
         ------
         dict
             A dictionary containing a list of locations, travel time, total bags, and the unload time.
         '''
-        routes = {
+        routes = RoutePlanner.empty_routes()
+        undelivered = set(self.delivery_locations(min_packages, max_packages))
+        pool = RoutePool(self, workers) if workers > 1 and len(undelivered) else None
+        try:
+            for route in self.iter_routes(distribution_center, undelivered, max_payload, 'incremental' if incremental else 'tree', pool):
+                self.add_route(routes, route, avg_unload_time)
+            return routes
+        finally:
+            if pool is not None:
+                pool.close()
+
+    def export_routes(self, routes, exporter, avg_unload_time: int = 0) -> dict:
+        '''
+        Writes each route in routes (lists of location indexes that start and end at the distribution center, such as the routes yielded by
+        iter_routes()) with exporter, a RouteExporter, as soon as it is available. Returns the totals in the format returned by
+        single_payload_and_dist(), but without the routes, so the memory used does not grow with the number of routes.
+        '''
+        totals = RoutePlanner.empty_routes()
+        for route in routes:
+            exporter.write(self.add_route(totals, route, avg_unload_time))
+            totals['Routes'].clear()
+        return totals
+
+    @staticmethod
+    def empty_routes() -> dict:
+        '''Returns a dict in the format returned by single_payload_and_dist() that does not contain any routes yet.'''
+        return {
             'Total Packages': 0,
             'Total Travel Time': 0,
             'Total Unload Time': 0,
             'Total Delivery Time': 0,
             'Routes': []
         }
-        undelivered = set(self.delivery_locations(min_packages, max_packages))
+
+    # the route planning strategies supported by iter_routes()
+    STRATEGIES = ('tree', 'incremental', 'savings')
+
+    def iter_routes(self, distribution_center: int, delivery_locations, max_payload: int = sys.maxsize, strategy: str = 'tree', pool: RoutePool = None):
+        '''
+        A generator that yields delivery routes, each a list of location indexes that starts and ends at distribution_center,
+        until every location in delivery_locations has been delivered.
+
+        Parameters
+        ----------
+        distribution_center: int
+            The index of the distribution center.
+
+        delivery_locations
+            The indexes of the delivery locations to plan routes for.
+
+        max_payload: int = sys.maxsize
+            The maximum number of packages that a delivery truck can hold.
+
+        strategy: str = \'tree\'
+            \'tree\' rebuilds the candidate route starting at every location on each pass (see routes_starting_at_each()),
+            \'incremental\' only rebuilds the candidates affected by the last route (see CandidateRoutes), and \'savings\' uses
+            the Clarke-Wright savings algorithm (see iter_savings_routes()).
+
+        pool: RoutePool = None
+            If not None, then candidate routes are built in parallel by the worker processes in pool. Not used by \'savings\'.
+        '''
+        if strategy not in RoutePlanner.STRATEGIES:
+            raise ValueError(f'strategy must be one of {RoutePlanner.STRATEGIES}, not {strategy!r}.')
+        undelivered = set(delivery_locations)
+        if strategy == 'savings':
+            yield from self.iter_savings_routes(distribution_center, undelivered, max_payload)
+            return
+        if strategy == 'incremental':
+            candidates = CandidateRoutes(self, distribution_center, undelivered, max_payload, pool)
+            while len(candidates):
+                yield candidates.pop()
+            return
         while len(undelivered):
-            for route in self.routes_starting_at_each(distribution_center, undelivered, max_payload):
+            for route in self.routes_starting_at_each(distribution_center, undelivered, max_payload, pool):
                 s = set(route[1:len(route) - 1])
                 if undelivered.issuperset(s):
                     undelivered = undelivered.difference(s)
-                    packages = self.total_packages(route)
-                    travel_time = self.total_travel_time(route)
-                    unload_time = packages * avg_unload_time
-                    delivery_time = travel_time + unload_time
-                    routes['Total Packages'] += packages
-                    routes['Total Travel Time'] += travel_time
-                    routes['Total Unload Time'] += unload_time
-                    routes['Total Delivery Time'] += delivery_time
-                    routes['Routes'].append({
-                        'Packages': packages,
-                        'Travel Time': travel_time,
-                        'Unload Time': unload_time,
-                        'Delivery Time': delivery_time,
-                        'Delivery Locations': [self.location(i) for i in route]
-                    })
+                    yield route
+
+    def iter_savings_routes(self, distribution_center: int, delivery_locations, max_payload: int = sys.maxsize, optimize: bool = True):
+        '''
+        A generator that yields delivery routes built with the Clarke-Wright savings algorithm. Every delivery location starts on its own
+        route, and the route ending at i is joined to the route starting at j in order of decreasing savings, where the savings are
+        travel_time(i, distribution_center) + travel_time(distribution_center, j) - travel_time(i, j), as long as the joined route fits
+        within max_payload. The savings matrix is computed with vectorized numpy operations from the distribution center's row and column.
+        If the travel matrix is sparse, then routes are first joined across the pairs whose travel times are known, and then the routes that
+        are left are joined across the estimated travel times between their ends.
+
+        Parameters
+        ----------
+        distribution_center: int
+            The index of the distribution center that every route starts and ends at.
+
+        delivery_locations
+            The indexes of the delivery locations to plan routes for.
+
+        max_payload: int = sys.maxsize
+            The maximum payload of the delivery truck.
+
+        optimize: bool = True
+            If True, then each route is improved with optimize_route() before it is yielded.
+        '''
+        if not isinstance(distribution_center, int) or not isinstance(self.location(distribution_center), DistributionCenter):
+            raise ValueError('distribution_center must be an index of a DistributionCenter object in the adjacency matrix')
+        customers = self.indexes(sorted(delivery_locations))
+        k = customers.size
+        if k == 0:
+            return
+
+        # each route is a linked list of customers, and route_of is only kept up to date for the first and last customer of each route
+        following, preceding = [-1] * k, [-1] * k
+        first, last, route_of = list(range(k)), list(range(k)), list(range(k))
+        load = self.packages(customers).tolist()
+        to_dc, from_dc = self.travel_times(customers, [distribution_center]).ravel().astype(np.int64), self.travel_times(distribution_center, customers)
+
+        def join(tails: np.ndarray, heads: np.ndarray, savings: np.ndarray) -> None:
+            '''Joins the route ending at customers[tails[x]] to the route starting at customers[heads[x]] in order of decreasing savings.'''
+            positive = savings > 0
+            tails, heads, savings = tails[positive], heads[positive], savings[positive]
+            # the savings never change, so sorting them once gives the same merge order as popping them from a max-heap
+            order = np.argsort(-savings, kind='stable')
+            for i, j in zip(tails[order].tolist(), heads[order].tolist()):
+                if following[i] != -1 or preceding[j] != -1:
+                    continue  # i is not the last customer of its route, or j is not the first customer of its route
+                a, b = route_of[i], route_of[j]
+                if a == b or load[a] + load[b] > max_payload:
+                    continue
+                following[i], preceding[j] = j, i
+                load[a] += load[b]
+                last[a] = last[b]
+                route_of[last[b]] = a
+
+        pairs = self.known_pairs(customers)
+        if pairs is None:
+            savings = to_dc[:, None] + from_dc[None, :] - self.travel_times(customers, customers).astype(np.int64)
+            np.fill_diagonal(savings, 0)
+            tails, heads = np.nonzero(savings)
+            join(tails, heads, savings[tails, heads])
+        else:
+            # only join routes across pairs whose travel times are known, which is O(n * k) pairs for a k-nearest neighbor matrix
+            tails, heads = pairs
+            join(tails, heads, to_dc[tails] + from_dc[heads] - self.pairwise_travel_times(customers[tails], customers[heads]).astype(np.int64))
+            # then join the routes that are left across the estimated travel times between their ends, which are few enough to compare all of them
+            ends, starts = np.flatnonzero(np.array(following) == -1), np.flatnonzero(np.array(preceding) == -1)
+            savings = to_dc[ends][:, None] + from_dc[starts][None, :] - self.travel_times(customers[ends], customers[starts]).astype(np.int64)
+            tails, heads = np.nonzero(savings)
+            join(ends[tails], starts[heads], savings[tails, heads])
+
+        for start in range(k):
+            if preceding[start] == -1:
+                route, c = [], start
+                while c != -1:
+                    route.append(int(customers[c]))
+                    c = following[c]
+                yield self.optimize_route(route, distribution_center) if optimize else [distribution_center, *route, distribution_center]
+
+    @Instrumentation.timed('RoutePlanner.savings_single_dist')
+    def savings_single_dist(self, distribution_center: int, min_packages: int, max_packages: int, max_payload: int, avg_unload_time: int = 0) -> dict:
+        '''
+        Calculates delivery routes like single_payload_and_dist(), but builds them with the Clarke-Wright savings algorithm (see
+        iter_savings_routes()) instead of building a spanning tree from every location, which is much faster for large numbers of locations.
+        Returns a dict in the same format as single_payload_and_dist().
+        '''
+        routes = RoutePlanner.empty_routes()
+        for route in self.iter_routes(distribution_center, self.delivery_locations(min_packages, max_packages), max_payload, 'savings'):
+            self.add_route(routes, route, avg_unload_time)
+        return routes
+
+    @Instrumentation.timed('RoutePlanner.anytime_single_dist')
+    def anytime_single_dist(self, distribution_center: int, min_packages: int, max_packages: int, max_payload: int, avg_unload_time: int = 0,
+                            time_budget: float = 10.0, callback=None, ruin: int = 12, seed: int = 0) -> dict:
+        '''
+        Calculates delivery routes like single_payload_and_dist(), but within a wall-clock time budget. A feasible plan is built quickly with
+        the Clarke-Wright savings algorithm, and then improved until the budget runs out by perturbation and local search: a random stop and
+        its nearest neighbors are removed from their routes and inserted again where they add the least travel time (in a route with room
+        for them, or a new one), and the routes that changed are optimized again with local_search_optimize(). A changed plan replaces the
+        current one if it is no more than ANYTIME_THRESHOLD longer than the best plan found so far (the threshold shrinks to zero as the
+        deadline nears), so the search can escape local optima without wandering far from the best plan. The short routes of the best plan
+        are then ordered with optimize_route(), and it is returned.
+
+        Parameters
+        ----------
+        distribution_center: int
+            The index of the distribution center.
+
+        min_packages: int
+            The minimum number of packages necessary to include a customer in the delivery routes.
+
+        max_packages: int
+            The maximum number of packages necessary to include a customer in the delivery routes.
+
+        max_payload:
+            The maximum number of packages that a delivery truck can hold.
+
+        avg_unload_time: int = 0
+            The average amount of time that it takes to unload a package from the truck.
+
+        time_budget: float = 10.0
+            The number of seconds to plan for. The first plan is always completed, even if it takes longer.
+
+        callback = None
+            If not None, then callback(total_delivery_time, seconds) is called with the total delivery time of the best plan so far and the
+            number of seconds since planning started, each time a better plan is found (including the first plan). Timed routes that are
+            late for a time window count each late second LATE_PENALTY times.
+
+        ruin: int = 12
+            The largest number of stops removed and inserted again at a time. Must be at least two.
+
+        seed: int = 0
+            The seed of the random numbers, so that a plan can be repeated (given the same number of iterations).
+
+        Returns
+        -------
+        dict
+            The best plan found, in the same format as single_payload_and_dist().
+        '''
+        if ruin < 2:
+            raise ValueError('ruin must be at least two.')
+        started = time.perf_counter()
+        deadline = started + time_budget
+        rng = random.Random(seed)
+        customers = self.indexes(self.delivery_locations(min_packages, max_packages))
+        packages = self.location_store().packages()
+        timed = self.is_time_dependent()
+
+        def costs(stops: list[list[int]]) -> list[int]:
+            '''Returns the delivery time of each route (see add_route()), timing all of them at once if the travel matrix is time dependent.'''
+            routes = [[distribution_center, *route, distribution_center] for route in stops]
+            if timed:
+                schedule = self.route_schedules(routes, avg_unload_time=avg_unload_time)
+                return (schedule['Returns'] - self.departure_time() + self.LATE_PENALTY * schedule['Late Time']).tolist()
+            return [self.total_travel_time(route) + self.total_packages(route) * avg_unload_time for route in routes]
+
+        def optimize(route: list[int]) -> list[int]:
+            '''Returns the stops of route in the order found by local_search_optimize(), without letting it run past the deadline.'''
+            route = self.local_search_optimize(route, distribution_center, max(0.0, min(self.LOCAL_SEARCH_TIME_BUDGET, deadline - time.perf_counter())))
+            return route[1:len(route) - 1]
+
+        def insert(routes: list[list[int]], loads: list[int], stop: int) -> int:
+            '''Inserts stop where it adds the least travel time, in a route that has room for it or in a new route, and returns the route's index.'''
+            fits = [r for r, load in enumerate(loads) if load + packages[stop] <= max_payload]
+            if fits:
+                # every edge of every route that has room, from which the cost of inserting stop in the edge is one vectorized expression
+                tails = np.fromiter(chain.from_iterable([distribution_center, *routes[r]] for r in fits), dtype=np.intp)
+                heads = np.fromiter(chain.from_iterable([*routes[r], distribution_center] for r in fits), dtype=np.intp)
+                owners = np.repeat(fits, [len(routes[r]) + 1 for r in fits])
+                positions = np.concatenate([np.arange(len(routes[r]) + 1) for r in fits])
+                deltas = self.travel_times(tails, [stop])[:, 0] + self.travel_times(stop, heads) - self.pairwise_travel_times(tails, heads)
+                best = int(np.argmin(deltas))
+                if deltas[best] < self.travel_time(distribution_center, stop) + self.travel_time(stop, distribution_center):
+                    r, position = int(owners[best]), int(positions[best])
+                    routes[r] = routes[r][:position] + [stop] + routes[r][position:]  # a new list, since routes shares its lists with the current plan
+                    loads[r] += int(packages[stop])
+                    return r
+            routes.append([stop])
+            loads.append(int(packages[stop]))
+            return len(routes) - 1
+
+        current = [route[1:len(route) - 1] for route in self.iter_savings_routes(distribution_center, customers, max_payload)]
+        current_costs = costs(current)
+        best, best_cost = current, sum(current_costs)
+        if callback is not None:
+            callback(best_cost, time.perf_counter() - started)
+
+        while customers.size > 1 and time.perf_counter() < deadline:
+            if Instrumentation.enabled:
+                Instrumentation.count('Anytime Iterations')
+
+            # ruin: remove a random stop and its nearest neighbors (in either direction) from their routes
+            center = int(customers[rng.randrange(customers.size)])
+            q = rng.randint(2, min(ruin, customers.size))
+            closeness = np.minimum(self.travel_times(center, customers), self.travel_times(customers, [center])[:, 0])
+            removed = customers[np.argpartition(closeness, q - 1)[:q]].tolist()
+            gone = set(removed)
+            touched = {r for r, route in enumerate(current) if not gone.isdisjoint(route)}
+            routes = [[stop for stop in route if stop not in gone] if r in touched else route for r, route in enumerate(current)]
+            loads = [int(packages[route].sum()) if route else 0 for route in routes]
+
+            # recreate: insert the removed stops again, one at a time, where they add the least travel time; the order is random, the
+            # most packages first (which packs the nearly full routes better), or the farthest from (or nearest to) the distribution center first
+            rng.shuffle(removed)
+            order = rng.randrange(4)
+            if order == 1:
+                removed.sort(key=lambda stop: -packages[stop])
+            elif order > 1:
+                removed.sort(key=lambda stop: self.travel_time(distribution_center, stop), reverse=order == 2)
+            for stop in removed:
+                touched.add(insert(routes, loads, stop))
+
+            # local search: optimize the routes that changed, and drop the ones that are empty
+            kept = [r for r in range(len(current)) if r not in touched]
+            changed = [optimize(routes[r]) for r in sorted(touched) if routes[r]]
+            trial = [current[r] for r in kept] + changed
+            trial_costs = [current_costs[r] for r in kept] + costs(changed)
+            total = sum(trial_costs)
+
+            threshold = self.ANYTIME_THRESHOLD * max(0.0, deadline - time.perf_counter()) / time_budget if time_budget > 0 else 0.0
+            if total <= best_cost * (1 + threshold):
+                current, current_costs = trial, trial_costs
+                if total < best_cost:
+                    best, best_cost = trial, total
+                    if callback is not None:
+                        callback(best_cost, time.perf_counter() - started)
+
+        # the short routes of the best plan are ordered exactly, which is too slow to do in every iteration
+        exact = [self.optimize_route(route, distribution_center)[1:-1] if len(route) <= self.EXACT_OPTIMIZE_LIMIT else route for route in best]
+        best = [min(pair, key=lambda p: p[1]) for pair in zip(zip(best, costs(best)), zip(exact, costs(exact)))]
+        if sum(cost for _, cost in best) < best_cost and callback is not None:
+            callback(sum(cost for _, cost in best), time.perf_counter() - started)
+
+        routes = RoutePlanner.empty_routes()
+        for route, _ in best:
+            self.add_route(routes, [distribution_center, *route, distribution_center], avg_unload_time)
+        return routes
+
+    def assign_to_distribution_centers(self, distribution_centers: list[int], delivery_locations) -> tuple[dict[int, list[int]], list[int]]:
+        '''
+        Assigns each delivery location to one of distribution_centers by round trip travel time, without exceeding the inventory of
+        any distribution center. Locations are assigned in order of decreasing regret (how much longer the round trip from their
+        second best distribution center is than from their best), so the locations that have the most to lose are assigned first.
+        A distribution center whose inventory is zero is treated as having unlimited inventory.
+
+        Returns
+        -------
+        tuple[dict[int, list[int]], list[int]]
+            A dict mapping each distribution center to the delivery locations assigned to it, and a list of the delivery locations that
+            could not be assigned because no distribution center has enough inventory left.
+        '''
+        depots = self.indexes(distribution_centers)
+        customers = self.indexes(sorted(delivery_locations))
+        for depot in depots:
+            if not isinstance(self.location(int(depot)), DistributionCenter):
+                raise ValueError('distribution_centers must only contain indexes of DistributionCenter objects in the adjacency matrix')
+        assigned = {int(depot): [] for depot in depots}
+        if customers.size == 0 or depots.size == 0:
+            return assigned, customers.tolist()
+
+        round_trips = self.travel_times(depots, customers) + self.travel_times(customers, depots).T
+        ranked = np.argsort(round_trips, axis=0, kind='stable')
+        regret = round_trips[ranked[1], np.arange(customers.size)] - round_trips[ranked[0], np.arange(customers.size)] if depots.size > 1 else np.zeros(customers.size)
+        remaining = [self.location(int(depot)).inventory or sys.maxsize for depot in depots]
+        packages = self.packages(customers)
+
+        unassigned = []
+        for c in np.argsort(-regret, kind='stable'):
+            for d in ranked[:, c]:
+                if packages[c] <= remaining[d]:
+                    remaining[d] -= int(packages[c])
+                    assigned[int(depots[d])].append(int(customers[c]))
+                    break
+            else:
+                unassigned.append(int(customers[c]))
+        return assigned, unassigned
+
+    @Instrumentation.timed('RoutePlanner.cluster_delivery_locations')
+    def cluster_delivery_locations(self, distribution_center: int, delivery_locations, max_cluster_packages: int, max_iterations: int = 10) -> list[list[int]]:
+        '''
+        Partitions delivery locations into clusters of nearby locations, none of which has more than max_cluster_packages packages (unless a
+        single location does), with a capacity limited k-medoids algorithm on the round trip travel times between locations. The first
+        medoids are spread out by repeatedly choosing the location farthest from the medoids chosen so far, starting with the location farthest
+        from distribution_center. Then, on each iteration, locations are assigned to the nearest medoid that has room for their packages, in
+        order of decreasing regret (see assign_to_distribution_centers()), a new cluster is started for any location that does not fit
+        anywhere, and each medoid moves to the location with the shortest total round trip time to the rest of its cluster.
+
+        Parameters
+        ----------
+        distribution_center: int
+            The index of the distribution center that the clusters will be delivered from.
+
+        delivery_locations
+            The indexes of the delivery locations to partition.
+
+        max_cluster_packages: int
+            The maximum number of packages in a cluster, which is typically a few truckloads.
+
+        max_iterations: int = 10
+            The maximum number of times the medoids are moved. The clusters are returned sooner if the medoids stop moving.
+
+        Returns
+        -------
+        list[list[int]]
+            The indexes of the delivery locations in each cluster.
+        '''
+        if max_cluster_packages < 1:
+            raise ValueError('max_cluster_packages must be at least one.')
+        customers = self.indexes(sorted(delivery_locations))
+        if customers.size == 0:
+            return []
+        packages = self.packages(customers)
+
+        # spread out the first medoids
+        k = min(customers.size, max(1, -(-int(packages.sum()) // max_cluster_packages)))
+        farthest = self.travel_times(distribution_center, customers).astype(np.int64) + self.travel_times(customers, [distribution_center]).ravel()
+        medoids = [int(np.argmax(farthest))]
+        nearest = np.full(customers.size, np.iinfo(np.int64).max)
+        while len(medoids) < k:
+            last = customers[medoids[-1]]
+            nearest = np.minimum(nearest, self.travel_times(last, customers).astype(np.int64) + self.travel_times(customers, [last]).ravel())
+            medoids.append(int(np.argmax(nearest)))
+
+        for _ in range(max_iterations):
+            # assign each location to the nearest medoid with room for its packages, in order of decreasing regret
+            round_trips = self.travel_times(customers, customers[medoids]).astype(np.int64) + self.travel_times(customers[medoids], customers).T
+            ranked = np.argsort(round_trips, axis=1, kind='stable')
+            rows = np.arange(customers.size)
+            regret = round_trips[rows, ranked[:, 1]] - round_trips[rows, ranked[:, 0]] if len(medoids) > 1 else np.zeros(customers.size)
+            remaining = [max_cluster_packages] * len(medoids)
+            clusters = [[] for _ in medoids]
+            for c in np.argsort(-regret, kind='stable').tolist():
+                for m in ranked[c].tolist():
+                    if packages[c] <= remaining[m]:
+                        remaining[m] -= int(packages[c])
+                        clusters[m].append(c)
+                        break
+                else:
+                    remaining.append(max_cluster_packages - int(packages[c]))
+                    clusters.append([c])
+
+            # move each medoid to the location with the shortest total round trip time to the rest of its cluster
+            moved = []
+            for cluster in clusters:
+                if cluster:
+                    travel_times = self.travel_times(customers[cluster], customers[cluster]).astype(np.int64)
+                    totals = travel_times.sum(axis=1) + travel_times.sum(axis=0)
+                    moved.append(cluster[int(np.argmin(totals))])
+            if sorted(moved) == sorted(medoids):
+                break
+            medoids = moved
+
+        return [customers[sorted(cluster)].tolist() for cluster in clusters if cluster]
+
+    @Instrumentation.timed('RoutePlanner.clustered_single_dist')
+    def clustered_single_dist(self, distribution_center: int, min_packages: int, max_packages: int, max_payload: int, avg_unload_time: int = 0,
+                              routes_per_cluster: int = 8, strategy: str = 'tree', workers: int = 1) -> dict:
+        '''
+        Calculates delivery routes like single_payload_and_dist(), but first partitions the delivery locations into clusters of about
+        routes_per_cluster truckloads with cluster_delivery_locations(), and then plans the routes of each cluster independently, in parallel
+        when workers is greater than one. The cost of the tree strategy grows much faster than linearly with the number of locations, so planning
+        many small clusters is much faster than planning all of the locations at once, at the cost of some routes that a global plan would share
+        between neighboring clusters.
+
+        Parameters
+        ----------
+        distribution_center: int
+            The index of the distribution center.
+
+        min_packages: int
+            The minimum number of packages necessary to include a customer in the delivery routes.
+
+        max_packages: int
+            The maximum number of packages necessary to include a customer in the delivery routes.
+
+        max_payload:
+            The maximum number of packages that a delivery truck can hold.
+
+        avg_unload_time: int = 0
+            The average amount of time that it takes to unload a package from the truck.
+
+        routes_per_cluster: int = 8
+            The maximum number of packages in a cluster, in truckloads of max_payload.
+
+        strategy: str = 'tree'
+            The route planning strategy used for each cluster. See iter_routes().
+
+        workers: int = 1
+            The number of processes used to plan the clusters at the same time.
+
+        Returns
+        -------
+        dict
+            A dict in the same format as single_payload_and_dist(), where each route also contains the number of the \'Cluster\' it was planned in.
+        '''
+        if routes_per_cluster < 1:
+            raise ValueError('routes_per_cluster must be at least one.')
+        clusters = self.cluster_delivery_locations(distribution_center, self.delivery_locations(min_packages, max_packages), routes_per_cluster * max_payload)
+        if workers > 1 and len(clusters) > 1:
+            with RoutePool(self, min(workers, len(clusters))) as pool:
+                plans = pool.plans([(distribution_center, cluster, max_payload, strategy) for cluster in clusters])
+        else:
+            plans = [list(self.iter_routes(distribution_center, cluster, max_payload, strategy)) for cluster in clusters]
+        routes = RoutePlanner.empty_routes()
+        for number, plan in enumerate(plans):
+            for route in plan:
+                self.add_route(routes, route, avg_unload_time)['Cluster'] = number
+        return routes
+
+    @Instrumentation.timed('RoutePlanner.single_payload_multi_dist')
+    def single_payload_multi_dist(self, distribution_centers: list[int], min_packages: int, max_packages: int, max_payload: int, avg_unload_time: int = 0, strategy: str = 'tree', workers: int = 1) -> dict:
+        '''
+        Calculates delivery routes when all delivery trucks have the same maximum capacity and there are several distribution centers.
+        Each delivery location is assigned to a distribution center by assign_to_distribution_centers(), and then the routes of each
+        distribution center are planned independently, in parallel when workers is greater than one.
+
+        Parameters
+        ----------
+        distribution_centers: list[int]
+            The indexes of the distribution centers.
+
+        min_packages: int
+            The minimum number of packages necessary to include a customer in the delivery routes.
+
+        max_packages: int
+            The maximum number of packages necessary to include a customer in the delivery routes.
+
+        max_payload:
+            The maximum number of packages that a delivery truck can hold.
+
+        avg_unload_time: int = 0
+            The average amount of time that it takes to unload a package from the truck.
+
+        strategy: str = 'tree'
+            The route planning strategy used for each distribution center. See iter_routes().
+
+        workers: int = 1
+            The number of processes used to plan the distribution centers at the same time.
+
+        Returns
+        -------
+        dict
+            A dict in the same format as single_payload_and_dist(), where each route also contains the \'Distribution Center\' it starts
+            and ends at, plus a list of \'Unassigned Locations\' that no distribution center has enough inventory for.
+        '''
+        assigned, unassigned = self.assign_to_distribution_centers(distribution_centers, self.delivery_locations(min_packages, max_packages))
+        depots = [depot for depot in assigned if len(assigned[depot])]
+        if workers > 1 and len(depots) > 1:
+            with RoutePool(self, min(workers, len(depots))) as pool:
+                plans = pool.plans([(depot, assigned[depot], max_payload, strategy) for depot in depots])
+        else:
+            plans = [list(self.iter_routes(depot, assigned[depot], max_payload, strategy)) for depot in depots]
+        routes = RoutePlanner.empty_routes()
+        for depot, plan in zip(depots, plans):
+            for route in plan:
+                self.add_route(routes, route, avg_unload_time)['Distribution Center'] = self.location(depot)
+        routes['Unassigned Locations'] = [self.location(i) for i in unassigned]
+        return routes
+
+    @Instrumentation.timed('RoutePlanner.mixed_fleet_single_dist')
+    def mixed_fleet_single_dist(self, distribution_center: int, fleet: list[Vehicle], min_packages: int, max_packages: int, avg_unload_time: int = 0, workers: int = 1) -> dict:
+        '''
+        Calculates delivery routes for a fleet of vehicles with different capacities and one distribution center. A CandidateRoutes queue
+        (built with the capacity limited spanning trees of TreeBuilder.prim()) is kept for each vehicle capacity. On each pass, the route with
+        the lowest travel time per package among the vehicle types that have routes left is chosen, and it is given to the smallest
+        vehicle type with routes left that can carry it, which keeps the larger vehicles free for the routes that need them.
+
+        Parameters
+        ----------
+        distribution_center: int
+            The index of the distribution center.
+
+        fleet: list[Vehicle]
+            The types of vehicles in the fleet, with the capacity of each and the number of routes it can run.
+
+        min_packages: int
+            The minimum number of packages necessary to include a customer in the delivery routes.
+
+        max_packages: int
+            The maximum number of packages necessary to include a customer in the delivery routes.
+
+        avg_unload_time: int = 0
+            The average amount of time that it takes to unload a package from the truck.
+
+        workers: int = 1
+            The number of processes used to build the initial candidate routes.
+
+        Returns
+        -------
+        dict
+            A dict in the same format as single_payload_and_dist(), where each route also contains the name of its \'Vehicle\', plus a
+            list of \'Undelivered Locations\' that could not be delivered because the fleet ran out of routes.
+        '''
+        if len(fleet) == 0 or not all(isinstance(v, Vehicle) for v in fleet):
+            raise TypeError('fleet must be a non-empty list[Vehicle] type.')
+        remaining = {id(v): v.count for v in fleet}
+        fleet = sorted(fleet, key=lambda v: v.capacity)
+        undelivered = set(self.delivery_locations(min_packages, max_packages))
+        routes = RoutePlanner.empty_routes()
+        pool = RoutePool(self, workers) if workers > 1 and len(undelivered) else None
+        try:
+            queues = {capacity: CandidateRoutes(self, distribution_center, undelivered, capacity, pool) for capacity in sorted(set(v.capacity for v in fleet))}
+        finally:
+            if pool is not None:
+                pool.close()
+
+        def available(vehicle: Vehicle) -> bool:
+            return remaining[id(vehicle)] is None or remaining[id(vehicle)] > 0
+
+        while len(undelivered):
+            capacities = set(v.capacity for v in fleet if available(v))
+            if len(capacities) == 0:
+                break
+            best = min((queues[capacity].peek() for capacity in sorted(capacities)), key=self.time_per_package)
+            packages = self.total_packages(best)
+            # a single location with more packages than any vehicle can carry goes on the largest vehicle available
+            vehicle = next((v for v in fleet if available(v) and v.capacity >= packages), None) or max((v for v in fleet if available(v)), key=lambda v: v.capacity)
+            if remaining[id(vehicle)] is not None:
+                remaining[id(vehicle)] -= 1
+            stops = best[1:len(best) - 1]
+            undelivered.difference_update(stops)
+            for queue in queues.values():
+                queue.remove(stops)
+            self.add_route(routes, best, avg_unload_time)['Vehicle'] = vehicle.name
+        routes['Undelivered Locations'] = [self.location(i) for i in sorted(undelivered)]
         return routes
 
-    def large_and_small_payload_single_dist(self, distribution_center: int, large_max_payload: int, small_max_payload: int, avg_unload_time: int = 0) -> list[list[int]]:
-        '''Not yet implemented'''
-        pass
+    def large_and_small_payload_single_dist(self, distribution_center: int, large_max_payload: int, small_max_payload: int, avg_unload_time: int = 0) -> dict:
+        '''
+        Calculates delivery routes for an unlimited number of large and small delivery trucks and one distribution center.
+        See mixed_fleet_single_dist() for details.
+        '''
+        fleet = [Vehicle('Large', large_max_payload), Vehicle('Small', small_max_payload)]
+        return self.mixed_fleet_single_dist(distribution_center, fleet, 0, max(large_max_payload, small_max_payload), avg_unload_time)
+
+
+class PlanningSession:
+    '''
+    Keeps a RoutePlanner and the current delivery routes of one distribution center in memory, so that changes to the customer orders can be
+    planned in a fraction of the time it takes to plan every route again. Only the routes that contain a changed order, or one of the nearest
+    routed neighbors of a new order, are dissolved and planned again, and every other route is kept as it is.
+
+    A session may be used by many threads at the same time. Every change is made to a copy of the planner (which shares the travel times),
+    which then replaces the current one while holding a lock, so readers always see a complete plan, changes are applied one at a time
+    (while holding commit_lock), and neither plan() nor what-if questions wait for a change to be planned.
+    '''
+
+    def __init__(self, planner: RoutePlanner, distribution_center: int, max_payload: int, avg_unload_time: int = 0, strategy: str = 'tree', neighbors: int = 3,
+                 google_api_key: str = None, client=None):
+        '''
+        Plans the routes of every delivery location with at least one package.
+
+        Parameters
+        ----------
+        planner: RoutePlanner
+            The route planner. The session works on copies of it, so it is never changed.
+
+        distribution_center: int
+            The index of the distribution center that every route starts and ends at.
+
+        max_payload: int
+            The maximum number of packages that a delivery truck can hold.
+
+        avg_unload_time: int = 0
+            The average amount of time that it takes to unload a package from the truck.
+
+        strategy: str = \'tree\'
+            The route planning strategy (see RoutePlanner.iter_routes()).
+
+        neighbors: int = 3
+            The number of nearest routed locations whose routes are planned again along with each new order.
+
+        google_api_key: str = None
+            If not None (or if client is not None), then orders for addresses that are not in the travel matrix are accepted, and the travel
+            times to and from them are downloaded (see GoogleMapsTravelMatrixBuilder.extend()). Otherwise, such orders raise a KeyError.
+
+        client = None
+            The object used to download travel times, instead of a googlemaps.Client created with google_api_key.
+        '''
+        if strategy not in RoutePlanner.STRATEGIES:
+            raise ValueError(f'strategy must be one of {RoutePlanner.STRATEGIES}, not {strategy!r}.')
+        if not isinstance(distribution_center, int) or not planner.has_inventory(distribution_center):
+            raise ValueError('distribution_center must be an index of a DistributionCenter object in the adjacency matrix')
+        self.distribution_center = distribution_center
+        self.max_payload = max_payload
+        self.avg_unload_time = avg_unload_time
+        self.strategy = strategy
+        self.neighbors = neighbors
+        self.google_api_key = google_api_key
+        self.client = client
+        self.lock = threading.Lock()
+        self.commit_lock = threading.Lock()
+        self.version = 0
+        self.__planner = planner.copy()
+        self.__addresses = {normalize_address(address): i for i, address in enumerate(self.__planner.location_store().addresses())}
+        # cancelled orders leave a delivery location with zero packages, so only the locations with at least one package are delivered
+        self.__routes = list(self.__planner.iter_routes(distribution_center, self.__planner.delivery_locations(1), max_payload, strategy))
+
+    def plan(self) -> dict:
+        '''Returns the current routes in the format returned by RoutePlanner.single_payload_and_dist(), along with the \'Version\' of the plan, which counts the changes made to it.'''
+        with self.lock:
+            planner, routes, version = self.__planner, self.__routes, self.version
+        return {**self.__summary(planner, routes), 'Version': version}
+
+    def update(self, add: list[DeliveryLocation] = (), remove: list[str] = (), commit: bool = True) -> dict:
+        '''
+        Adds and cancels customer orders, and plans the routes that they affect again.
+
+        Parameters
+        ----------
+        add: list[DeliveryLocation] = ()
+            The new orders, each for at least one package. Their packages are added to those of any earlier order for the same address
+            (after normalize_address()).
+
+        remove: list[str] = ()
+            The addresses whose orders are cancelled. Every package for the address is removed.
+
+        commit: bool = True
+            If False, then the routes that would result from the changes are returned, but the session is not changed (a what-if question).
+
+        Returns
+        -------
+        dict
+            The routes, in the format returned by plan(), with the number of \'Affected Routes\' that were dissolved and the number
+            of \'Replanned Stops\' that were planned again.
+        '''
+        if not commit:
+            with self.lock:
+                planner, routes, addresses, version = self.__planner, self.__routes, self.__addresses, self.version
+            planner, routes, _, report = self.__update(planner, routes, addresses, add, remove)
+            return {**self.__summary(planner, routes), **report, 'Version': version}
+
+        # the changes are planned without holding the lock, which is only held to read the current plan and to replace it, and no other
+        # change can replace it in between because they wait for commit_lock
+        with self.commit_lock:
+            with self.lock:
+                planner, routes, addresses = self.__planner, self.__routes, self.__addresses
+            planner, routes, addresses, report = self.__update(planner, routes, addresses, add, remove)
+            with self.lock:
+                self.__planner, self.__routes, self.__addresses = planner, routes, addresses
+                self.version += 1
+                version = self.version
+        return {**self.__summary(planner, routes), **report, 'Version': version}
+
+    def __update(self, planner: RoutePlanner, routes: list[list[int]], addresses: dict[str, int], add: list[DeliveryLocation],
+                 remove: list[str]) -> tuple[RoutePlanner, list[list[int]], dict[str, int], dict]:
+        '''
+        Returns a changed copy of planner, the routes planned for it, the index of each of its (normalized) addresses, and the report of
+        what was planned again. planner, routes, and addresses are not changed.
+        '''
+        new = {}
+        for order in add:
+            if not isinstance(order, DeliveryLocation):
+                raise TypeError('add must only contain DeliveryLocation objects.')
+            if not isinstance(order.packages, int) or order.packages < 1:
+                raise ValueError(f'The order for "{order.address}" must be for a whole number of packages, and at least one.')
+            key = normalize_address(order.address)
+            if key not in addresses and key not in new:
+                new[key] = DeliveryLocation(order.name, order.address, 0)
+        if new and self.google_api_key is None and self.client is None:
+            raise KeyError(f'"{next(iter(new.values())).address}" is not in the travel matrix.')
+        if new:
+            store, matrix = GoogleMapsTravelMatrixBuilder.extend(self.google_api_key, planner, list(new.values()), client=self.client)
+            copy = RoutePlanner.from_array(store, matrix, planner.layer_times().tolist() if planner.layer_count() > 1 else None)
+            copy.set_departure_time(planner.departure_time(), planner.avg_unload_time())
+            addresses = {**addresses, **{key: store.id(location) for key, location in new.items()}}
+        else:
+            copy = planner.copy()
+        store = copy.location_store()
+
+        changed = set()
+        for address in remove:
+            i = addresses.get(normalize_address(address))
+            if i is None or not copy.is_deliverable(i):
+                raise KeyError(f'There is no order for "{address}".')
+            store.set_packages(i, 0)
+            changed.add(i)
+        for order in add:
+            i = addresses[normalize_address(order.address)]
+            if not copy.is_deliverable(i):
+                raise ValueError(f'"{order.address}" is not a delivery location.')
+            store.add_packages(i, order.packages)
+            changed.add(i)
+        too_large = [i for i in changed if copy.packages([i])[0] > self.max_payload]
+        if too_large:
+            raise ValueError(f'The orders for "{store.addresses()[too_large[0]]}" do not fit on a delivery truck.')
+
+        routes, report = self.__replan(copy, routes, changed)
+        return copy, routes, addresses, report
+
+    def __replan(self, planner: RoutePlanner, routes: list[list[int]], changed: set[int]) -> tuple[list[list[int]], dict]:
+        '''Dissolves the routes affected by the locations in changed and plans their stops (and any new stops) again.'''
+        route_of = {stop: r for r, route in enumerate(routes) for stop in route[1:len(route) - 1]}
+        customers = set(planner.delivery_locations(1))
+        affected = {route_of[i] for i in changed if i in route_of}
+        unrouted = sorted(i for i in changed if i in customers and i not in route_of)
+        routed = np.fromiter((stop for stop in route_of if stop not in changed), dtype=np.intp)
+        if unrouted and routed.size:
+            # the routes of the nearest routed locations (in either direction) of each new stop are planned again with it
+            travel_times = np.minimum(planner.travel_times(unrouted, routed), planner.travel_times(routed, unrouted).T)
+            k = min(self.neighbors, routed.size)
+            nearest = routed[np.argpartition(travel_times, k - 1, axis=1)[:, :k]]
+            affected.update(route_of[stop] for stop in nearest.ravel().tolist())
+        stops = {stop for r in affected for stop in routes[r][1:len(routes[r]) - 1]}
+        stops = (stops | set(unrouted)) & customers
+        kept = [route for r, route in enumerate(routes) if r not in affected]
+        replanned = list(planner.iter_routes(self.distribution_center, stops, self.max_payload, self.strategy)) if stops else []
+        return kept + replanned, {'Affected Routes': len(affected), 'Replanned Stops': len(stops)}
+
+    def __summary(self, planner: RoutePlanner, routes: list[list[int]]) -> dict:
+        '''Returns routes in the format returned by RoutePlanner.single_payload_and_dist().'''
+        summary = RoutePlanner.empty_routes()
+        for route in routes:
+            planner.add_route(summary, route, self.avg_unload_time)
+        return summary
+
+
+# the maximum number of waypoints (stops between the origin and the destination) in a Google Maps URL
+MAPS_URL_MAX_WAYPOINTS = 9
+
+
+def route_maps_urls(route: list[Location], max_waypoints: int = MAPS_URL_MAX_WAYPOINTS) -> list[str]:
+    '''
+    Returns the Google Maps URLs that display a delivery route. Google Maps ignores the waypoints of a URL after the first max_waypoints,
+    so a longer route is split into legs of at most max_waypoints stops between their origin and destination, and each leg starts at the
+    stop where the one before it ended.
+    '''
+    if max_waypoints < 0:
+        raise ValueError('max_waypoints must not be negative.')
+    urls = []
+    for start in range(0, max(1, len(route) - 1), max_waypoints + 1):
+        leg = route[start:start + max_waypoints + 2]
+        query = {'api': 1, 'origin': leg[0].address, 'destination': leg[-1].address, 'travelmode': 'driving'}
+        if len(leg) > 2:
+            query['waypoints'] = '|'.join(location.address for location in leg[1:len(leg) - 1])
+        urls.append('https://www.google.com/maps/dir/?' + urlencode(query))
+    return urls
+
+
+class RouteExporter:
+    '''
+    Writes delivery routes to a file one at a time, so that each route can be written as soon as it is planned (see RoutePlanner.export_routes())
+    and a dispatch system reading the file can start on the first routes before the last ones are planned. Each route is written as one line
+    of json (\'jsonl\'), as one csv row per stop (\'csv\'), or as the Google Maps URLs that display it, one per line after its route number
+    and a tab (\'urls\', see route_maps_urls()). The file is flushed after each route, and nothing is kept but the number of routes written.
+    '''
+
+    # the supported file formats
+    FORMATS = ('jsonl', 'csv', 'urls')
+
+    # the columns of the csv format
+    CSV_COLUMNS = ('Route', 'Stop', 'Name', 'Address', 'Packages')
+
+    def __init__(self, file, format: str = 'jsonl', max_waypoints: int = MAPS_URL_MAX_WAYPOINTS, open_in_browser: bool = False):
+        '''
+        Parameters
+        ----------
+        file
+            A text file opened for writing (with newline=\'\' if format is \'csv\'), such as sys.stdout.
+
+        format: str = \'jsonl\'
+            One of FORMATS.
 
+        max_waypoints: int = MAPS_URL_MAX_WAYPOINTS
+            The maximum number of waypoints in each Google Maps URL.
 
-def open_route_in_browser(route: list[Location]) -> None:
-    '''Opens a new tab in a web browser and displays the delivery route in Google Maps.'''
-    url = 'https://www.google.com/maps/dir/'
-    for location in route:
-        url += location.address.replace(' ', '+') + '/'
-    webbrowser.open(url, new=2)
+        open_in_browser: bool = False
+            If True, then each route is also opened in a web browser (see open_route_in_browser()).
+        '''
+        if format not in RouteExporter.FORMATS:
+            raise ValueError(f'format must be one of {RouteExporter.FORMATS}, not {format!r}.')
+        self.file = file
+        self.format = format
+        self.max_waypoints = max_waypoints
+        self.open_in_browser = open_in_browser
+        self.routes = 0
+        self.late_routes = 0
+        self.__csv = csv.writer(file) if format == 'csv' else None
+        if self.__csv is not None:
+            self.__csv.writerow(RouteExporter.CSV_COLUMNS)
+
+    def write(self, route: dict) -> None:
+        '''Writes a route in the format of the \'Routes\' returned by RoutePlanner.single_payload_and_dist(), numbering the routes from one.'''
+        self.routes += 1
+        self.late_routes += route.get('Late Time', 0) > 0
+        locations = route['Delivery Locations']
+        if self.format == 'jsonl':
+            # Location objects (the \'Delivery Locations\', and the \'Distribution Center\' of a multi-depot route) are written as their json
+            record = {'Route': self.routes, **{key: value.json() if isinstance(value, Location) else value for key, value in route.items()},
+                      'Delivery Locations': [location.json() for location in locations], 'Maps URLs': route_maps_urls(locations, self.max_waypoints)}
+            self.file.write(json.dumps(record) + '\n')
+        elif self.format == 'csv':
+            self.__csv.writerows([self.routes, stop, location.name, location.address, getattr(location, 'packages', 0)] for stop, location in enumerate(locations))
+        else:
+            self.file.writelines(f'{self.routes}\t{url}\n' for url in route_maps_urls(locations, self.max_waypoints))
+        self.file.flush()
+        if self.open_in_browser:
+            open_route_in_browser(locations, self.max_waypoints)
+
+
+def open_route_in_browser(route: list[Location], max_waypoints: int = MAPS_URL_MAX_WAYPOINTS) -> None:
+    '''Opens a new tab in a web browser for each leg of the delivery route (see route_maps_urls()) and displays it in Google Maps.'''
+    import webbrowser
+    for url in route_maps_urls(route, max_waypoints):
+        webbrowser.open(url, new=2)
 
 
 def write_trips_to_json(trips: set[Trip], file_name: str) -> None:
@@ -551,9 +3594,235 @@ def write_trips_to_json(trips: set[Trip], file_name: str) -> None:
         f.write(json.dumps(json_data))
 
 
+@Instrumentation.timed('read_trips_from_json')
 def read_trips_from_json(file_name: str) -> set[Trip]:
     '''Loads a set of trips from a json file.'''
     with open(file_name, 'rt') as f:
         json_data = json.load(f)
     trip_list = json_data['Trips']
     return set(Trip.build(t) for t in trip_list)
+
+
+def normalize_address(address: str) -> str:
+    '''Returns the form of address that is used to recognize repeat orders: case folded, with runs of whitespace collapsed, one space after each comma, and no trailing period.'''
+    return re.sub(r'\s*,\s*', ', ', ' '.join(address.split())).rstrip('.').casefold()
+
+
+@Instrumentation.timed('read_customer_orders')
+def read_customer_orders(file_name: str, store: LocationStore = None, address_column: str = 'address', packages_column: str = 'bags', name_column: str = 'name',
+                         max_errors: int = 100, window_columns: tuple[str, str] = ('window_start', 'window_end')) -> tuple[LocationStore, dict]:
+    '''
+    Streams customer orders from a CSV file into a LocationStore, one row at a time, so memory grows with the number of different
+    addresses rather than the number of order lines. Orders whose addresses are the same after normalize_address() are merged into one
+    delivery location, and their packages are added together. Rows that cannot be used are counted and reported, but do not stop the import.
+
+    Parameters
+    ----------
+    file_name: str
+        The path and filename of the CSV file. The first row must be a header naming the columns.
+
+    store: LocationStore = None
+        The store to add the delivery locations to, which may already contain the distribution centers. If None, then a new store is created.
+
+    address_column: str = 'address'
+        The name of the column containing the delivery address.
+
+    packages_column: str = 'bags'
+        The name of the column containing the number of packages in the order.
+
+    name_column: str = 'name'
+        The name of the (optional) column containing the name of the customer.
+
+    max_errors: int = 100
+        The maximum number of bad rows that are described in the report. Every bad row is counted.
+
+    window_columns: tuple[str, str] = ('window_start', 'window_end')
+        The names of the (optional) columns containing the time of day, as "HH:MM", when the delivery window opens and closes. A blank
+        opening or closing time leaves that end of the window open. The time windows of repeat orders are intersected (see LocationStore.set_time_windows()).
+
+    Returns
+    -------
+    tuple[LocationStore, dict]
+        The store, and a dict containing the number of \'Rows\' read, \'Orders\' accepted, new \'Locations\' added, orders merged into an
+        earlier location (\'Duplicates\'), \'Bad Rows\', and a list of \'Errors\' describing the first max_errors bad rows.
+    '''
+    store = LocationStore() if store is None else store
+    ids = {normalize_address(address): i for i, address in enumerate(store.addresses())}
+    not_deliverable = set(np.flatnonzero(store.kinds() != LocationStore.DELIVERY_LOCATION).tolist())
+    spellings = {}  # the id of each address exactly as it was written, so most repeat orders skip normalize_address()
+    merged = {}  # the packages of repeat orders, which are added to the store at the end in a single vectorized operation
+    report = {'Rows': 0, 'Orders': 0, 'Locations': 0, 'Duplicates': 0, 'Bad Rows': 0, 'Errors': []}
+
+    def reject(line: int, reason: str) -> None:
+        report['Bad Rows'] += 1
+        if len(report['Errors']) < max_errors:
+            report['Errors'].append(f'line {line}: {reason}')
+
+    with open(file_name, 'rt', newline='') as f:
+        reader = csv.reader(f)
+        header = [column.strip().casefold() for column in next(reader, [])]
+        if address_column.casefold() not in header or packages_column.casefold() not in header:
+            raise ValueError(f'{file_name} must have a header row with "{address_column}" and "{packages_column}" columns.')
+        address_at, packages_at = header.index(address_column.casefold()), header.index(packages_column.casefold())
+        name_at = header.index(name_column.casefold()) if name_column.casefold() in header else None
+        windows_at = [header.index(column.casefold()) for column in window_columns if column.casefold() in header]
+        windows_at = windows_at if len(windows_at) == 2 else None
+        windows = {}  # the time window of each location, which is added to the store at the end
+
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                break
+            except csv.Error as err:
+                report['Rows'] += 1
+                reject(reader.line_num, str(err))
+                continue
+            if not row:
+                continue
+            report['Rows'] += 1
+            if len(row) <= max(address_at, packages_at):
+                reject(reader.line_num, 'missing the address or packages')
+                continue
+            address = ' '.join(row[address_at].split())
+            if not address:
+                reject(reader.line_num, 'missing the address')
+                continue
+            try:
+                packages = int(row[packages_at])
+            except ValueError:
+                reject(reader.line_num, f'the number of packages ("{row[packages_at]}") is not an integer')
+                continue
+            if packages < 1:
+                reject(reader.line_num, f'the number of packages ({packages}) must be at least one')
+                continue
+            window = None
+            if windows_at is not None:
+                window = [row[at].strip() if at < len(row) else '' for at in windows_at]
+                try:
+                    window = (seconds_of_day(window[0]) if window[0] else 0, seconds_of_day(window[1]) if window[1] else LocationStore.ALWAYS_OPEN)
+                except ValueError as err:
+                    reject(reader.line_num, str(err))
+                    continue
+                if window[0] > window[1]:
+                    reject(reader.line_num, 'the time window closes before it opens')
+                    continue
+
+            i = spellings.get(address)
+            if i is None:
+                key = normalize_address(address)
+                i = ids.get(key)
+                if i is None:
+                    name = row[name_at].strip() if name_at is not None and name_at < len(row) else ''
+                    i = ids[key] = store.add(DeliveryLocation(name, address, packages))
+                    spellings[address] = i
+                    if window is not None:
+                        windows[i] = window
+                    report['Locations'] += 1
+                    report['Orders'] += 1
+                    continue
+                spellings[address] = i
+            if i in not_deliverable:
+                reject(reader.line_num, f'"{address}" is the address of a distribution center')
+                continue
+            if window is not None:
+                earlier = windows.get(i) or tuple(int(times[i]) for times in store.time_windows())
+                window = (max(window[0], earlier[0]), min(window[1], earlier[1]))
+                if window[0] > window[1]:
+                    reject(reader.line_num, f'the time window does not overlap the time window of an earlier order for "{address}"')
+                    continue
+                windows[i] = window
+            merged[i] = merged.get(i, 0) + packages
+            report['Duplicates'] += 1
+            report['Orders'] += 1
+
+    if merged:
+        store.add_packages(np.fromiter(merged.keys(), dtype=np.intp, count=len(merged)), np.fromiter(merged.values(), dtype=np.int64, count=len(merged)))
+    if windows:
+        opens, closes = np.array(list(windows.values()), dtype=np.int64).T
+        store.set_time_windows(np.fromiter(windows.keys(), dtype=np.intp, count=len(windows)), opens, closes)
+    return store, report
+
+
+# the first bytes of every file written by write_matrix_file()
+MATRIX_FILE_MAGIC = b'DLMATRIX'
+MATRIX_FILE_VERSION = 1
+MATRIX_FILE_LAYERED_VERSION = 2
+MATRIX_FILE_EXTENSION = '.dlm'
+
+
+def write_matrix_file(matrix: TravelMatrix, file_name: str) -> None:
+    '''
+    Writes a travel matrix to a compact binary file, which can be loaded with read_matrix_file() without creating any Trip objects.
+
+    The file contains a header (the magic bytes b'DLMATRIX', then the version, the number of locations n, and the length of the
+    location table as little-endian uint32, uint32, and uint64), a location table in json format padded to a multiple of 8 bytes,
+    and finally the n x n travel times as a block of little-endian int32 values in row major order.
+
+    If the travel times depend on the time of day, or any location has a time window, then the file is written in version 2, where the
+    location table is a json object with the \'Locations\', the \'Layer Times\', and the \'Time Windows\' (a list of [open, close] pairs),
+    and the block holds every n x n layer of travel times, one after the other.
+    '''
+    layered = matrix.layer_count() > 1 or matrix.location_store().has_time_windows()
+    travel_times = matrix.layered_array() if layered else matrix.array()
+    if travel_times.size and (travel_times.min() < np.iinfo(np.int32).min or travel_times.max() > np.iinfo(np.int32).max):
+        raise ValueError('The travel times do not fit in a 32-bit integer.')
+    table = [loc.json() for loc in matrix.locations()]
+    if layered:
+        opens, closes = matrix.location_store().time_windows()
+        table = {'Locations': table, 'Layer Times': matrix.layer_times().tolist(), 'Time Windows': np.stack([opens, closes], axis=1).tolist()}
+    table = json.dumps(table).encode('utf-8')
+    table += b' ' * (-(len(MATRIX_FILE_MAGIC) + 16 + len(table)) % 8)
+    with open(file_name, 'wb') as f:
+        f.write(MATRIX_FILE_MAGIC)
+        f.write(np.array([MATRIX_FILE_LAYERED_VERSION if layered else MATRIX_FILE_VERSION, matrix.location_count()], dtype='<u4').tobytes())
+        f.write(np.array([len(table)], dtype='<u8').tobytes())
+        f.write(table)
+        f.write(np.ascontiguousarray(travel_times, dtype='<i4').tobytes())
+
+
+def is_matrix_file(file_name: str) -> bool:
+    '''Returns true if file_name was written by write_matrix_file().'''
+    with open(file_name, 'rb') as f:
+        return f.read(len(MATRIX_FILE_MAGIC)) == MATRIX_FILE_MAGIC
+
+
+@Instrumentation.timed('read_matrix_file')
+def read_matrix_file(file_name: str):
+    '''
+    Loads a RoutePlanner from a file written by write_matrix_file(). The travel times are memory-mapped (read only)
+    rather than read into memory, so the planner is ready as soon as the location table has been parsed.
+    '''
+    with open(file_name, 'rb') as f:
+        if f.read(len(MATRIX_FILE_MAGIC)) != MATRIX_FILE_MAGIC:
+            raise ValueError(f'{file_name} is not a travel matrix file.')
+        version, n = np.frombuffer(f.read(8), dtype='<u4').tolist()
+        if version not in (MATRIX_FILE_VERSION, MATRIX_FILE_LAYERED_VERSION):
+            raise ValueError(f'{file_name} has an unsupported version ({version}).')
+        table_length = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+        table = json.loads(f.read(table_length).decode('utf-8'))
+    layer_times = table['Layer Times'] if version == MATRIX_FILE_LAYERED_VERSION else [0]
+    locations = LocationStore(Location.build(jd) for jd in (table['Locations'] if version == MATRIX_FILE_LAYERED_VERSION else table))
+    if len(locations) != n:
+        raise ValueError(f'{file_name} is corrupt: expected {n} locations, but found {len(locations)}.')
+    if version == MATRIX_FILE_LAYERED_VERSION and n:
+        windows = np.array(table['Time Windows'], dtype=np.int64).reshape(n, 2)
+        locations.set_time_windows(np.arange(n), windows[:, 0], windows[:, 1])
+    offset = len(MATRIX_FILE_MAGIC) + 16 + table_length
+    shape = (len(layer_times), n, n)
+    travel_times = np.memmap(file_name, dtype='<i4', mode='r', offset=offset, shape=shape) if n else np.zeros(shape, dtype='<i4')
+    if len(layer_times) == 1:
+        return RoutePlanner.from_array(locations, travel_times[0])
+    return RoutePlanner.from_array(locations, travel_times, layer_times)
+
+
+def read_planner_file(file_name: str) -> RoutePlanner:
+    '''Loads a RoutePlanner from a file written by write_matrix_file() or by write_trips_to_json().'''
+    if is_matrix_file(file_name):
+        return read_matrix_file(file_name)
+    return RoutePlanner(read_trips_from_json(file_name))
+
+
+def convert_json_to_matrix_file(json_file_name: str, matrix_file_name: str) -> None:
+    '''Converts a json file written by write_trips_to_json() into a binary file written by write_matrix_file().'''
+    write_matrix_file(TravelMatrix(read_trips_from_json(json_file_name)), matrix_file_name)
@@ -1,49 +1,201 @@
 
 import DeliveryLogistics
-import csv
+import sys
 import argparse
+import json
+import time
+from datetime import datetime
 
 epilog = 'Thank you for using the DeliveryLogistics Python Module!'
 description = "Welcome to Delivery Logistics, a program to calculate efficient delivery routes and display them in Google Maps in a browser."
 dist_ctr = '''
-The name (or description) and full address of the distribution center.
+The name (or description) and full address of the distribution center. Repeat this option once for each distribution center.
 The address must be a complete and valid address.
 Be sure to enclose the name/description in quotation marks if it contains spaces. The address should also be enclosed in quotation marks.
 '''
 
+def plan_routes(planner: DeliveryLogistics.RoutePlanner, distribution_ctrs: list[int], args: argparse.Namespace) -> dict:
+    '''Calculates the delivery routes from distribution_ctrs with the options on the command line.'''
+    if not distribution_ctrs:
+        raise ValueError('The travel times do not include a distribution center to plan the routes from.')
+    # the anytime strategy only plans single routes from one distribution center, and starts from the savings routes otherwise used here
+    strategy = 'savings' if args.strategy == 'anytime' else args.strategy
+    if args.fleet:
+        if len(distribution_ctrs) > 1:
+            raise ValueError('The --fleet option can only plan the routes of a single distribution center (use -b with --each_dist_ctr to plan each one separately).')
+        fleet = [DeliveryLogistics.Vehicle(*vehicle.split(':')) for vehicle in args.fleet]
+        routes = planner.mixed_fleet_single_dist(distribution_ctrs.pop(), fleet, 0, max(v.capacity for v in fleet), args.avg_unload_secs, workers=args.workers)
+        if len(routes['Undelivered Locations']):
+            print('Undelivered Locations', len(routes['Undelivered Locations']), '(not enough vehicles)', file=sys.stderr)
+    elif len(distribution_ctrs) > 1:
+        routes = planner.single_payload_multi_dist(distribution_ctrs, 0, args.max_payload, args.max_payload, args.avg_unload_secs, strategy=strategy, workers=args.workers)
+        if len(routes['Unassigned Locations']):
+            print('Unassigned Locations', len(routes['Unassigned Locations']), '(not enough inventory)', file=sys.stderr)
+    elif args.cluster:
+        routes = planner.clustered_single_dist(distribution_ctrs.pop(), 0, args.max_payload, args.max_payload, args.avg_unload_secs, routes_per_cluster=args.cluster, strategy=strategy, workers=args.workers)
+    elif args.strategy == 'anytime':
+        routes = planner.anytime_single_dist(distribution_ctrs.pop(), 0, args.max_payload, args.max_payload, args.avg_unload_secs, args.time_budget,
+                                             callback=lambda total, seconds: print('Best Total Delivery Time', round(total / 3600, 2), 'hours after', round(seconds, 1), 'seconds', file=sys.stderr))
+    elif args.strategy == 'savings':
+        routes = planner.savings_single_dist(distribution_ctrs.pop(), 0, args.max_payload, args.max_payload, args.avg_unload_secs)
+    else:
+        routes = planner.single_payload_and_dist(distribution_ctrs.pop(), 0, args.max_payload, args.max_payload, args.avg_unload_secs, incremental=args.strategy == 'incremental', workers=args.workers)
+    return routes
+
+
+def export_routes(planner: DeliveryLogistics.RoutePlanner, distribution_ctrs: list[int], args: argparse.Namespace) -> dict:
+    '''
+    Writes each route to args.export_file (or stdout) in the args.export format as soon as it is planned, and returns the totals. The strategies
+    that only finish their routes at the end (and the --fleet and --cluster options) write every route as soon as planning finishes.
+    '''
+    file = sys.stdout if args.export_file in (None, '-') else open(args.export_file, 'wt', newline='')
+    pool = None
+    try:
+        exporter = DeliveryLogistics.RouteExporter(file, args.export, open_in_browser=args.browser)
+        if len(distribution_ctrs) == 1 and args.strategy in DeliveryLogistics.RoutePlanner.STRATEGIES and not (args.fleet or args.cluster):
+            delivery_locations = planner.delivery_locations(0, args.max_payload)
+            if args.workers > 1 and args.strategy != 'savings' and len(delivery_locations):
+                pool = DeliveryLogistics.RoutePool(planner, args.workers)
+            routes = planner.export_routes(planner.iter_routes(distribution_ctrs[0], delivery_locations, args.max_payload, args.strategy, pool), exporter, args.avg_unload_secs)
+        else:
+            routes = plan_routes(planner, distribution_ctrs, args)
+            for route in routes['Routes']:
+                exporter.write(route)
+    finally:
+        if pool is not None:
+            pool.close()
+        if file is not sys.stdout:
+            file.close()
+    print('Exported Routes', exporter.routes, file=sys.stderr)
+    if exporter.late_routes:
+        print('Late Routes', exporter.late_routes, '(some deliveries miss their time windows)', file=sys.stderr)
+    return routes
+
+
+def print_summary(routes: dict, file=sys.stdout) -> None:
+    '''Prints the summary stats of the routes.'''
+    print('Total Packages', routes['Total Packages'], file=file)
+    print('Total Travel Time', round(routes['Total Travel Time'] / 3600, 1), 'hours', file=file)
+    print('Total Unload Time', round(routes['Total Unload Time'] / 3600, 1), 'hours', file=file)
+    print('Total Delivery Time', round(routes['Total Delivery Time'] / 3600, 1), 'hours', file=file)
+    late = [route for route in routes['Routes'] if route.get('Late Time', 0) > 0]
+    if late:
+        print('Late Routes', len(late), '(some deliveries miss their time windows)', file=file)
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    '''
+    Plans the routes of each file in args.batch in turn (from each of its distribution centers separately if args.each_dist_ctr is set), and
+    prints the summary of each plan as one line of json. A file that cannot be planned is reported and skipped. Returns the exit status.
+    '''
+    status = 0
+    for file_name in args.batch:
+        start = time.perf_counter()
+        try:
+            planner = DeliveryLogistics.read_planner_file(file_name)
+            planner.set_departure_time(args.departure if args.departure else datetime.now(), args.avg_unload_secs)
+            distribution_ctrs = planner.distribution_centers()
+            groups = [[dist_ctr] for dist_ctr in sorted(distribution_ctrs)] if args.each_dist_ctr else [distribution_ctrs]
+            for group in groups:
+                addresses = [planner.location(dist_ctr).address for dist_ctr in sorted(group)]
+                routes = plan_routes(planner, group, args)
+                print(json.dumps({'File': file_name, 'Distribution Centers': addresses, 'Routes': len(routes['Routes']),
+                                  **{key: value for key, value in routes.items() if key.startswith('Total')},
+                                  'Late Routes': sum(route.get('Late Time', 0) > 0 for route in routes['Routes']),
+                                  **{key: len(routes[key]) for key in ('Undelivered Locations', 'Unassigned Locations') if key in routes},
+                                  'Seconds': round(time.perf_counter() - start, 3)}), flush=True)
+                start = time.perf_counter()
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            print('Could not plan the routes of', file_name, '-', err, file=sys.stderr)
+            status = 1
+    return status
+
+
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(epilog=epilog, description=description)
     parser.add_argument('-v', '--version', action='version', version='%(prog)s 1.0')
     parser.add_argument('-d', '--dist_ctr', help=dist_ctr, nargs=2, metavar=('[name or description]', '[full address]'), type=str, action='extend')
-    parser.add_argument('-f', '--from_file', help='Calculate routes using a local file instead of using googlemaps.', metavar=('[File name and path]'), type=str, action='store')
+    parser.add_argument('-f', '--from_file', help='Calculate routes using a local file (json or .dlm) instead of using googlemaps.', metavar=('[File name and path]'), type=str, action='store')
     parser.add_argument('-k', '--key', help='Google api key. Only include this option if not including the -f option.', metavar=('[Google API Key]'), type=str, action='store')
     parser.add_argument('-c', '--cust_orders', help='Path and filename for a list of customer orders in CSV format.', metavar=('[File name and path]'), type=str, action='store')
     parser.add_argument('-u', '--avg_unload_secs', default=11, help='The average amount of time (in seconds) that it takes to unload a single item from the delivery truck.', metavar=('[Avg no. of seconds]'), type=int, action='store')
     parser.add_argument('-m', '--max_payload', default=330, help='The maximum payload of the delivery truck.', metavar=('[Maximum payload]'), type=int, action="store")
-    parser.add_argument('-o', '--output_file', help='The path and filename of the file to which to save the trips data after downloading with the googlemaps module.', metavar=('[File name and path]'), type=int, action='store')
+    parser.add_argument('-o', '--output_file', help='The path and filename of the file to which to save the trips data. The file is saved in the compact binary '
+                                                    'format if its name ends with .dlm, or in json format otherwise.', metavar=('[File name and path]'), type=str, action='store')
+    parser.add_argument('-x', '--distance_matrix', help='Download travel times with batched Distance Matrix API requests instead of one Directions API request per pair of locations.', action='store_true')
+    parser.add_argument('-n', '--nearest', help='Only download the travel times from each customer to this many of its nearest neighbors (at most 25), and to '
+                                                'and from the distribution centers, and estimate the rest from straight line distances. Makes it practical to '
+                                                'plan thousands of stops.', metavar=('[Number of neighbors]'), type=int, action='store')
+    parser.add_argument('--download_workers', default=1, help='The number of Distance Matrix API requests to send at the same time. Only used with the -x and -n options.', metavar=('[Number of workers]'), type=int, action='store')
+    parser.add_argument('--rate_limit', help='The maximum number of Distance Matrix API requests per second. Only used with the -x and -n options.', metavar=('[Requests per second]'), type=float, action='store')
+    parser.add_argument('--checkpoint', help='Path and filename of a checkpoint file used to resume an interrupted download. Only used with the -x option.', metavar=('[File name and path]'), type=str, action='store')
+    parser.add_argument('--cache', help='Path and filename of a travel time cache, so that only new or stale pairs of locations are downloaded. Only used with the -x option.', metavar=('[File name and path]'), type=str, action='store')
+    parser.add_argument('--departure_buckets', help='Download one layer of travel times for each of these times of day (as HH:MM), so that each trip uses the '
+                                                    'traffic at the time of day it starts. Only used with the -x option.', metavar=('[HH:MM]'), type=str, nargs='+', action='store')
+    parser.add_argument('--departure', help='The time of day (as HH:MM) at which the delivery trucks leave the distribution center. Defaults to the current time.', metavar=('[HH:MM]'), type=str, action='store')
+    parser.add_argument('--cache_ttl', default=30, help='The number of days that a travel time stays in the cache.', metavar=('[Number of days]'), type=float, action='store')
+    parser.add_argument('-s', '--strategy', default='tree', choices=['tree', 'incremental', 'savings', 'anytime'],
+                        help='The route planning strategy. "tree" rebuilds every candidate route on each pass, "incremental" only rebuilds the candidates affected by the last '
+                             'route, which is faster but usually results in longer routes than "tree", "savings" uses the much faster Clarke-Wright savings algorithm, and "anytime" '
+                             'improves the savings routes until the --time_budget runs out.', type=str, action='store')
+    parser.add_argument('--time_budget', default=10, help='The number of seconds that the "anytime" strategy plans for. The best total delivery time so far is printed each time it improves.', metavar=('[Seconds]'), type=float, action='store')
+    parser.add_argument('-w', '--workers', default=1, help='The number of processes used to calculate candidate delivery routes.', metavar=('[Number of processes]'), type=int, action='store')
+    parser.add_argument('--cluster', help='Partition the customers into clusters of at most this many truckloads, and plan the routes of each cluster '
+                                          'independently (in parallel with -w). Much faster for large numbers of customers, but the routes may be a little '
+                                          'longer.', metavar=('[Number of routes]'), type=int, action='store')
+    parser.add_argument('--fleet', help='A type of delivery vehicle, as NAME:CAPACITY or NAME:CAPACITY:COUNT where COUNT is the number of routes it can run. '
+                                        'Repeat this option once for each type of vehicle. Overrides -m.', metavar=('[Vehicle]'), type=str, action='append')
+    parser.add_argument('-e', '--export', help='Write each route to the --export_file as soon as it is planned, as one line of json per route ("jsonl"), one '
+                                               'csv row per stop ("csv"), or Google Maps URLs of at most 9 waypoints each ("urls"), instead of displaying the '
+                                               'routes in the browser.', choices=DeliveryLogistics.RouteExporter.FORMATS, type=str, action='store')
+    parser.add_argument('--export_file', help='Path and filename of the file to which the -e option writes the routes. Defaults to the standard output, in '
+                                              'which case the summary stats are printed to the standard error.', metavar=('[File name and path]'), type=str, action='store')
+    parser.add_argument('--browser', help='With the -e option, also display each route in Google Maps in the browser.', action='store_true')
+    parser.add_argument('-b', '--batch', help='Calculate the routes of each of these local files (json or .dlm) in turn, in a single process, and print the '
+                                              'summary of each plan as one line of json instead of displaying the routes.', metavar=('[File name and path]'), type=str, nargs='+', action='store')
+    parser.add_argument('--each_dist_ctr', help='With the -b option, calculate the routes from each distribution center in a file separately, as if it were the only one.', action='store_true')
+    parser.add_argument('--profile', help='Print the number of calls and the time spent in each stage of downloading travel times and calculating routes.', action='store_true')
     args = parser.parse_args()
+    if args.nearest and args.output_file:
+        parser.error('the -o option cannot save the estimated travel times of the -n option.')
+    if args.departure_buckets and args.output_file and not args.output_file.endswith(DeliveryLogistics.MATRIX_FILE_EXTENSION):
+        parser.error(f'the -o option can only save the travel times of the --departure_buckets option to a {DeliveryLogistics.MATRIX_FILE_EXTENSION} file.')
+
+    if args.batch and (args.from_file or args.cust_orders or args.output_file):
+        parser.error('the -b option cannot be combined with the -f, -c or -o options.')
+
+    if args.profile:
+        DeliveryLogistics.Instrumentation.enable()
+
+    if args.batch:
+        status = run_batch(args)
+        if args.profile:
+            DeliveryLogistics.Instrumentation.print_report()
+        sys.exit(status)
 
     if args.from_file:
 
-        trips = DeliveryLogistics.read_trips_from_json(args.from_file)
+        planner = DeliveryLogistics.read_planner_file(args.from_file)
 
     # get the trips data from googlemaps
     else:
 
         # get the distribution center passed in by the user
         if args.dist_ctr:
-            distributionCenters = set([DeliveryLogistics.DistributionCenter(args.dist_ctr[0], args.dist_ctr[1])])
+            distributionCenters = set(DeliveryLogistics.DistributionCenter(args.dist_ctr[i], args.dist_ctr[i + 1]) for i in range(0, len(args.dist_ctr), 2))
         else:
             raise ValueError('Expected "-d [distribution center name] [distribution center address]" as command line parameters.')
 
-        # load our list of customers
+        # load our list of customers, merging repeat orders from the same address
         if args.cust_orders:
-            customer_orders = set()
-            with open(args.cust_orders, 'rt', newline='') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    customer_orders.add(DeliveryLogistics.DeliveryLocation('', row['address'], row['bags']))
+            orders, report = DeliveryLogistics.read_customer_orders(args.cust_orders)
+            print('Read', report['Orders'], 'orders for', report['Locations'], 'delivery locations', f'({report["Duplicates"]} repeat orders merged).', file=sys.stderr)
+            if report['Bad Rows']:
+                print('Skipped', report['Bad Rows'], 'bad rows in', args.cust_orders, file=sys.stderr)
+                for error in report['Errors']:
+                    print('   ', error, file=sys.stderr)
+            customer_orders = set(orders.records())
         else:
             raise ValueError('Expected -c [customer sales orders file path and name] as a command line paramter.')
 
@@ -54,26 +206,59 @@ if __name__ == "__main__":
             raise ValueError('Expected -k [google api key] as a command line parameter.')
 
         # get the data from google maps
-        trips = DeliveryLogistics.GoogleMapsTripSetBuilder.build(google_api_key, customer_orders, distributionCenters)
+        if args.nearest:
+            locations, sparse = DeliveryLogistics.GoogleMapsSparseMatrixBuilder.build(google_api_key, customer_orders, distributionCenters, k=args.nearest,
+                                                                                      workers=args.download_workers, rate_limit=args.rate_limit)
+            planner = DeliveryLogistics.RoutePlanner.from_array(locations, sparse)
+        elif args.distance_matrix:
+            cache = DeliveryLogistics.TravelTimeCache(args.cache, args.cache_ttl * 24 * 3600) if args.cache else None
+            departure_times = None
+            if args.departure_buckets:
+                departure_times = DeliveryLogistics.GoogleMapsTravelMatrixBuilder.departure_buckets(sorted(args.departure_buckets, key=DeliveryLogistics.seconds_of_day))
+            locations, matrix = DeliveryLogistics.GoogleMapsTravelMatrixBuilder.build(google_api_key, customer_orders, distributionCenters,
+                                                                                     workers=args.download_workers, rate_limit=args.rate_limit, checkpoint_file=args.checkpoint, cache=cache,
+                                                                                     departure_times=departure_times)
+            if cache is not None:
+                stats = cache.stats()
+                print('Travel time cache:', stats['Hits'], 'hits,', stats['Misses'], 'misses,', round(stats['Hit Rate'] * 100, 1), '% of the pairs were reused', file=sys.stderr)
+                cache.close()
+            planner = DeliveryLogistics.RoutePlanner.from_array(locations, matrix, departure_times)
+        else:
+            planner = DeliveryLogistics.RoutePlanner(DeliveryLogistics.GoogleMapsTripSetBuilder.build(google_api_key, customer_orders, distributionCenters))
+
+        # the planner has its own copy of the locations, so give it the customers' time windows
+        planner.location_store().copy_time_windows(orders)
 
-        # save the trips to a file if that's what the user wants
-        if args.output_file:
-            DeliveryLogistics.write_trips_to_json(trips, args.output_file)
+    # save the travel times to a file if that's what the user wants
+    if args.output_file:
+        if args.output_file.endswith(DeliveryLogistics.MATRIX_FILE_EXTENSION):
+            DeliveryLogistics.write_matrix_file(planner, args.output_file)
+        elif planner.layer_count() > 1:
+            raise ValueError(f'A json file can only hold one layer of travel times. Save the time-of-day layers to a {DeliveryLogistics.MATRIX_FILE_EXTENSION} file instead.')
+        elif planner.location_store().has_time_windows():
+            raise ValueError(f'A json file cannot hold the delivery time windows. Save them to a {DeliveryLogistics.MATRIX_FILE_EXTENSION} file instead.')
+        else:
+            DeliveryLogistics.write_trips_to_json(planner.trips(), args.output_file)
 
-    # instantiate a route planning object
-    planner = DeliveryLogistics.RoutePlanner(trips)
+    # start the clock of every route at the departure time
+    planner.set_departure_time(args.departure if args.departure else datetime.now(), args.avg_unload_secs)
 
-    # get the distribution center
-    distribution_ctr = planner.distribution_centers().pop()
+    # calculate the delivery routes, and write each one to the export file as soon as it is planned if that's what the user wants
+    if args.export:
+        routes = export_routes(planner, planner.distribution_centers(), args)
+        print_summary(routes, sys.stderr)
+        if args.profile:
+            DeliveryLogistics.Instrumentation.print_report()
+        sys.exit(0)
 
-    # calculate the delivery routes
-    routes = planner.single_payload_and_dist(distribution_ctr, 0, args.max_payload, args.max_payload, args.avg_unload_secs)
+    routes = plan_routes(planner, planner.distribution_centers(), args)
 
     # print the summary stats
-    print('Total Packages', routes['Total Packages'])
-    print('Total Travel Time', round(routes['Total Travel Time'] / 3600, 1), 'hours')
-    print('Total Unload Time', round(routes['Total Unload Time'] / 3600, 1), 'hours')
-    print('Total Delivery Time', round(routes['Total Delivery Time'] / 3600, 1), 'hours')
+    print_summary(routes)
+
+    # print where the time went if that's what the user wants
+    if args.profile:
+        DeliveryLogistics.Instrumentation.print_report()
 
     # display the routes in google maps via the browser
     for route in routes['Routes']:
@@ -0,0 +1,229 @@
+
+import DeliveryLogistics
+import numpy as np
+import argparse
+import json
+import platform
+import sys
+import time
+
+description = 'Benchmarks the DeliveryLogistics route planners on synthetic travel matrices, without using googlemaps.'
+epilog = 'Each result is printed as one line of json, so the output of two versions can be compared with --compare.'
+
+# the synthetic layouts of delivery locations
+LAYOUTS = ('random', 'clustered', 'grid')
+
+# the synthetic distributions of packages per delivery location
+PACKAGE_DISTRIBUTIONS = ('uniform', 'skewed')
+
+# the stages of route planning that are timed
+STAGES = ('matrix_from_array', 'matrix_from_triples', 'matrix_from_trips', 'minimum_spanning_tree', 'brute_force_optimize', 'held_karp_optimize',
+          'triangle_optimize', 'local_search_optimize', 'single_payload_and_dist', 'incremental', 'savings_single_dist', 'mixed_fleet_single_dist',
+          'clustered_single_dist', 'time_dependent_single_dist', 'anytime_single_dist')
+
+# the time of day at which each layer of the time-dependent benchmark starts, and how much slower than the synthetic travel times it is
+RUSH_HOUR_LAYERS = (('00:00', 1.0), ('07:00', 1.6), ('10:00', 1.1), ('16:00', 1.4))
+
+
+def synthetic_travel_times(n: int, layout: str, rng: np.random.Generator) -> np.ndarray:
+    '''
+    Returns an n x n matrix of travel times in seconds for one of the LAYOUTS:
+
+    random: every travel time is drawn independently, so the matrix is asymmetric and has no geography at all.
+    clustered: the locations are grouped around a few towns in a 30 km square, and travel times are the straight line distance at 12 m/s.
+    grid: the locations sit on the blocks of a city grid (100 m blocks), and travel times are the Manhattan distance at 8 m/s.
+
+    Geographic layouts get up to 20% of asymmetric noise (one way streets, turns) plus one minute to park.
+    '''
+    if layout == 'random':
+        matrix = rng.integers(120, 3600, size=(n, n))
+    else:
+        if layout == 'clustered':
+            towns = rng.random((max(1, n // 50), 2)) * 30000
+            points = towns[rng.integers(0, len(towns), size=n)] + rng.normal(0, 1500, size=(n, 2))
+            distances = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)) / 12
+        elif layout == 'grid':
+            side = int(np.ceil(np.sqrt(n))) * 2
+            points = rng.choice(side * side, size=n, replace=False)
+            points = np.stack([points // side, points % side], axis=1) * 100
+            distances = np.abs(points[:, None, :] - points[None, :, :]).sum(axis=2) / 8
+        else:
+            raise ValueError(f'layout must be one of {LAYOUTS}, not {layout!r}.')
+        matrix = (distances * rng.uniform(1.0, 1.2, size=(n, n))).astype(int) + 60
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+
+def synthetic_packages(n: int, distribution: str, rng: np.random.Generator) -> np.ndarray:
+    '''Returns the number of packages for n delivery locations, either uniform between 1 and 40, or skewed (mostly small orders and a few large ones).'''
+    if distribution == 'uniform':
+        return rng.integers(1, 41, size=n)
+    if distribution == 'skewed':
+        return np.clip(rng.lognormal(1.5, 1.0, size=n).astype(int) + 1, 1, 150)
+    raise ValueError(f'distribution must be one of {PACKAGE_DISTRIBUTIONS}, not {distribution!r}.')
+
+
+def synthetic_locations(n: int, packages: np.ndarray) -> list[DeliveryLogistics.Location]:
+    '''Returns one distribution center (at index 0) followed by n - 1 delivery locations.'''
+    locations = [DeliveryLogistics.DistributionCenter('Distribution Center', 'Synthetic Location 0')]
+    locations.extend(DeliveryLogistics.DeliveryLocation('', f'Synthetic Location {i}', packages[i]) for i in range(1, n))
+    return locations
+
+
+def synthetic_planner(n: int, seed: int = 0, layout: str = 'clustered', distribution: str = 'uniform') -> DeliveryLogistics.RoutePlanner:
+    '''Returns a RoutePlanner with one distribution center (at index 0) and n - 1 delivery locations.'''
+    rng = np.random.default_rng(seed)
+    matrix = synthetic_travel_times(n, layout, rng)
+    return DeliveryLogistics.RoutePlanner.from_array(synthetic_locations(n, synthetic_packages(n, distribution, rng)), matrix)
+
+
+def timed(function, repeat: int) -> tuple[float, object]:
+    '''Calls function repeat times and returns the fastest time in seconds and the last result.'''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def plan_quality(routes: dict) -> dict:
+    '''Returns the measures of route quality that are compared between versions.'''
+    return {'routes': len(routes['Routes']), 'total_delivery_time': int(routes['Total Delivery Time'])}
+
+
+def run(n: int, layout: str, distribution: str, seed: int, stages: list[str], repeat: int, max_payload: int, avg_unload_time: int, max_tree_n: int, routes_per_cluster: int = 8,
+        time_budget: float = 2.0):
+    '''
+    A generator that yields one result dict for each stage benchmarked on one synthetic instance. If single_payload_and_dist was benchmarked
+    first, then the clustered_single_dist result also contains its quality (total delivery time) and speedup relative to the unpartitioned plan,
+    and the time_dependent_single_dist result contains its slowdown relative to planning with a single layer of travel times. If savings_single_dist
+    was benchmarked first, then the anytime_single_dist result contains its quality relative to the savings plan that it starts from.
+    '''
+    rng = np.random.default_rng(seed)
+    matrix = synthetic_travel_times(n, layout, rng)
+    locations = synthetic_locations(n, synthetic_packages(n, distribution, rng))
+    planner = DeliveryLogistics.RoutePlanner.from_array(locations, matrix)
+    customers = planner.delivery_locations()
+    rng = np.random.default_rng(seed + 1)
+
+    def route(stops: int) -> list[int]:
+        return [int(x) for x in rng.choice(customers, size=min(stops, len(customers)), replace=False)]
+
+    unpartitioned = savings = None
+    for stage in stages:
+        result = {}
+        if stage == 'matrix_from_array':
+            seconds, _ = timed(lambda: DeliveryLogistics.RoutePlanner.from_array(locations, matrix), repeat)
+        elif stage == 'matrix_from_triples':
+            seconds, _ = timed(lambda: DeliveryLogistics.RoutePlanner.from_triples(locations, ((x, y, matrix[x, y]) for x in range(n) for y in range(n) if x != y)), repeat)
+        elif stage == 'matrix_from_trips':
+            trips = planner.trips()
+            seconds, _ = timed(lambda: DeliveryLogistics.RoutePlanner(trips), repeat)
+        elif stage == 'minimum_spanning_tree':
+            seconds, _ = timed(lambda: DeliveryLogistics.TreeBuilder.minimum_spanning_tree(planner, customers[0], customers), repeat)
+        elif stage in ('brute_force_optimize', 'held_karp_optimize'):
+            stops = route(8 if stage == 'brute_force_optimize' else DeliveryLogistics.RoutePlanner.EXACT_OPTIMIZE_LIMIT)
+            optimize = getattr(DeliveryLogistics.RoutePlanner(locations=locations, matrix=matrix), stage)  # a new planner, so nothing is memoized
+            seconds, best = timed(lambda: optimize(stops, 0), 1)
+            result = {'stops': len(stops), 'travel_time': int(planner.total_travel_time(best))}
+        elif stage in ('triangle_optimize', 'local_search_optimize'):
+            stops = route(min(100, len(customers)))
+            seconds, best = timed(lambda: getattr(planner, stage)(stops, 0), repeat)
+            result = {'stops': len(stops), 'travel_time': int(planner.total_travel_time(best))}
+        elif stage in ('single_payload_and_dist', 'incremental'):
+            if n > max_tree_n:
+                continue
+            seconds, routes = timed(lambda: planner.single_payload_and_dist(0, 0, max_payload, max_payload, avg_unload_time, incremental=stage == 'incremental'), 1)
+            result = plan_quality(routes)
+            if stage == 'single_payload_and_dist':
+                unpartitioned = (seconds, result['total_delivery_time'])
+        elif stage == 'savings_single_dist':
+            seconds, routes = timed(lambda: planner.savings_single_dist(0, 0, max_payload, max_payload, avg_unload_time), repeat)
+            result = plan_quality(routes)
+            savings = result['total_delivery_time']
+        elif stage == 'mixed_fleet_single_dist':
+            if n > max_tree_n:
+                continue
+            fleet = [DeliveryLogistics.Vehicle('Box Truck', max_payload, max(1, n // 40)), DeliveryLogistics.Vehicle('Van', max(1, max_payload // 3))]
+            seconds, routes = timed(lambda: planner.mixed_fleet_single_dist(0, fleet, 0, max_payload, avg_unload_time), 1)
+            result = plan_quality(routes)
+        elif stage == 'clustered_single_dist':
+            seconds, routes = timed(lambda: planner.clustered_single_dist(0, 0, max_payload, max_payload, avg_unload_time, routes_per_cluster), 1)
+            result = {**plan_quality(routes), 'clusters': len(set(route['Cluster'] for route in routes['Routes']))}
+            if unpartitioned is not None:
+                result['speedup'] = round(unpartitioned[0] / seconds, 3)
+                result['quality_ratio'] = round(result['total_delivery_time'] / unpartitioned[1], 4)
+        elif stage == 'time_dependent_single_dist':
+            if n > max_tree_n:
+                continue
+            layers = np.stack([(matrix * factor).astype(matrix.dtype) for _, factor in RUSH_HOUR_LAYERS])
+            rush_hour = DeliveryLogistics.RoutePlanner.from_array(locations, layers, [start for start, _ in RUSH_HOUR_LAYERS])
+            rush_hour.set_departure_time('07:30', avg_unload_time)
+            seconds, routes = timed(lambda: rush_hour.single_payload_and_dist(0, 0, max_payload, max_payload, avg_unload_time), 1)
+            result = plan_quality(routes)
+            if unpartitioned is not None:
+                result['slowdown'] = round(seconds / unpartitioned[0], 3)
+        elif stage == 'anytime_single_dist':
+            improvements = []
+            seconds, routes = timed(lambda: planner.anytime_single_dist(0, 0, max_payload, max_payload, avg_unload_time, time_budget,
+                                                                        callback=lambda cost, elapsed: improvements.append(elapsed)), 1)
+            result = {**plan_quality(routes), 'first_plan_seconds': round(improvements[0], 6), 'improvements': len(improvements) - 1}
+            if savings is not None:
+                result['quality_ratio'] = round(result['total_delivery_time'] / savings, 4)
+        else:
+            raise ValueError(f'stage must be one of {STAGES}, not {stage!r}.')
+        yield {'stage': stage, 'n': n, 'layout': layout, 'packages': distribution, 'seed': seed, 'seconds': round(seconds, 6), **result}
+
+
+def compare(baseline_file: str, results: list[dict], tolerance: float) -> int:
+    '''
+    Prints every result that is more than tolerance (a fraction) slower, or whose plan or route is worse, than the same
+    benchmark in baseline_file, and returns the number of regressions found.
+    '''
+    def key(r: dict) -> tuple:
+        return (r['stage'], r['n'], r['layout'], r['packages'], r['seed'])
+
+    with open(baseline_file, 'rt') as f:
+        baseline = {key(r): r for r in (json.loads(line) for line in f if line.strip()) if 'stage' in r}
+    regressions = 0
+    for result in results:
+        before = baseline.get(key(result))
+        if before is None:
+            continue
+        for measure in ('seconds', 'total_delivery_time', 'travel_time'):
+            if measure in result and measure in before and result[measure] > before[measure] * (1 + tolerance) and result[measure] - before[measure] > 1e-3:
+                regressions += 1
+                print(f'REGRESSION {key(result)} {measure}: {before[measure]} -> {result[measure]}', file=sys.stderr)
+    return regressions
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(epilog=epilog, description=description)
+    parser.add_argument('-n', '--sizes', default=[10, 50, 100, 250, 500, 1000], help='The numbers of locations to benchmark.', metavar=('[Number of locations]'), type=int, nargs='+', action='store')
+    parser.add_argument('-l', '--layouts', default=list(LAYOUTS), help='The layouts of the synthetic locations.', choices=LAYOUTS, type=str, nargs='+', action='store')
+    parser.add_argument('-p', '--packages', default=['uniform'], help='The distributions of packages per location.', choices=PACKAGE_DISTRIBUTIONS, type=str, nargs='+', action='store')
+    parser.add_argument('-s', '--stages', default=list(STAGES), help='The stages to benchmark.', choices=STAGES, type=str, nargs='+', action='store')
+    parser.add_argument('-r', '--repeat', default=3, help='The number of times to repeat the fast stages. The fastest time is reported.', metavar=('[Repeat]'), type=int, action='store')
+    parser.add_argument('-m', '--max_payload', default=330, help='The maximum payload of the delivery truck.', metavar=('[Maximum payload]'), type=int, action='store')
+    parser.add_argument('-u', '--avg_unload_secs', default=11, help='The average amount of time (in seconds) that it takes to unload a single item.', metavar=('[Avg no. of seconds]'), type=int, action='store')
+    parser.add_argument('--routes_per_cluster', default=8, help='The size of the clusters planned by clustered_single_dist, in truckloads.', metavar=('[Number of routes]'), type=int, action='store')
+    parser.add_argument('--time_budget', default=2.0, help='The number of seconds that anytime_single_dist plans for.', metavar=('[Seconds]'), type=float, action='store')
+    parser.add_argument('--max_tree_n', default=500, help='The largest number of locations for which the spanning tree planners are benchmarked.', metavar=('[Number of locations]'), type=int, action='store')
+    parser.add_argument('--seed', default=0, help='The seed of the random number generator.', metavar=('[Seed]'), type=int, action='store')
+    parser.add_argument('-c', '--compare', help='A file containing the output of an earlier run. Regressions are printed and the exit status is 1 if any are found.', metavar=('[File name and path]'), type=str, action='store')
+    parser.add_argument('-t', '--tolerance', default=0.25, help='The fraction by which a result may be worse than the earlier run before it is reported as a regression.', metavar=('[Fraction]'), type=float, action='store')
+    args = parser.parse_args()
+
+    print(json.dumps({'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}), flush=True)
+    results = []
+    for layout in args.layouts:
+        for distribution in args.packages:
+            for n in args.sizes:
+                for result in run(n, layout, distribution, args.seed, args.stages, args.repeat, args.max_payload, args.avg_unload_secs, args.max_tree_n, args.routes_per_cluster, args.time_budget):
+                    results.append(result)
+                    print(json.dumps(result), flush=True)
+
+    if args.compare and compare(args.compare, results, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,180 @@
+import DeliveryLogistics
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+description = 'Keeps route planners in memory and answers route planning requests over HTTP, so that changes to the customer orders are planned in a fraction of the time.'
+epilog = '''
+Endpoints (every request and response body is json):
+GET /sessions lists the sessions. POST /sessions/NAME loads a session from {"file": ..., "distribution_center": ..., "max_payload": ...,
+"avg_unload_time": ..., "strategy": ..., "departure": ...}. GET /sessions/NAME returns its routes, and DELETE /sessions/NAME unloads it.
+POST /sessions/NAME/orders adds and cancels orders with {"add": [{"address": ..., "packages": ..., "name": ...}], "remove": [address, ...]},
+and POST /sessions/NAME/what-if returns the routes that the same changes would result in, without making them.
+GET /stats returns the number of requests, and the time spent answering them, by endpoint.
+'''
+
+# the planning sessions, by name
+sessions = {}
+sessions_lock = threading.Lock()
+
+# the settings used by sessions that do not override them, which are set from the command line
+defaults = {'max_payload': 330, 'avg_unload_time': 11, 'strategy': 'tree', 'departure': None, 'neighbors': 3, 'google_api_key': None}
+
+
+def create_session(request: dict) -> DeliveryLogistics.PlanningSession:
+    '''Loads the planner in request['file'] and plans its routes. The distribution center may be given by index or address, and defaults to the first one.'''
+    if 'file' not in request:
+        raise ValueError('Expected the "file" to load the travel times from.')
+    settings = {**defaults, **request}
+    planner = DeliveryLogistics.read_planner_file(settings['file'])
+    planner.set_departure_time(settings['departure'] if settings['departure'] else datetime.now(), settings['avg_unload_time'])
+    distribution_center = settings.get('distribution_center')
+    if distribution_center is None:
+        distribution_centers = planner.distribution_centers()
+        if not distribution_centers:
+            raise ValueError(f'{settings["file"]} does not contain a distribution center.')
+        distribution_center = distribution_centers[0]
+    elif isinstance(distribution_center, str):
+        distribution_center = planner.location_store().id(distribution_center)
+    return DeliveryLogistics.PlanningSession(planner, distribution_center, settings['max_payload'], settings['avg_unload_time'], settings['strategy'],
+                                             settings['neighbors'], google_api_key=settings['google_api_key'])
+
+
+def orders_from_json(request: dict) -> tuple[list[DeliveryLogistics.DeliveryLocation], list[str]]:
+    '''Returns the orders to add and the addresses to cancel in the body of an orders or what-if request.'''
+    if not all(isinstance(order, dict) and 'address' in order and 'packages' in order for order in request.get('add', [])):
+        raise ValueError('Every order in add must have an "address" and a number of "packages".')
+    # DeliveryLocation would turn 2.5 or "3" or true into a number of packages, so the json values are checked first
+    if not all(type(order['packages']) is int and order['packages'] >= 1 for order in request.get('add', [])):
+        raise ValueError('The "packages" of every order in add must be a whole number, and at least one.')
+    add = [DeliveryLogistics.DeliveryLocation(order.get('name', ''), order['address'], order['packages']) for order in request.get('add', [])]
+    remove = list(request.get('remove', []))
+    if not all(isinstance(address, str) for address in remove):
+        raise ValueError('remove must be a list of addresses.')
+    return add, remove
+
+
+def plan_to_json(plan: dict) -> dict:
+    '''Replaces the Location objects in a plan with their json representation.'''
+    return {**plan, 'Routes': [{**route, 'Delivery Locations': [loc.json() for loc in route['Delivery Locations']]} for route in plan['Routes']]}
+
+
+def session(name: str) -> DeliveryLogistics.PlanningSession:
+    '''Returns the session called name, or raises a KeyError.'''
+    with sessions_lock:
+        if name not in sessions:
+            raise KeyError(f'There is no session named "{name}".')
+        return sessions[name]
+
+
+class PlanningRequestHandler(BaseHTTPRequestHandler):
+    '''Answers one request at a time (the server runs each on its own thread) and records how long each endpoint took to answer.'''
+
+    def do_GET(self) -> None:
+        self.answer('GET')
+
+    def do_POST(self) -> None:
+        self.answer('POST')
+
+    def do_DELETE(self) -> None:
+        self.answer('DELETE')
+
+    def answer(self, method: str) -> None:
+        start = time.perf_counter()
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+        endpoint = method + ' /' + '/'.join(parts[:1] + ['NAME'] * (len(parts) > 1) + parts[2:])
+        try:
+            status, body = 200, self.dispatch(method, parts)
+        except KeyError as err:
+            status, body = 404, {'Error': str(err.args[0]) if err.args else 'Not found.'}
+        except (ValueError, TypeError) as err:
+            status, body = 400, {'Error': str(err)}
+        except Exception as err:
+            status, body = 500, {'Error': f'{type(err).__name__}: {err}'}
+        seconds = time.perf_counter() - start
+        DeliveryLogistics.Instrumentation.record(endpoint, seconds)
+        body['Latency Seconds'] = round(seconds, 6)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def dispatch(self, method: str, parts: list[str]) -> dict:
+        '''Returns the body of the response to a request for the path in parts.'''
+        if parts == ['stats'] and method == 'GET':
+            return DeliveryLogistics.Instrumentation.report()
+        if not parts or parts[0] != 'sessions' or len(parts) > 3:
+            raise KeyError(f'There is no endpoint at {self.path}.')
+        if len(parts) == 1 and method == 'GET':
+            with sessions_lock:
+                return {'Sessions': {name: s.version for name, s in sessions.items()}}
+        name = parts[1] if len(parts) > 1 else None
+        if len(parts) == 2 and method == 'GET':
+            return plan_to_json(session(name).plan())
+        if len(parts) == 2 and method == 'POST':
+            created = create_session(self.read_json())
+            with sessions_lock:
+                sessions[name] = created
+            return plan_to_json(created.plan())
+        if len(parts) == 2 and method == 'DELETE':
+            with sessions_lock:
+                if sessions.pop(name, None) is None:
+                    raise KeyError(f'There is no session named "{name}".')
+            return {}
+        if len(parts) == 3 and method == 'POST' and parts[2] in ('orders', 'what-if'):
+            add, remove = orders_from_json(self.read_json())
+            return plan_to_json(session(name).update(add, remove, commit=parts[2] == 'orders'))
+        raise KeyError(f'There is no endpoint at {method} {self.path}.')
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+        if not isinstance(request, dict):
+            raise ValueError('The request body must be a json object.')
+        return request
+
+    def log_message(self, format: str, *args) -> None:
+        print(self.address_string(), '-', format % args, file=sys.stderr)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(epilog=epilog, description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-f', '--from_file', help='Load a session from a local file (json or .dlm) at startup, named after the file. Repeat this option once for each file.', metavar=('[File name and path]'), type=str, action='append')
+    parser.add_argument('-k', '--key', help='Google api key, used to download the travel times of orders for addresses that are not in a session yet.', metavar=('[Google API Key]'), type=str, action='store')
+    parser.add_argument('-u', '--avg_unload_secs', default=11, help='The average amount of time (in seconds) that it takes to unload a single item from the delivery truck.', metavar=('[Avg no. of seconds]'), type=int, action='store')
+    parser.add_argument('-m', '--max_payload', default=330, help='The maximum payload of the delivery truck.', metavar=('[Maximum payload]'), type=int, action="store")
+    parser.add_argument('-s', '--strategy', default='tree', choices=['tree', 'incremental', 'savings'], help='The route planning strategy.', type=str, action='store')
+    parser.add_argument('--departure', help='The time of day (as HH:MM) at which the delivery trucks leave the distribution center. Defaults to the current time.', metavar=('[HH:MM]'), type=str, action='store')
+    parser.add_argument('--neighbors', default=3, help='The number of nearest routed locations whose routes are planned again along with each new order.', metavar=('[Number of neighbors]'), type=int, action='store')
+    parser.add_argument('--host', default='127.0.0.1', help='The address to listen on.', metavar=('[Host]'), type=str, action='store')
+    parser.add_argument('-p', '--port', default=8080, help='The port to listen on.', metavar=('[Port]'), type=int, action='store')
+    args = parser.parse_args()
+
+    defaults.update(max_payload=args.max_payload, avg_unload_time=args.avg_unload_secs, strategy=args.strategy, departure=args.departure,
+                    neighbors=args.neighbors, google_api_key=args.key)
+
+    # the time spent in each endpoint (and in each stage of planning) is reported by GET /stats
+    DeliveryLogistics.Instrumentation.enable()
+
+    for file_name in args.from_file or []:
+        name = os.path.splitext(os.path.basename(file_name))[0]
+        start = time.perf_counter()
+        sessions[name] = create_session({'file': file_name})
+        print('Loaded session', name, 'in', round(time.perf_counter() - start, 2), 'seconds.', file=sys.stderr)
+
+    server = ThreadingHTTPServer((args.host, args.port), PlanningRequestHandler)
+    print('Listening on', f'http://{args.host}:{server.server_port}', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
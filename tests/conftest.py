@@ -0,0 +1,76 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# the modules under test live in the root of the repository, next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DeliveryLogistics  # noqa: E402
+
+
+def synthetic_travel_times(n: int, seed: int = 0, layout: str = 'scattered') -> np.ndarray:
+    '''
+    Returns an n x n matrix of travel times in seconds. \'scattered\' locations are random points in a 20 km square, and the travel time
+    between two of them is the straight line distance at 12 m/s (plus up to 20% of asymmetric noise and a minute to park), while
+    \'random\' travel times are drawn independently, so they have no geography at all.
+    '''
+    rng = np.random.default_rng(seed)
+    if layout == 'random':
+        matrix = rng.integers(60, 3600, size=(n, n))
+    elif layout == 'scattered':
+        points = rng.random((n, 2)) * 20000
+        distances = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)) / 12
+        matrix = (distances * rng.uniform(1.0, 1.2, size=(n, n))).astype(int) + 60
+    else:
+        raise ValueError(f'layout must be scattered or random, not {layout!r}.')
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+
+def synthetic_locations(n: int, distribution_centers: int = 1, seed: int = 0, inventory: int = 10000) -> list[DeliveryLogistics.Location]:
+    '''
+    Returns distribution_centers distribution centers called "Depot i" at "i Depot Road", followed by delivery locations at "i Main Street"
+    (where i is the index of the location) with 1 to 40 packages each.
+    '''
+    rng = np.random.default_rng(seed + 1)
+    locations = [DeliveryLogistics.DistributionCenter(f'Depot {i}', f'{i} Depot Road', inventory) for i in range(distribution_centers)]
+    locations.extend(DeliveryLogistics.DeliveryLocation(f'Customer {i}', f'{i} Main Street', int(rng.integers(1, 41))) for i in range(distribution_centers, n))
+    return locations
+
+
+@pytest.fixture
+def make_planner():
+    '''
+    Returns a function that builds a RoutePlanner from synthetic_locations() and synthetic_travel_times(). If layer_times is given, the
+    planner has a layer of travel times for each of them, and the travel times of the k-th layer are k + 1 times those of the first.
+    '''
+    def make(n: int = 40, distribution_centers: int = 1, seed: int = 0, layout: str = 'scattered', inventory: int = 10000,
+             layer_times: list = None) -> DeliveryLogistics.RoutePlanner:
+        locations = synthetic_locations(n, distribution_centers, seed, inventory)
+        matrix = synthetic_travel_times(n, seed, layout)
+        if layer_times:
+            matrix = np.stack([matrix * (k + 1) for k in range(len(layer_times))])
+        return DeliveryLogistics.RoutePlanner.from_array(locations, matrix, layer_times)
+    return make
+
+
+@pytest.fixture
+def make_orders():
+    '''
+    Returns a function that returns the travel times between n addresses, the addresses, a set with one distribution center, and a set of
+    n - 1 customer orders, in the form taken by GoogleMapsTravelMatrixBuilder.build().
+    '''
+    def make(n: int = 30, seed: int = 0) -> tuple[np.ndarray, list[str], set, set]:
+        locations = synthetic_locations(n, 1, seed)
+        return synthetic_travel_times(n, seed, 'random'), [location.address for location in locations], set(locations[:1]), set(locations[1:])
+    return make
+
+
+@pytest.fixture
+def delivered_addresses():
+    '''Returns a function that returns the sorted addresses of every stop (between the distribution centers) of the routes in a plan.'''
+    def delivered(routes: dict) -> list[str]:
+        return sorted(location.address for route in routes['Routes'] for location in route['Delivery Locations'][1:-1])
+    return delivered
@@ -0,0 +1,18 @@
+import pytest
+
+
+def test_anytime_improves_on_savings_and_delivers_everything_once(make_planner, delivered_addresses):
+    route_planner = make_planner(60)
+    progress = []
+    routes = route_planner.anytime_single_dist(0, 0, 200, 200, 11, time_budget=0.5, callback=lambda total, seconds: progress.append(total))
+    savings = route_planner.savings_single_dist(0, 0, 200, 200, 11)
+    assert routes['Total Delivery Time'] == progress[-1] <= progress[0] == savings['Total Delivery Time']
+    assert progress == sorted(progress, reverse=True)
+    assert delivered_addresses(routes) == sorted(f'{i} Main Street' for i in range(1, 60))
+    assert all(route['Packages'] <= 200 for route in routes['Routes'])
+
+
+@pytest.mark.parametrize('ruin', [-1, 0, 1])
+def test_anytime_rejects_a_ruin_below_two(ruin, make_planner):
+    with pytest.raises(ValueError, match='ruin'):
+        make_planner().anytime_single_dist(0, 0, 200, 200, 11, time_budget=0.1, ruin=ruin)
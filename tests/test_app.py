@@ -0,0 +1,82 @@
+import DeliveryLogistics
+import app
+import argparse
+import json
+import os
+import pytest
+import subprocess
+import sys
+
+
+@pytest.fixture
+def write_planner(make_planner):
+    '''Returns a function that writes a matrix file with the given number of distribution centers and 30 locations in all.'''
+    def write(file_name: str, distribution_centers: int = 1) -> None:
+        planner = make_planner(30, distribution_centers, inventory=1000)
+        DeliveryLogistics.write_matrix_file(planner, file_name)
+    return write
+
+
+def arguments(**kwargs) -> argparse.Namespace:
+    '''Returns the command line options of app.py with their defaults, overridden by kwargs.'''
+    defaults = dict(strategy='savings', fleet=None, cluster=None, workers=1, max_payload=100, avg_unload_secs=11, departure='08:00',
+                    each_dist_ctr=False, batch=[], time_budget=1, export=None, export_file=None, browser=False)
+    return argparse.Namespace(**{**defaults, **kwargs})
+
+
+def test_batch_skips_a_file_without_a_distribution_center(tmp_path, capsys, write_planner):
+    write_planner(str(tmp_path / 'good.dlm'))
+    write_planner(str(tmp_path / 'no_depot.dlm'), distribution_centers=0)
+    status = app.run_batch(arguments(batch=[str(tmp_path / 'no_depot.dlm'), str(tmp_path / 'good.dlm')]))
+    out, err = capsys.readouterr()
+    assert status == 1
+    assert 'no_depot.dlm' in err
+    records = [json.loads(line) for line in out.splitlines()]
+    assert [record['File'] for record in records] == [str(tmp_path / 'good.dlm')]
+
+
+def test_batch_prints_only_json_to_stdout(tmp_path, capsys, write_planner):
+    write_planner(str(tmp_path / 'fleet.dlm'))
+    status = app.run_batch(arguments(batch=[str(tmp_path / 'fleet.dlm')], fleet=['Van:50:1']))
+    out, err = capsys.readouterr()
+    assert status == 0
+    record, = [json.loads(line) for line in out.splitlines()]
+    assert record['Undelivered Locations'] > 0
+    assert 'Undelivered Locations' in err
+
+
+def test_fleet_is_rejected_with_several_distribution_centers(tmp_path, capsys, write_planner):
+    write_planner(str(tmp_path / 'two_depots.dlm'), distribution_centers=2)
+    assert app.run_batch(arguments(batch=[str(tmp_path / 'two_depots.dlm')], fleet=['Van:50'])) == 1
+    assert '--fleet' in capsys.readouterr().err
+    assert app.run_batch(arguments(batch=[str(tmp_path / 'two_depots.dlm')], fleet=['Van:50'], each_dist_ctr=True)) == 0
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record['Distribution Centers'] for record in records] == [['0 Depot Road'], ['1 Depot Road']]
+
+
+def run_app(*options) -> subprocess.CompletedProcess:
+    '''Runs app.py with the given command line options, and returns the finished process.'''
+    return subprocess.run([sys.executable, os.path.join(os.path.dirname(app.__file__), 'app.py'), *options], capture_output=True, text=True)
+
+
+def test_time_of_day_layers_are_not_saved_to_json(tmp_path, make_planner):
+    DeliveryLogistics.write_matrix_file(make_planner(5, layer_times=['00:00', '07:00']), str(tmp_path / 'layered.dlm'))
+    options = ['-f', str(tmp_path / 'layered.dlm'), '-s', 'savings', '-e', 'csv']
+    result = run_app(*options, '-o', str(tmp_path / 'trips.json'))
+    assert result.returncode != 0 and 'one layer' in result.stderr
+    assert not (tmp_path / 'trips.json').exists()
+    assert run_app(*options, '-o', str(tmp_path / 'copy.dlm')).returncode == 0
+    assert DeliveryLogistics.read_matrix_file(str(tmp_path / 'copy.dlm')).layer_count() == 2
+
+
+def test_time_windows_are_not_saved_to_json(tmp_path, make_planner):
+    planner = make_planner(5)
+    planner.location_store().set_time_windows([1, 2], DeliveryLogistics.seconds_of_day('09:00'), DeliveryLogistics.seconds_of_day('12:00'))
+    DeliveryLogistics.write_matrix_file(planner, str(tmp_path / 'windows.dlm'))
+    options = ['-f', str(tmp_path / 'windows.dlm'), '-s', 'savings', '-e', 'csv']
+    result = run_app(*options, '-o', str(tmp_path / 'trips.json'))
+    assert result.returncode != 0 and 'time windows' in result.stderr
+    assert not (tmp_path / 'trips.json').exists()
+    assert run_app(*options, '-o', str(tmp_path / 'copy.dlm')).returncode == 0
+    opens, closes = DeliveryLogistics.read_matrix_file(str(tmp_path / 'copy.dlm')).location_store().time_windows()
+    assert opens[1:3].tolist() == [32400, 32400] and closes[1:3].tolist() == [43200, 43200]
@@ -0,0 +1,44 @@
+import benchmark
+import json
+import numpy as np
+import os
+import pytest
+import subprocess
+import sys
+
+
+@pytest.mark.parametrize('layout', benchmark.LAYOUTS)
+def test_every_stage_runs_on_a_small_instance(layout):
+    results = list(benchmark.run(30, layout, 'uniform', 0, list(benchmark.STAGES), 1, 150, 11, 100, routes_per_cluster=2, time_budget=0.1))
+    assert [result['stage'] for result in results] == list(benchmark.STAGES)
+    assert all(result['n'] == 30 and result['layout'] == layout and result['seconds'] >= 0 for result in results)
+    by_stage = {result['stage']: result for result in results}
+    assert by_stage['clustered_single_dist']['clusters'] >= 1 and 'quality_ratio' in by_stage['clustered_single_dist']
+    assert by_stage['anytime_single_dist']['quality_ratio'] <= 1
+
+
+def test_the_tree_planners_are_skipped_above_max_tree_n():
+    stages = ['single_payload_and_dist', 'incremental', 'savings_single_dist']
+    assert [result['stage'] for result in benchmark.run(30, 'grid', 'skewed', 0, stages, 1, 150, 11, 20)] == ['savings_single_dist']
+
+
+@pytest.mark.parametrize('layout', benchmark.LAYOUTS)
+def test_synthetic_travel_times(layout):
+    matrix = benchmark.synthetic_travel_times(50, layout, np.random.default_rng(0))
+    assert matrix.shape == (50, 50) and np.all(np.diag(matrix) == 0) and matrix[~np.eye(50, dtype=bool)].min() >= 60
+
+
+def test_compare_reports_regressions(tmp_path, capsys):
+    before = {'stage': 'savings_single_dist', 'n': 10, 'layout': 'grid', 'packages': 'uniform', 'seed': 0, 'seconds': 1.0, 'total_delivery_time': 1000}
+    (tmp_path / 'baseline.jsonl').write_text(json.dumps({'python': '3'}) + '\n' + json.dumps(before) + '\n')
+    assert benchmark.compare(str(tmp_path / 'baseline.jsonl'), [{**before, 'seconds': 1.2, 'total_delivery_time': 1100}], 0.25) == 0
+    assert benchmark.compare(str(tmp_path / 'baseline.jsonl'), [{**before, 'seconds': 1.3, 'total_delivery_time': 1300}], 0.25) == 2
+    assert capsys.readouterr().err.count('REGRESSION') == 2
+
+
+def test_the_command_line_prints_one_line_of_json_per_result(tmp_path):
+    command = [sys.executable, os.path.join(os.path.dirname(benchmark.__file__), 'benchmark.py'), '-n', '10', '20', '-l', 'grid', '-s', 'savings_single_dist']
+    result = subprocess.run(command, capture_output=True, text=True)
+    assert result.returncode == 0
+    results = [json.loads(line) for line in result.stdout.splitlines() if 'stage' in json.loads(line)]
+    assert [(r['stage'], r['n']) for r in results] == [('savings_single_dist', 10), ('savings_single_dist', 20)]
@@ -0,0 +1,66 @@
+import DeliveryLogistics
+import numpy as np
+import pytest
+from datetime import datetime
+
+
+@pytest.fixture
+def locations(make_orders):
+    '''Returns the travel times between five locations, and the locations.'''
+    travel_times, addresses, _, _ = make_orders(5)
+    return travel_times, [DeliveryLogistics.Location('', address) for address in addresses]
+
+
+def test_cached_travel_times_are_read_back(tmp_path, locations):
+    travel_times, locs = locations
+    with DeliveryLogistics.TravelTimeCache(str(tmp_path / 'cache.sqlite')) as cache:
+        cache.write(locs[:3], locs, travel_times[:3], datetime(2026, 1, 5, 8, 10))
+        matrix = np.zeros((5, 5), dtype=np.int64)
+        found = cache.read(locs, matrix, datetime(2026, 1, 5, 8, 50))
+    expected = np.zeros((5, 5), dtype=bool)
+    expected[:3] = True
+    np.fill_diagonal(expected, False)
+    assert np.array_equal(found, expected)
+    assert np.array_equal(matrix[found], travel_times[found])
+    assert cache.stats() == {'Hits': 12, 'Misses': 8, 'Hit Rate': 0.6}
+
+
+def test_travel_times_persist_and_are_matched_by_address(tmp_path, locations):
+    travel_times, locs = locations
+    with DeliveryLogistics.TravelTimeCache(str(tmp_path / 'cache.sqlite')) as cache:
+        cache.write(locs, locs, travel_times, datetime(2026, 1, 5, 8, 0))
+    # the locations are looked up in a different order by a new cache on the same file
+    order = [4, 2, 0, 3, 1]
+    with DeliveryLogistics.TravelTimeCache(str(tmp_path / 'cache.sqlite')) as cache:
+        matrix = np.zeros((5, 5), dtype=np.int64)
+        found = cache.read([locs[i] for i in order], matrix, datetime(2026, 1, 5, 8, 0))
+    assert found.sum() == 20
+    np.fill_diagonal(matrix, 0)
+    assert np.array_equal(matrix, travel_times[np.ix_(order, order)])
+
+
+def test_other_departure_buckets_miss(tmp_path, locations):
+    travel_times, locs = locations
+    with DeliveryLogistics.TravelTimeCache(str(tmp_path / 'cache.sqlite'), bucket_minutes=30) as cache:
+        cache.write(locs, locs, travel_times, datetime(2026, 1, 5, 8, 0))
+        assert not cache.read(locs, np.zeros((5, 5), dtype=np.int64), datetime(2026, 1, 5, 8, 30)).any()
+        assert cache.read(locs, np.zeros((5, 5), dtype=np.int64), datetime(2026, 1, 6, 8, 29)).sum() == 20
+        assert cache.stats()['Misses'] == 20 and cache.stats()['Hits'] == 20
+
+
+def test_stale_travel_times_are_evicted(tmp_path, monkeypatch, locations):
+    travel_times, locs = locations
+    now = 1.0e9
+    monkeypatch.setattr(DeliveryLogistics.time, 'time', lambda: now)
+    with DeliveryLogistics.TravelTimeCache(str(tmp_path / 'cache.sqlite'), ttl=3600) as cache:
+        cache.write(locs, locs, travel_times, datetime(2026, 1, 5, 8, 0))
+        now += 3601
+        assert not cache.read(locs, np.zeros((5, 5), dtype=np.int64), datetime(2026, 1, 5, 8, 0)).any()
+        assert cache.evict() == 20
+        assert cache.evict() == 0
+
+
+@pytest.mark.parametrize('options', [{'ttl': 0}, {'bucket_minutes': 0}, {'bucket_minutes': 24 * 60 + 1}])
+def test_invalid_options_are_rejected(tmp_path, options):
+    with pytest.raises(ValueError):
+        DeliveryLogistics.TravelTimeCache(str(tmp_path / 'cache.sqlite'), **options)
@@ -0,0 +1,50 @@
+import DeliveryLogistics
+import pytest
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_every_popped_route_is_up_to_date(make_planner, seed):
+    planner = make_planner(40, seed=seed)
+    candidates = DeliveryLogistics.CandidateRoutes(planner, 0, set(planner.delivery_locations()), 150)
+    delivered = []
+    while len(candidates):
+        undelivered = sorted(candidates.undelivered)
+        route = candidates.pop()
+        stops = route[1:-1]
+        assert route[0] == route[-1] == 0
+        assert set(stops) <= set(undelivered) and not set(stops) & set(delivered)
+        assert planner.total_packages(route) <= 150
+        # the route is the one that would be built from scratch, since none of the locations that it depends on were delivered
+        assert route in [planner.candidate_route(start, 0, undelivered, 150)[0] for start in stops]
+        delivered.extend(stops)
+    assert sorted(delivered) == sorted(planner.delivery_locations())
+
+
+def test_removed_stops_are_not_routed(make_planner):
+    planner = make_planner(30)
+    candidates = DeliveryLogistics.CandidateRoutes(planner, 0, set(planner.delivery_locations()), 150)
+    candidates.remove([1, 2, 3, 99])
+    assert len(candidates) == 26
+    routed = []
+    while len(candidates):
+        routed.extend(candidates.pop()[1:-1])
+    assert sorted(routed) == list(range(4, 30))
+    with pytest.raises(IndexError):
+        candidates.peek()
+
+
+def test_the_distribution_center_must_be_a_distribution_center(make_planner):
+    planner = make_planner(10)
+    with pytest.raises(ValueError):
+        DeliveryLogistics.CandidateRoutes(planner, 1, set(range(2, 10)))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_incremental_plans_stay_close_to_tree_plans(make_planner, delivered_addresses, seed):
+    planner = make_planner(60, seed=seed)
+    tree = planner.single_payload_and_dist(0, 0, 200, 200)
+    incremental = planner.single_payload_and_dist(0, 0, 200, 200, incremental=True)
+    assert delivered_addresses(incremental) == delivered_addresses(tree)
+    assert all(route['Packages'] <= 200 for route in incremental['Routes'])
+    # the incremental strategy trades plan quality for speed, but not by much
+    assert incremental['Total Travel Time'] <= 1.1 * tree['Total Travel Time']
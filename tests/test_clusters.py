@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('layout', ['scattered', 'random'])
+@pytest.mark.parametrize('max_cluster_packages', [40, 150, 600, 100000])
+def test_clusters_partition_the_customers_within_capacity(make_planner, layout, max_cluster_packages):
+    planner = make_planner(120, layout=layout)
+    clusters = planner.cluster_delivery_locations(0, planner.delivery_locations(), max_cluster_packages)
+    assert sorted(c for cluster in clusters for c in cluster) == planner.delivery_locations()
+    assert all(cluster and planner.total_packages(cluster) <= max_cluster_packages for cluster in clusters)
+    assert len(clusters) >= -(-planner.total_packages(planner.delivery_locations()) // max_cluster_packages)
+
+
+def test_clusters_are_made_of_nearby_customers(make_planner):
+    planner = make_planner(120)
+    customers = planner.delivery_locations()
+    clusters = planner.cluster_delivery_locations(0, customers, 500)
+    round_trips = planner.array() + planner.array().T
+    within = np.mean([round_trips[np.ix_(cluster, cluster)][~np.eye(len(cluster), dtype=bool)].mean() for cluster in clusters if len(cluster) > 1])
+    assert within < 0.6 * round_trips[np.ix_(customers, customers)][~np.eye(len(customers), dtype=bool)].mean()
+
+
+def test_a_location_larger_than_a_cluster_gets_its_own(make_planner):
+    planner = make_planner(20)
+    large = max(planner.delivery_locations(), key=lambda c: planner.packages([c])[0])
+    clusters = planner.cluster_delivery_locations(0, planner.delivery_locations(), int(planner.packages([large])[0]) - 1)
+    assert [large] in clusters
+    assert planner.cluster_delivery_locations(0, [], 100) == []
+    with pytest.raises(ValueError):
+        planner.cluster_delivery_locations(0, planner.delivery_locations(), 0)
+
+
+@pytest.mark.parametrize('strategy', ['tree', 'savings'])
+def test_clustered_plans_reach_every_customer_within_capacity(make_planner, delivered_addresses, strategy):
+    planner = make_planner(100)
+    routes = planner.clustered_single_dist(0, 0, 200, 120, 11, routes_per_cluster=3, strategy=strategy)
+    assert delivered_addresses(routes) == sorted(planner.location(i).address for i in planner.delivery_locations())
+    assert all(route['Packages'] <= 120 for route in routes['Routes'])
+    # every route stays within the cluster that it was planned in
+    clusters = planner.cluster_delivery_locations(0, planner.delivery_locations(), 3 * 120)
+    cluster_of = {planner.location(c).address: number for number, cluster in enumerate(clusters) for c in cluster}
+    assert all({cluster_of[stop.address] for stop in route['Delivery Locations'][1:-1]} == {route['Cluster']} for route in routes['Routes'])
+    assert routes == planner.clustered_single_dist(0, 0, 200, 120, 11, routes_per_cluster=3, strategy=strategy, workers=2)
+    with pytest.raises(ValueError):
+        planner.clustered_single_dist(0, 0, 200, 120, 11, routes_per_cluster=0)
@@ -0,0 +1,71 @@
+import DeliveryLogistics
+import pytest
+
+
+def write_orders(tmp_path, text: str) -> str:
+    '''Writes text to a CSV file and returns its name.'''
+    (tmp_path / 'orders.csv').write_text(text)
+    return str(tmp_path / 'orders.csv')
+
+
+@pytest.mark.parametrize('address, normalized', [
+    ('1 Main Street, Springfield', '1 main street, springfield'),
+    ('  1  MAIN Street ,Springfield. ', '1 main street, springfield'),
+    ('1 Main Street,\tSpringfield,IL', '1 main street, springfield, il'),
+    ('1 Main St.', '1 main st'),
+])
+def test_normalize_address(address, normalized):
+    assert DeliveryLogistics.normalize_address(address) == normalized
+
+
+def test_repeat_orders_are_merged(tmp_path):
+    file_name = write_orders(tmp_path, 'name,address,bags\n'
+                                       'Ann,1 Main Street,3\n'
+                                       'Bob,2 Main Street,4\n'
+                                       'Ann again,1 MAIN STREET.,5\n'
+                                       ',  1 main   street,1\n'
+                                       'Bob,2 Main Street,2\n')
+    store, report = DeliveryLogistics.read_customer_orders(file_name)
+    assert report == {'Rows': 5, 'Orders': 5, 'Locations': 2, 'Duplicates': 3, 'Bad Rows': 0, 'Errors': []}
+    assert [(record.name, record.address, record.packages) for record in store.records()] == [('Ann', '1 Main Street', 9), ('Bob', '2 Main Street', 6)]
+
+
+def test_bad_rows_are_reported_and_skipped(tmp_path):
+    file_name = write_orders(tmp_path, 'address,bags\n'
+                                       '1 Main Street,3\n'
+                                       ',4\n'
+                                       '2 Main Street,many\n'
+                                       '3 Main Street,0\n'
+                                       '4 Main Street\n'
+                                       '\n'
+                                       '5 Main Street,-2\n'
+                                       '0 Depot Road,7\n'
+                                       '6 Main Street,1\n')
+    store = DeliveryLogistics.LocationStore([DeliveryLogistics.DistributionCenter('Depot', '0 Depot Road')])
+    store, report = DeliveryLogistics.read_customer_orders(file_name, store, max_errors=3)
+    assert store.addresses() == ['0 Depot Road', '1 Main Street', '6 Main Street']
+    assert report['Rows'] == 8 and report['Orders'] == 2 and report['Bad Rows'] == 6
+    assert report['Errors'] == ['line 3: missing the address', 'line 4: the number of packages ("many") is not an integer',
+                                'line 5: the number of packages (0) must be at least one']
+
+
+def test_the_columns_can_be_renamed(tmp_path):
+    file_name = write_orders(tmp_path, 'Customer,Street Address,Boxes\nAnn,1 Main Street,3\n')
+    store, _ = DeliveryLogistics.read_customer_orders(file_name, address_column='street address', packages_column='boxes', name_column='customer')
+    assert store[0].json() == {'name': 'Ann', 'address': '1 Main Street', 'packages': 3}
+    with pytest.raises(ValueError, match='header row'):
+        DeliveryLogistics.read_customer_orders(file_name)
+
+
+def test_repeat_orders_intersect_their_time_windows(tmp_path):
+    file_name = write_orders(tmp_path, 'address,bags,window_start,window_end\n'
+                                       '1 Main Street,3,09:00,12:00\n'
+                                       '1 main street,1,10:00,\n'
+                                       '1 Main Street,1,13:00,14:00\n'
+                                       '2 Main Street,1,,\n'
+                                       '3 Main Street,1,25:00,\n')
+    store, report = DeliveryLogistics.read_customer_orders(file_name)
+    assert report['Bad Rows'] == 2 and 'does not overlap' in report['Errors'][0] and 'is not a time of day' in report['Errors'][1]
+    opens, closes = store.time_windows()
+    assert (opens[0], closes[0]) == (36000, 43200) and store.packages()[0] == 4
+    assert (opens[1], closes[1]) == (0, DeliveryLogistics.LocationStore.ALWAYS_OPEN)
@@ -0,0 +1,42 @@
+import DeliveryLogistics
+import csv
+import io
+import json
+
+
+def test_jsonl_export_of_multi_depot_routes(make_planner):
+    planner = make_planner(40, distribution_centers=2)
+    routes = planner.single_payload_multi_dist([0, 1], 0, 100, 100, 11, strategy='savings')
+    file = io.StringIO()
+    exporter = DeliveryLogistics.RouteExporter(file, 'jsonl')
+    for route in routes['Routes']:
+        exporter.write(route)
+    records = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert len(records) == exporter.routes == len(routes['Routes'])
+    assert {record['Distribution Center']['address'] for record in records} == {'0 Depot Road', '1 Depot Road'}
+    for record in records:
+        assert record['Delivery Locations'][0] == record['Delivery Locations'][-1] == record['Distribution Center']
+    delivered = sorted(location['address'] for record in records for location in record['Delivery Locations'][1:-1])
+    assert delivered == sorted(f'{i} Main Street' for i in range(2, 40))
+
+
+def test_streamed_export_matches_planned_routes(make_planner):
+    planner = make_planner(40)
+    file = io.StringIO(newline='')
+    exporter = DeliveryLogistics.RouteExporter(file, 'csv')
+    totals = planner.export_routes(planner.iter_routes(0, planner.delivery_locations(0, 100), 100, 'savings'), exporter, 11)
+    planned = planner.savings_single_dist(0, 0, 100, 100, 11)
+    assert totals['Routes'] == []
+    assert {key: value for key, value in totals.items() if key != 'Routes'} == {key: value for key, value in planned.items() if key != 'Routes'}
+    rows = list(csv.reader(io.StringIO(file.getvalue())))
+    assert tuple(rows[0]) == DeliveryLogistics.RouteExporter.CSV_COLUMNS
+    assert len(rows) - 1 == sum(len(route['Delivery Locations']) for route in planned['Routes'])
+
+
+def test_maps_urls_respect_the_waypoint_limit():
+    route = [DeliveryLogistics.Location('', f'{i} Main Street') for i in range(25)]
+    urls = DeliveryLogistics.route_maps_urls(route, 9)
+    assert len(urls) == 3
+    waypoints = [url.split('waypoints=')[1].count('%7C') + 1 for url in urls if 'waypoints=' in url]
+    assert max(waypoints) == 9
+    assert len(DeliveryLogistics.route_maps_urls(route[:11], 9)) == 1
@@ -0,0 +1,121 @@
+import DeliveryLogistics
+import numpy as np
+import pytest
+from datetime import datetime
+
+
+class FakeClient:
+    '''
+    Answers distance_matrix() requests like a googlemaps.Client, from a matrix of known travel times, and enforces the usage limits of the
+    Distance Matrix API. The first fail requests raise error (if it is not None), and every request after the first limit raises it.
+    '''
+
+    def __init__(self, travel_times: np.ndarray, addresses: list[str], error: Exception = None, fail: int = 0, limit: int = None):
+        self.travel_times = travel_times
+        self.index = {address: i for i, address in enumerate(addresses)}
+        self.error = error
+        self.fail = fail
+        self.limit = limit
+        self.requests = []
+
+    def distance_matrix(self, origins, destinations, mode=None, departure_time=None) -> dict:
+        assert len(origins) <= 25 and len(destinations) <= 25 and len(origins) * len(destinations) <= 100
+        if self.fail > 0 or (self.limit is not None and len(self.requests) >= self.limit):
+            self.fail -= 1
+            raise self.error
+        self.requests.append((list(origins), list(destinations)))
+        return {'status': 'OK', 'rows': [{'elements': [{'status': 'OK', 'duration': {'value': int(self.travel_times[self.index[o], self.index[d]])}}
+                                                       for d in destinations]} for o in origins]}
+
+
+def expected(travel_times: np.ndarray, addresses: list[str], locations: list) -> np.ndarray:
+    '''Returns travel_times in the order of locations.'''
+    order = [addresses.index(location.address) for location in locations]
+    return travel_times[np.ix_(order, order)]
+
+
+@pytest.mark.parametrize('origins, destinations', [(1, 60), (60, 1), (7, 7), (30, 30), (101, 3)])
+def test_tiles_respect_the_usage_limits(origins, destinations):
+    tiles = DeliveryLogistics.GoogleMapsTravelMatrixBuilder.tiles(list(range(origins)), list(range(destinations)))
+    for tile_origins, tile_destinations in tiles:
+        assert len(tile_origins) <= 25 and len(tile_destinations) <= 25 and len(tile_origins) * len(tile_destinations) <= 100
+    covered = sorted((o, d) for tile_origins, tile_destinations in tiles for o in tile_origins for d in tile_destinations)
+    assert covered == [(o, d) for o in range(origins) for d in range(destinations)]
+
+
+def test_build_downloads_every_pair_within_the_usage_limits(make_orders):
+    travel_times, addresses, distribution_centers, customers = make_orders(40)
+    client = FakeClient(travel_times, addresses)
+    locations, matrix = DeliveryLogistics.GoogleMapsTravelMatrixBuilder.build(None, customers, distribution_centers, client=client, workers=4)
+    assert np.array_equal(matrix, expected(travel_times, addresses, locations))
+    assert len(client.requests) == len(DeliveryLogistics.GoogleMapsTravelMatrixBuilder.tiles(list(range(40)), list(range(40))))
+
+
+def test_transient_errors_are_retried_with_exponential_backoff(monkeypatch, make_orders):
+    waits = []
+    monkeypatch.setattr(DeliveryLogistics.time, 'sleep', waits.append)
+    travel_times, addresses, _, _ = make_orders(5)
+    locations = [DeliveryLogistics.Location('', address) for address in addresses]
+    client = FakeClient(travel_times, addresses, TimeoutError('timed out'), fail=3)
+    fetcher = DeliveryLogistics.TravelTimeFetcher(client, max_retries=5, backoff=1.0)
+    matrix = np.zeros((5, 5), dtype=int)
+    fetcher.fetch(locations, matrix, [(list(range(5)), list(range(5)))], datetime.now())
+    assert np.array_equal(matrix, travel_times)
+    assert len(waits) == 3
+    for attempt, wait in enumerate(waits):
+        assert 0.5 * 2 ** attempt <= wait <= 2 ** attempt
+
+
+def test_retries_give_up_after_max_retries(monkeypatch, make_orders):
+    monkeypatch.setattr(DeliveryLogistics.time, 'sleep', lambda seconds: None)
+    travel_times, addresses, _, _ = make_orders(5)
+    locations = [DeliveryLogistics.Location('', address) for address in addresses]
+    client = FakeClient(travel_times, addresses, ConnectionError('reset'), fail=10)
+    fetcher = DeliveryLogistics.TravelTimeFetcher(client, max_retries=2)
+    with pytest.raises(ConnectionError):
+        fetcher.fetch(locations, np.zeros((5, 5), dtype=int), [(list(range(5)), list(range(5)))], datetime.now())
+    assert client.fail == 7
+
+
+def test_quota_errors_of_googlemaps_are_transient():
+    googlemaps = pytest.importorskip('googlemaps')
+    assert DeliveryLogistics.TravelTimeFetcher.is_transient(googlemaps.exceptions.ApiError('OVER_QUERY_LIMIT'))
+    assert not DeliveryLogistics.TravelTimeFetcher.is_transient(googlemaps.exceptions.ApiError('REQUEST_DENIED'))
+    assert not DeliveryLogistics.TravelTimeFetcher.is_transient(ValueError('bad response'))
+
+
+def test_an_interrupted_build_resumes_from_the_checkpoint(tmp_path, make_orders):
+    travel_times, addresses, distribution_centers, customers = make_orders(30)
+    checkpoint = str(tmp_path / 'checkpoint.jsonl')
+    interrupted = FakeClient(travel_times, addresses, ValueError('interrupted'), limit=4)
+    with pytest.raises(ValueError):
+        DeliveryLogistics.GoogleMapsTravelMatrixBuilder.build(None, customers, distribution_centers, client=interrupted, checkpoint_file=checkpoint)
+    resumed = FakeClient(travel_times, addresses)
+    locations, matrix = DeliveryLogistics.GoogleMapsTravelMatrixBuilder.build(None, customers, distribution_centers, client=resumed, checkpoint_file=checkpoint)
+    assert np.array_equal(matrix, expected(travel_times, addresses, locations))
+    downloaded = {(o, d) for request in interrupted.requests + resumed.requests for o in request[0] for d in request[1]}
+    assert len(downloaded) == sum(len(o) * len(d) for o, d in interrupted.requests + resumed.requests)  # no pair was downloaded twice
+    assert len(interrupted.requests) == 4
+
+
+def test_the_cache_is_used_by_repeated_and_incremental_builds(tmp_path, make_orders):
+    travel_times, addresses, distribution_centers, customers = make_orders(31)
+    first_customers = {c for c in customers if c.address != addresses[30]}
+    with DeliveryLogistics.TravelTimeCache(str(tmp_path / 'cache.sqlite')) as cache:
+        first = FakeClient(travel_times, addresses)
+        DeliveryLogistics.GoogleMapsTravelMatrixBuilder.build(None, first_customers, distribution_centers, client=first, cache=cache)
+        assert first.requests
+
+        repeated = FakeClient(travel_times, addresses)
+        locations, matrix = DeliveryLogistics.GoogleMapsTravelMatrixBuilder.build(None, first_customers, distribution_centers, client=repeated, cache=cache)
+        assert repeated.requests == []
+        assert np.array_equal(matrix, expected(travel_times, addresses, locations))
+
+        incremental = FakeClient(travel_times, addresses)
+        locations, matrix = DeliveryLogistics.GoogleMapsTravelMatrixBuilder.build(None, customers, distribution_centers, client=incremental, cache=cache)
+        assert np.array_equal(matrix, expected(travel_times, addresses, locations))
+        # the tiles are shrunk to the rows and columns of the new customer, so only a few pairs that were already cached are downloaded again
+        elements = sum(len(origins) * len(destinations) for origins, destinations in incremental.requests)
+        pairs = {(o, d) for request in incremental.requests for o in request[0] for d in request[1]}
+        assert all((address, addresses[30]) in pairs and (addresses[30], address) in pairs for address in addresses[:30])
+        assert elements < 31 * 31 // 4
@@ -0,0 +1,32 @@
+import DeliveryLogistics
+import itertools
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('layout', ['scattered', 'random'])
+@pytest.mark.parametrize('stops', range(9))
+def test_held_karp_matches_brute_force(make_planner, layout, stops):
+    planner = make_planner(20, seed=stops, layout=layout)
+    route = np.random.default_rng(stops).choice(np.arange(1, 20), stops, replace=False).tolist()
+    optimized = planner.held_karp_optimize(route, 0)
+    assert optimized[0] == optimized[-1] == 0 and sorted(optimized[1:-1]) == sorted(route)
+    assert planner.total_travel_time(optimized) == planner.total_travel_time(planner.brute_force_optimize(route, 0))
+    # the ordering is remembered for the same set of stops, in any order
+    assert planner.held_karp_optimize(route[::-1], 0) == optimized
+
+
+def test_held_karp_returns_first_when_every_time_window_is_met(make_planner):
+    planner = make_planner(10, layer_times=['00:00', '08:30'])
+    planner.set_departure_time('08:00', 11)
+    planner.location_store().set_time_windows([2, 5], DeliveryLogistics.seconds_of_day('08:40'), DeliveryLogistics.seconds_of_day('10:00'))
+    route = list(range(1, 8))
+    returns = {}
+    for order in itertools.permutations(route):
+        schedule = planner.route_schedules([[0, *order, 0]])
+        if schedule['Late Time'][0] == 0:
+            returns[order] = int(schedule['Returns'][0])
+    optimized = planner.held_karp_optimize(route, 0)
+    schedule = planner.route_schedules([optimized])
+    assert schedule['Late Time'][0] == 0
+    assert int(schedule['Returns'][0]) == min(returns.values())
@@ -0,0 +1,53 @@
+import DeliveryLogistics
+import io
+import pytest
+
+
+@pytest.fixture
+def instrumentation():
+    '''Enables the instrumentation for a test, and disables and resets it afterwards so that other tests are not affected.'''
+    DeliveryLogistics.Instrumentation.enable()
+    yield DeliveryLogistics.Instrumentation
+    DeliveryLogistics.Instrumentation.disable()
+    DeliveryLogistics.Instrumentation.reset()
+
+
+def test_nothing_is_recorded_while_disabled(make_planner):
+    DeliveryLogistics.Instrumentation.reset()
+    make_planner(20).single_payload_and_dist(0, 0, 100, 100)
+    assert DeliveryLogistics.Instrumentation.report() == {'Timings': {}, 'Counters': {}}
+
+
+def test_calls_and_counters_are_recorded(make_planner, instrumentation):
+    planner = make_planner(20)
+    planner.brute_force_optimize([1, 2, 3, 4, 5], 0)
+    planner.brute_force_optimize([1, 2, 3], 0)
+    order, _, _ = DeliveryLogistics.TreeBuilder.prim(planner, 0, planner.delivery_locations())
+    report = instrumentation.report()
+    assert report['Timings']['RoutePlanner.brute_force_optimize']['Calls'] == 2
+    assert report['Timings']['TreeBuilder.prim']['Calls'] == 1
+    assert report['Counters']['Permutations Evaluated'] == 120 + 6
+    assert report['Counters']['Nearest Neighbor Queries'] == len(order) - 1
+    timing = report['Timings']['RoutePlanner.brute_force_optimize']
+    assert timing['Average Seconds'] == pytest.approx(timing['Total Seconds'] / 2)
+
+
+def test_instrumented_plans_are_unchanged(make_planner, instrumentation):
+    planner = make_planner(30)
+    routes = planner.single_payload_and_dist(0, 0, 100, 100, 11)
+    instrumentation.disable()
+    assert planner.single_payload_and_dist(0, 0, 100, 100, 11) == routes
+    # the wall times are inclusive, so the plan took at least as long as the candidate routes that it built
+    timings = instrumentation.report()['Timings']
+    assert timings['RoutePlanner.single_payload_and_dist']['Calls'] == 1
+    assert timings['RoutePlanner.single_payload_and_dist']['Total Seconds'] >= timings['RoutePlanner.candidate_route']['Total Seconds']
+
+
+def test_the_report_is_printed_as_a_table(make_planner, instrumentation):
+    make_planner(10).savings_single_dist(0, 0, 100, 100)
+    table = io.StringIO()
+    instrumentation.print_report(table)
+    lines = table.getvalue().splitlines()
+    assert lines[0].split() == ['Function', 'Calls', 'Total', 'Seconds', 'Average', 'Seconds']
+    assert any(line.startswith('RoutePlanner.savings_single_dist') for line in lines)
+    assert 'Counter' in lines[len(instrumentation.report()['Timings']) + 1]
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+
+def reversals(route: list[int]):
+    '''Yields every route made by reversing one segment of the stops of route (a 2-opt move).'''
+    for i in range(1, len(route) - 2):
+        for j in range(i + 1, len(route) - 1):
+            yield route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+
+
+@pytest.mark.parametrize('layout', ['scattered', 'random'])
+@pytest.mark.parametrize('seed', range(3))
+def test_local_search_finds_a_2_opt_local_optimum(make_planner, layout, seed):
+    planner = make_planner(60, seed=seed, layout=layout)
+    route = np.random.default_rng(seed).permutation(np.arange(1, 60))[:40].tolist()
+    optimized = planner.local_search_optimize(route, 0, neighbors=60)
+    assert optimized[0] == optimized[-1] == 0 and sorted(optimized[1:-1]) == sorted(route)
+    travel_time = planner.total_travel_time(optimized)
+    assert travel_time <= planner.total_travel_time([0, *route, 0])
+    assert travel_time <= planner.total_travel_time(planner.triangle_optimize(route, 0))
+    assert all(planner.total_travel_time(other) >= travel_time for other in reversals(optimized))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_local_search_comes_close_to_the_optimum(make_planner, seed):
+    planner = make_planner(30, seed=seed)
+    route = np.random.default_rng(seed).permutation(np.arange(1, 30))[:11].tolist()
+    optimum = planner.total_travel_time(planner.held_karp_optimize(route, 0))
+    assert planner.total_travel_time(planner.local_search_optimize(route, 0)) <= 1.05 * optimum
+
+
+@pytest.mark.parametrize('stops', range(3))
+def test_short_routes_are_solved_exactly(make_planner, stops):
+    planner = make_planner(10)
+    route = list(range(1, stops + 1))
+    assert planner.local_search_optimize(route, 0) == planner.held_karp_optimize(route, 0)
+
+
+def test_the_time_budget_stops_the_search(make_planner):
+    planner = make_planner(200)
+    route = list(range(1, 200))
+    optimized = planner.local_search_optimize(route, 0, time_budget=0)
+    assert sorted(optimized[1:-1]) == route
+    assert planner.total_travel_time(optimized) <= planner.total_travel_time([0, *route, 0])
@@ -0,0 +1,71 @@
+import DeliveryLogistics
+import numpy as np
+import pickle
+import pytest
+from conftest import synthetic_locations
+
+
+def test_records_round_trip():
+    locations = synthetic_locations(50, distribution_centers=2) + [DeliveryLogistics.Location('Landmark', '1 Park Lane')]
+    store = DeliveryLogistics.LocationStore(locations)
+    assert len(store) == 51
+    assert [record.json() for record in store.records()] == [location.json() for location in locations]
+    assert [type(record) for record in store.records()] == [type(location) for location in locations]
+    assert store.id('7 Main Street') == store.id(locations[7]) == 7 and '7 Main Street' in store and '7 Main St' not in store
+    assert store[-1].address == '1 Park Lane'
+    assert store.count() == 51 and store.count(DeliveryLogistics.DistributionCenter) == 2 and store.count(DeliveryLogistics.DeliveryLocation) == 48
+    assert store.kinds()[[0, 2, 50]].tolist() == [store.DISTRIBUTION_CENTER, store.DELIVERY_LOCATION, store.LOCATION]
+    assert store.packages().tolist() == [getattr(location, 'packages', 0) for location in locations]
+    assert store.inventory()[:2].tolist() == [10000, 10000] and not store.inventory()[2:].any()
+
+
+def test_the_locations_are_records_without_a_dict():
+    location = DeliveryLogistics.DeliveryLocation('Customer', '1 Main Street', '3')
+    assert location.packages == 3 and not hasattr(location, '__dict__')
+    assert location.json() == {'name': 'Customer', 'address': '1 Main Street', 'packages': 3}
+    assert DeliveryLogistics.Location.build(location.json()).json() == location.json()
+
+
+def test_the_arrays_are_read_only_and_records_are_copies():
+    store = DeliveryLogistics.LocationStore(synthetic_locations(5))
+    with pytest.raises(ValueError):
+        store.packages()[1] = 0
+    store[1].packages = 999
+    assert store.packages()[1] != 999
+
+
+def test_packages_are_added_and_set():
+    store = DeliveryLogistics.LocationStore(synthetic_locations(5))
+    before = store.packages().copy()
+    store.add_packages([1, 1, 3], [2, 5, 1])
+    assert (store.packages() - before).tolist() == [0, 7, 0, 1, 0]
+    store.set_packages(2, 0)
+    assert store.packages()[2] == 0
+    with pytest.raises(ValueError):
+        store.add_packages(0, 1)
+    with pytest.raises(ValueError):
+        store.set_packages(1, -1)
+    with pytest.raises(IndexError):
+        store.add_packages(5, 1)
+
+
+def test_invalid_locations_are_rejected():
+    store = DeliveryLogistics.LocationStore(synthetic_locations(3))
+    with pytest.raises(ValueError):
+        store.add(DeliveryLogistics.DeliveryLocation('Again', '1 Main Street', 1))
+    with pytest.raises(TypeError):
+        store.add('1 Main Street')
+    assert store.add(DeliveryLogistics.DeliveryLocation('New', '3 Main Street', 1)) == 3
+
+
+def test_copies_and_pickles_are_independent():
+    store = DeliveryLogistics.LocationStore(synthetic_locations(20))
+    store.set_time_windows([4], 32400, 43200)
+    copy = store.copy()
+    copy.add_packages(1, 100)
+    copy.add(DeliveryLogistics.DeliveryLocation('', '99 Main Street', 1))
+    assert len(store) == 20 and store.packages()[1] + 100 == copy.packages()[1]
+    unpickled = pickle.loads(pickle.dumps(store))
+    assert [record.json() for record in unpickled.records()] == [record.json() for record in store.records()]
+    assert unpickled.has_time_windows() and np.array_equal(unpickled.time_windows()[0], store.time_windows()[0])
+    assert unpickled.id('19 Main Street') == 19
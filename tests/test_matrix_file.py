@@ -0,0 +1,68 @@
+import DeliveryLogistics
+import numpy as np
+import pytest
+
+
+def travel_times_by_address(planner: DeliveryLogistics.TravelMatrix) -> np.ndarray:
+    '''Returns the travel times of planner with the locations sorted by address, so that planners loaded in different orders can be compared.'''
+    order = np.argsort(planner.location_store().addresses())
+    return planner.array()[np.ix_(order, order)]
+
+
+def locations_by_address(planner: DeliveryLogistics.TravelMatrix) -> list[dict]:
+    '''Returns the json representation of every location of planner, sorted by address.'''
+    return sorted((location.json() for location in planner.locations()), key=lambda location: location['address'])
+
+
+def test_matrix_file_round_trip(tmp_path, make_planner):
+    planner = make_planner(30, distribution_centers=2)
+    DeliveryLogistics.write_matrix_file(planner, str(tmp_path / 'planner.dlm'))
+    loaded = DeliveryLogistics.read_matrix_file(str(tmp_path / 'planner.dlm'))
+    assert isinstance(loaded, DeliveryLogistics.RoutePlanner)
+    assert [location.json() for location in loaded.locations()] == [location.json() for location in planner.locations()]
+    assert np.array_equal(loaded.array(), planner.array())
+    assert loaded.distribution_centers() == planner.distribution_centers()
+    # the travel times are memory-mapped and read only
+    assert not loaded.array().flags.writeable
+    assert DeliveryLogistics.is_matrix_file(str(tmp_path / 'planner.dlm'))
+
+
+def test_layers_and_time_windows_round_trip(tmp_path, make_planner):
+    planner = make_planner(10, layer_times=['06:00', '09:00', '16:30'])
+    planner.location_store().set_time_windows([2, 5], [32400, 36000], [39600, DeliveryLogistics.LocationStore.ALWAYS_OPEN])
+    DeliveryLogistics.write_matrix_file(planner, str(tmp_path / 'layered.dlm'))
+    loaded = DeliveryLogistics.read_matrix_file(str(tmp_path / 'layered.dlm'))
+    assert loaded.layer_count() == 3 and loaded.layer_times().tolist() == planner.layer_times().tolist()
+    assert np.array_equal(loaded.layered_array(), planner.layered_array())
+    for loaded_windows, windows in zip(loaded.location_store().time_windows(), planner.location_store().time_windows()):
+        assert loaded_windows.tolist() == windows.tolist()
+
+
+def test_json_round_trip(tmp_path, make_planner):
+    planner = make_planner(20, distribution_centers=2)
+    DeliveryLogistics.write_trips_to_json(planner.trips(), str(tmp_path / 'trips.json'))
+    assert not DeliveryLogistics.is_matrix_file(str(tmp_path / 'trips.json'))
+    loaded = DeliveryLogistics.read_planner_file(str(tmp_path / 'trips.json'))
+    assert locations_by_address(loaded) == locations_by_address(planner)
+    assert np.array_equal(travel_times_by_address(loaded), travel_times_by_address(planner))
+
+
+def test_convert_json_to_matrix_file(tmp_path, make_planner):
+    planner = make_planner(20)
+    DeliveryLogistics.write_trips_to_json(planner.trips(), str(tmp_path / 'trips.json'))
+    DeliveryLogistics.convert_json_to_matrix_file(str(tmp_path / 'trips.json'), str(tmp_path / 'trips.dlm'))
+    loaded = DeliveryLogistics.read_planner_file(str(tmp_path / 'trips.dlm'))
+    assert locations_by_address(loaded) == locations_by_address(planner)
+    assert np.array_equal(travel_times_by_address(loaded), travel_times_by_address(planner))
+
+
+def test_other_files_are_rejected(tmp_path, make_planner):
+    (tmp_path / 'other.dlm').write_bytes(b'NOTAMATRIX' + bytes(32))
+    with pytest.raises(ValueError, match='not a travel matrix file'):
+        DeliveryLogistics.read_matrix_file(str(tmp_path / 'other.dlm'))
+    DeliveryLogistics.write_matrix_file(make_planner(5), str(tmp_path / 'future.dlm'))
+    data = bytearray((tmp_path / 'future.dlm').read_bytes())
+    data[8:12] = np.array([99], dtype='<u4').tobytes()
+    (tmp_path / 'future.dlm').write_bytes(bytes(data))
+    with pytest.raises(ValueError, match='unsupported version'):
+        DeliveryLogistics.read_matrix_file(str(tmp_path / 'future.dlm'))
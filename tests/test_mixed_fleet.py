@@ -0,0 +1,64 @@
+import DeliveryLogistics
+import pytest
+from collections import Counter
+
+
+def check_fleet(planner, routes: dict, fleet: list) -> None:
+    '''Checks that the routes use the vehicles of fleet within their capacities and counts, and deliver or leave undelivered every customer.'''
+    vehicles = {vehicle.name: vehicle for vehicle in fleet}
+    for route in routes['Routes']:
+        assert route['Packages'] <= vehicles[route['Vehicle']].capacity
+        assert route['Delivery Locations'][0].address == route['Delivery Locations'][-1].address == '0 Depot Road'
+    for name, count in Counter(route['Vehicle'] for route in routes['Routes']).items():
+        assert vehicles[name].count is None or count <= vehicles[name].count
+    delivered = [location.address for route in routes['Routes'] for location in route['Delivery Locations'][1:-1]]
+    undelivered = [location.address for location in routes['Undelivered Locations']]
+    assert sorted(delivered + undelivered) == sorted(planner.location(i).address for i in planner.delivery_locations())
+    assert len(delivered) == len(set(delivered))
+
+
+def test_an_unlimited_fleet_delivers_everything(make_planner):
+    planner = make_planner(60)
+    fleet = [DeliveryLogistics.Vehicle('Truck', 200), DeliveryLogistics.Vehicle('Van', 60)]
+    routes = planner.mixed_fleet_single_dist(0, fleet, 0, 200, 11)
+    check_fleet(planner, routes, fleet)
+    assert routes['Undelivered Locations'] == []
+    # the van runs every route that it can carry
+    assert all(route['Vehicle'] == 'Van' for route in routes['Routes'] if route['Packages'] <= 60)
+
+
+@pytest.mark.parametrize('trucks, vans', [(1, 2), (2, 0), (0, 3), (3, None)])
+def test_a_limited_fleet_runs_at_most_its_routes(make_planner, trucks, vans):
+    planner = make_planner(60)
+    fleet = [DeliveryLogistics.Vehicle('Truck', 200, trucks), DeliveryLogistics.Vehicle('Van', 60, vans)]
+    routes = planner.mixed_fleet_single_dist(0, fleet, 0, 200, 11)
+    check_fleet(planner, routes, fleet)
+    if vans is not None:
+        assert len(routes['Routes']) <= trucks + vans
+        assert len(routes['Undelivered Locations']) > 0
+
+
+def test_the_fleet_plan_does_not_depend_on_the_workers(make_planner):
+    planner = make_planner(40)
+    fleet = [DeliveryLogistics.Vehicle('Truck', 150, 2), DeliveryLogistics.Vehicle('Van', 50)]
+    assert planner.mixed_fleet_single_dist(0, fleet, 0, 150, 11, workers=2) == planner.mixed_fleet_single_dist(0, fleet, 0, 150, 11)
+
+
+def test_large_and_small_payload(make_planner):
+    planner = make_planner(40)
+    routes = planner.large_and_small_payload_single_dist(0, 150, 50, 11)
+    check_fleet(planner, routes, [DeliveryLogistics.Vehicle('Large', 150), DeliveryLogistics.Vehicle('Small', 50)])
+    assert routes['Undelivered Locations'] == []
+
+
+def test_invalid_fleets_are_rejected(make_planner):
+    planner = make_planner(10)
+    with pytest.raises(TypeError):
+        planner.mixed_fleet_single_dist(0, [], 0, 100)
+    with pytest.raises(TypeError):
+        planner.mixed_fleet_single_dist(0, [('Van', 50)], 0, 100)
+    with pytest.raises(ValueError):
+        DeliveryLogistics.Vehicle('Van', 0)
+    with pytest.raises(ValueError):
+        DeliveryLogistics.Vehicle('Van', 50, -1)
+    assert DeliveryLogistics.Vehicle('Van', '50', '3').capacity == 50
@@ -0,0 +1,51 @@
+import DeliveryLogistics
+import numpy as np
+import pytest
+
+
+def round_trips(planner, depots: list[int], customers: list[int]) -> np.ndarray:
+    '''Returns the round trip travel time from each of depots to each of customers.'''
+    return planner.travel_times(depots, customers) + planner.travel_times(customers, depots).T
+
+
+def test_every_location_goes_to_its_nearest_distribution_center_without_an_inventory_limit(make_planner):
+    planner = make_planner(50, distribution_centers=3, inventory=0)
+    customers = planner.delivery_locations()
+    assigned, unassigned = planner.assign_to_distribution_centers([0, 1, 2], customers)
+    assert unassigned == []
+    nearest = np.argmin(round_trips(planner, [0, 1, 2], customers), axis=0)
+    assert {depot: sorted(stops) for depot, stops in assigned.items()} == {depot: [c for c, n in zip(customers, nearest) if n == depot] for depot in (0, 1, 2)}
+
+
+@pytest.mark.parametrize('inventory', [150, 300, 500])
+def test_assignments_respect_the_inventory(make_planner, inventory):
+    planner = make_planner(50, distribution_centers=3, inventory=inventory)
+    customers = planner.delivery_locations()
+    assigned, unassigned = planner.assign_to_distribution_centers([0, 1, 2], customers)
+    assert sorted(unassigned + [c for stops in assigned.values() for c in stops]) == customers
+    left = {depot: inventory - planner.total_packages(stops) for depot, stops in assigned.items()}
+    assert all(value >= 0 for value in left.values())
+    # a location is only left unassigned if it does not fit in what is left of any inventory
+    assert all(planner.packages([c])[0] > max(left.values()) for c in unassigned)
+
+
+def test_only_distribution_centers_are_assigned_to(make_planner):
+    planner = make_planner(10, distribution_centers=2)
+    with pytest.raises(ValueError):
+        planner.assign_to_distribution_centers([0, 5], planner.delivery_locations())
+    assert planner.assign_to_distribution_centers([0, 1], []) == ({0: [], 1: []}, [])
+
+
+@pytest.mark.parametrize('strategy', ['tree', 'savings'])
+def test_multi_depot_plans_reach_every_customer_within_capacity(make_planner, delivered_addresses, strategy):
+    planner = make_planner(60, distribution_centers=3, inventory=600)
+    routes = planner.single_payload_multi_dist([0, 1, 2], 0, 200, 120, 11, strategy)
+    unassigned = sorted(location.address for location in routes['Unassigned Locations'])
+    assert sorted(delivered_addresses(routes) + unassigned) == sorted(planner.location(i).address for i in planner.delivery_locations())
+    for route in routes['Routes']:
+        stops = route['Delivery Locations']
+        assert stops[0].address == stops[-1].address == route['Distribution Center'].address
+        assert route['Packages'] == sum(stop.packages for stop in stops[1:-1]) <= 120
+    for depot in range(3):
+        assert sum(route['Packages'] for route in routes['Routes'] if route['Distribution Center'].address == f'{depot} Depot Road') <= 600
+    assert routes == planner.single_payload_multi_dist([0, 1, 2], 0, 200, 120, 11, strategy, workers=2)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import statistics
+
+
+def nearest_neighbor(planner, origin: int, destinations: list[int]) -> tuple[int, int] | None:
+    '''The nearest_neighbor() loop that the vectorized queries replaced.'''
+    min_travel_time, nearest = np.iinfo(np.int64).max, None
+    for destination in destinations:
+        if destination != origin and planner.travel_time(origin, destination) < min_travel_time:
+            min_travel_time, nearest = planner.travel_time(origin, destination), destination
+    return None if nearest is None else (nearest, min_travel_time)
+
+
+def farthest_outlier(planner, destinations: list[int]) -> int:
+    '''The farthest_outlier() loop that the vectorized query replaced.'''
+    outlier, max_average = -1, -1
+    for y in destinations:
+        average = statistics.mean(planner.travel_time(x, y) for x in destinations if x != y)
+        if average > max_average:
+            outlier, max_average = y, average
+    return outlier
+
+
+@pytest.mark.parametrize('layout', ['scattered', 'random'])
+@pytest.mark.parametrize('seed', range(3))
+def test_nearest_neighbors_match_the_loop(make_planner, layout, seed):
+    planner = make_planner(60, seed=seed, layout=layout)
+    rng = np.random.default_rng(seed)
+    destinations = sorted(rng.choice(60, 20, replace=False).tolist())
+    origins = list(range(60))
+    nearest, travel_times = planner.nearest_neighbors(origins, destinations)
+    for origin in origins:
+        expected = nearest_neighbor(planner, origin, destinations)
+        assert planner.nearest_neighbor(origin, destinations) == expected
+        assert (int(nearest[origin]), int(travel_times[origin])) == expected
+        # a boolean mask selects the same destinations as a list of indexes
+        mask = np.zeros(60, dtype=bool)
+        mask[destinations] = True
+        assert planner.nearest_neighbor(origin, mask) == expected
+
+
+def test_nearest_neighbors_without_other_destinations(make_planner):
+    planner = make_planner(10)
+    assert planner.nearest_neighbor(3, [3]) is None and planner.nearest_neighbor(3, []) is None
+    nearest, _ = planner.nearest_neighbors([3, 4], [3])
+    assert nearest.tolist() == [-1, 3]
+    nearest, travel_times = planner.nearest_neighbors([3, 4], [])
+    assert nearest.tolist() == [-1, -1] and travel_times.size == 2
+
+
+@pytest.mark.parametrize('layout', ['scattered', 'random'])
+@pytest.mark.parametrize('size', [2, 3, 17, 60])
+def test_farthest_outlier_matches_the_loop(make_planner, layout, size):
+    planner = make_planner(60, layout=layout)
+    destinations = np.random.default_rng(size).choice(60, size, replace=False).tolist()
+    assert planner.farthest_outlier(destinations) == farthest_outlier(planner, destinations)
+
+
+def test_farthest_outlier_of_fewer_than_two_locations(make_planner):
+    planner = make_planner(10)
+    assert planner.farthest_outlier([]) == -1
+    assert planner.farthest_outlier([7]) == 7
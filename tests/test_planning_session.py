@@ -0,0 +1,69 @@
+import DeliveryLogistics
+import threading
+import time
+import pytest
+
+
+@pytest.fixture
+def session(make_planner):
+    '''Returns a function that returns a new session for the distribution center and 29 delivery locations of the same planner.'''
+    planner = make_planner(30)
+    return lambda: DeliveryLogistics.PlanningSession(planner, 0, 60, 11, 'savings')
+
+
+def packages(planning: DeliveryLogistics.PlanningSession, address: str) -> int:
+    '''Returns the number of packages delivered to address in the current plan.'''
+    return sum(getattr(location, 'packages', 0) for route in planning.plan()['Routes'] for location in route['Delivery Locations'] if location.address == address)
+
+
+def test_update_commits_the_changes(session):
+    planning = session()
+    before, cancelled = planning.plan(), packages(planning, '7 Main Street')
+    after = planning.update([DeliveryLogistics.DeliveryLocation('', '3  main street', 5)], ['7 Main Street'])
+    assert after['Version'] == planning.plan()['Version'] == 1
+    assert after['Total Packages'] == before['Total Packages'] + 5 - cancelled
+    assert packages(planning, '7 Main Street') == 0
+    assert planning.plan()['Total Delivery Time'] == after['Total Delivery Time']
+
+
+def test_what_if_does_not_change_the_plan(session):
+    planning = session()
+    before = planning.plan()
+    what_if = planning.update(remove=['7 Main Street'], commit=False)
+    assert what_if['Total Packages'] == before['Total Packages'] - packages(planning, '7 Main Street')
+    assert planning.plan() == before
+
+
+def test_reads_are_not_blocked_by_a_commit(monkeypatch, session):
+    planning = session()
+    iter_routes = DeliveryLogistics.RoutePlanner.iter_routes
+    planning_slowly = threading.Event()
+
+    def slow_iter_routes(self, *args, **kwargs):
+        # only the commit is slowed down, so the what-if below takes as long as it would without it
+        if threading.current_thread().name == 'commit':
+            planning_slowly.set()
+            time.sleep(1.0)
+        yield from iter_routes(self, *args, **kwargs)
+
+    monkeypatch.setattr(DeliveryLogistics.RoutePlanner, 'iter_routes', slow_iter_routes)
+    commit = threading.Thread(target=planning.update, kwargs={'remove': ['7 Main Street']}, name='commit')
+    commit.start()
+    assert planning_slowly.wait(5)
+    start = time.perf_counter()
+    assert planning.plan()['Version'] == 0
+    assert planning.update(remove=['8 Main Street'], commit=False)['Version'] == 0
+    assert time.perf_counter() - start < 0.5
+    commit.join()
+    assert planning.plan()['Version'] == 1
+
+
+@pytest.mark.parametrize('count', [0, -5])
+def test_update_rejects_orders_without_packages(session, count):
+    planning = session()
+    before = planning.plan()
+    with pytest.raises(ValueError, match='at least one'):
+        planning.update([DeliveryLogistics.DeliveryLocation('', '3 Main Street', count)])
+    with pytest.raises(ValueError, match='at least one'):
+        planning.update([DeliveryLogistics.DeliveryLocation('', '3 Main Street', count)], commit=False)
+    assert planning.plan() == before
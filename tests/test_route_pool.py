@@ -0,0 +1,41 @@
+import DeliveryLogistics
+import pytest
+
+
+def test_candidate_routes_match_the_serial_routes(make_planner):
+    planner = make_planner(40)
+    customers = planner.delivery_locations()
+    with DeliveryLogistics.RoutePool(planner, 2) as pool:
+        assert pool.candidate_routes(customers, 0, customers, 120) == [planner.candidate_route(start, 0, customers, 120) for start in customers]
+
+
+@pytest.mark.parametrize('incremental', [False, True])
+def test_pool_plans_are_identical_to_serial_plans(make_planner, incremental):
+    planner = make_planner(40)
+    serial = planner.single_payload_and_dist(0, 0, 150, 150, 11, incremental=incremental)
+    parallel = planner.single_payload_and_dist(0, 0, 150, 150, 11, incremental=incremental, workers=2)
+    assert [[location.address for location in route['Delivery Locations']] for route in parallel['Routes']] == \
+        [[location.address for location in route['Delivery Locations']] for route in serial['Routes']]
+    assert parallel['Total Delivery Time'] == serial['Total Delivery Time']
+
+
+def test_pool_plans_of_time_of_day_layers_are_identical_to_serial_plans(make_planner):
+    planner = make_planner(30, layer_times=['00:00', '08:30'])
+    planner.set_departure_time('08:00', 11)
+    with DeliveryLogistics.RoutePool(planner, 2) as pool:
+        parallel = list(planner.iter_routes(0, planner.delivery_locations(), 150, 'tree', pool))
+    assert parallel == list(planner.iter_routes(0, planner.delivery_locations(), 150, 'tree'))
+
+
+def test_plans_of_several_distribution_centers(make_planner):
+    planner = make_planner(40, distribution_centers=2)
+    assigned, _ = planner.assign_to_distribution_centers([0, 1], planner.delivery_locations())
+    tasks = [(dc, assigned[dc], 150, strategy) for dc in (0, 1) for strategy in ('tree', 'savings')]
+    with DeliveryLogistics.RoutePool(planner, 2) as pool:
+        plans = pool.plans(tasks)
+    assert plans == [list(planner.iter_routes(*task)) for task in tasks]
+
+
+def test_a_pool_needs_a_worker(make_planner):
+    with pytest.raises(ValueError):
+        DeliveryLogistics.RoutePool(make_planner(5), 0)
@@ -0,0 +1,51 @@
+import DeliveryLogistics
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('layout', ['scattered', 'random'])
+@pytest.mark.parametrize('max_payload', [40, 120, 400])
+def test_savings_routes_reach_every_customer_within_capacity(make_planner, layout, max_payload):
+    planner = make_planner(80, layout=layout)
+    routes = list(planner.iter_savings_routes(0, planner.delivery_locations(), max_payload))
+    stops = [stop for route in routes for stop in route[1:-1]]
+    assert sorted(stops) == planner.delivery_locations()
+    assert all(route[0] == route[-1] == 0 and planner.total_packages(route) <= max_payload for route in routes)
+    # joining routes never costs more than driving to every customer and back
+    assert sum(planner.total_travel_time(route) for route in routes) <= sum(planner.total_travel_time([0, stop, 0]) for stop in stops)
+
+
+def test_optimizing_only_reorders_the_stops(make_planner):
+    planner = make_planner(60)
+    optimized = list(planner.iter_savings_routes(0, planner.delivery_locations(), 150))
+    joined = list(planner.iter_savings_routes(0, planner.delivery_locations(), 150, optimize=False))
+    assert [sorted(route) for route in optimized] == [sorted(route) for route in joined]
+    assert all(planner.total_travel_time(a) <= planner.total_travel_time(b) for a, b in zip(optimized, joined))
+
+
+def test_routes_are_joined_in_order_of_savings():
+    # two customers far from the distribution center and close to each other share a route, and the third does not fit on it
+    matrix = np.array([[0, 1000, 1000, 500],
+                       [1000, 0, 100, 1200],
+                       [1000, 100, 0, 1200],
+                       [500, 1200, 1200, 0]])
+    locations = [DeliveryLogistics.DistributionCenter('Depot', '0 Depot Road'), DeliveryLogistics.DeliveryLocation('', '1 Main Street', 10),
+                 DeliveryLogistics.DeliveryLocation('', '2 Main Street', 10), DeliveryLogistics.DeliveryLocation('', '3 Main Street', 10)]
+    planner = DeliveryLogistics.RoutePlanner.from_array(locations, matrix)
+    assert sorted(map(sorted, planner.iter_savings_routes(0, [1, 2, 3], 20))) == [[0, 0, 1, 2], [0, 0, 3]]
+    assert sorted(map(sorted, planner.iter_savings_routes(0, [1, 2, 3], 10))) == [[0, 0, 1], [0, 0, 2], [0, 0, 3]]
+
+
+def test_savings_single_dist(make_planner, delivered_addresses):
+    planner = make_planner(60)
+    routes = planner.savings_single_dist(0, 0, 200, 150, 11)
+    assert delivered_addresses(routes) == sorted(planner.location(i).address for i in planner.delivery_locations())
+    assert all(route['Packages'] <= 150 for route in routes['Routes'])
+    assert routes['Total Delivery Time'] == routes['Total Travel Time'] + routes['Total Unload Time']
+
+
+def test_savings_routes_start_at_a_distribution_center(make_planner):
+    planner = make_planner(10)
+    with pytest.raises(ValueError):
+        list(planner.iter_savings_routes(1, planner.delivery_locations()))
+    assert list(planner.iter_savings_routes(0, [])) == []
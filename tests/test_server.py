@@ -0,0 +1,45 @@
+import DeliveryLogistics
+import json
+import pytest
+import server
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+
+@pytest.fixture
+def url(make_planner):
+    '''Serves a session called "test" (with the distribution center and 29 delivery locations of a planner) and returns its url.'''
+    server.sessions['test'] = DeliveryLogistics.PlanningSession(make_planner(30), 0, 60, 11, 'savings')
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), server.PlanningRequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}/sessions/test'
+    httpd.shutdown()
+    httpd.server_close()
+    server.sessions.clear()
+
+
+def post(url: str, body: dict) -> tuple[int, dict]:
+    '''Posts body as json to url, and returns the status and the json body of the response.'''
+    request = urllib.request.Request(url, json.dumps(body).encode('utf-8'), {'Content-Type': 'application/json'}, method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as err:
+        return err.code, json.loads(err.read())
+
+
+@pytest.mark.parametrize('packages', [0, -3, 2.5, '3', True, None])
+def test_orders_must_be_for_at_least_one_whole_package(url, packages):
+    status, body = post(url + '/orders', {'add': [{'address': '3 Main Street', 'packages': packages}]})
+    assert status == 400 and 'packages' in body['Error']
+    assert server.sessions['test'].version == 0
+
+
+def test_orders_are_committed(url):
+    status, body = post(url + '/orders', {'add': [{'address': '3 Main Street', 'packages': 2}], 'remove': ['7 Main Street']})
+    assert status == 200 and body['Version'] == server.sessions['test'].version == 1
+    status, body = post(url + '/what-if', {'remove': ['9 Main Street']})
+    assert status == 200 and body['Version'] == server.sessions['test'].version == 1
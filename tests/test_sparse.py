@@ -0,0 +1,95 @@
+import DeliveryLogistics
+import numpy as np
+import pytest
+from conftest import synthetic_locations
+
+
+@pytest.fixture
+def sparse_world():
+    '''
+    Returns 60 locations (two distribution centers) scattered around a city, their coordinates, and their true travel times, which are the
+    straight line distance at 10 m/s plus 30 seconds to park.
+    '''
+    rng = np.random.default_rng(0)
+    coordinates = np.array([40.0, -75.0]) + rng.uniform(-0.1, 0.1, size=(60, 2))
+    travel_times = np.rint(DeliveryLogistics.haversine_distances(coordinates[:, None, :], coordinates[None, :, :]) * 0.1 + 30).astype(np.int64)
+    np.fill_diagonal(travel_times, 0)
+    return synthetic_locations(60, distribution_centers=2), coordinates, travel_times
+
+
+def k_nearest_pairs(coordinates: np.ndarray, travel_times: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''Returns the pairs stored by a k-nearest neighbor matrix: every customer to its k nearest customers, and every pair with a distribution center.'''
+    customers = list(range(2, len(coordinates)))
+    neighbors = DeliveryLogistics.GoogleMapsSparseMatrixBuilder.nearest_by_distance(coordinates, customers, customers, k)
+    pairs = {(c, int(neighbor)) for c, row in zip(customers, neighbors) for neighbor in row}
+    pairs |= {(x, y) for x in range(len(coordinates)) for y in range(2) if x != y} | {(y, x) for x in range(len(coordinates)) for y in range(2) if x != y}
+    origins, destinations = np.array(sorted(pairs)).T
+    return origins, destinations, travel_times[origins, destinations]
+
+
+def test_stored_pairs_are_exact_and_the_rest_are_estimated(sparse_world):
+    _, coordinates, travel_times = sparse_world
+    origins, destinations, stored = k_nearest_pairs(coordinates, travel_times, 5)
+    sparse = DeliveryLogistics.SparseTravelTimes(coordinates, origins, destinations, stored)
+    assert sparse.shape == (60, 60) and sparse.nnz == len(stored)
+    assert sparse.seconds_per_meter == pytest.approx(0.1, rel=0.01) and sparse.offset == pytest.approx(30, abs=2)
+    dense = sparse[np.ix_(np.arange(60), np.arange(60))]
+    assert np.array_equal(dense[origins, destinations], stored)
+    assert np.all(np.diag(dense) == 0)
+    assert np.abs(dense - travel_times).max() <= 2
+    assert sparse.is_stored(origins, destinations).all() and sparse.is_stored(0, 1) and not sparse.is_stored(2, 2)
+    assert sparse[3, 4] == dense[3, 4]
+
+
+def test_the_first_of_repeated_pairs_is_kept():
+    sparse = DeliveryLogistics.SparseTravelTimes(np.zeros((3, 2)), [0, 1, 0], [1, 2, 1], [60, 70, 80], seconds_per_meter=0.1, offset=5)
+    assert sparse.nnz == 2 and sparse[0, 1] == 60 and sparse[1, 2] == 70
+    assert sparse[2, 0] == 5 and sparse[1, 1] == 0
+    with pytest.raises(IndexError):
+        sparse[0, 3]
+    with pytest.raises(ValueError):
+        DeliveryLogistics.SparseTravelTimes(np.zeros((3, 2)), [0], [3], [60])
+
+
+def test_nearest_by_distance(sparse_world):
+    _, coordinates, _ = sparse_world
+    distances = DeliveryLogistics.haversine_distances(coordinates[:, None, :], coordinates[None, :, :])
+    neighbors = DeliveryLogistics.GoogleMapsSparseMatrixBuilder.nearest_by_distance(coordinates, range(60), range(60), 4, chunk_size=7)
+    np.fill_diagonal(distances, np.inf)
+    assert np.array_equal(neighbors, np.argsort(distances, axis=1, kind='stable')[:, :4])
+
+
+@pytest.mark.parametrize('strategy', ['tree', 'savings'])
+def test_sparse_plans_reach_every_customer_within_capacity(sparse_world, delivered_addresses, strategy):
+    locations, coordinates, travel_times = sparse_world
+    sparse = DeliveryLogistics.SparseTravelTimes(coordinates, *k_nearest_pairs(coordinates, travel_times, 8))
+    planner = DeliveryLogistics.RoutePlanner.from_array(locations, sparse)
+    assert planner.is_sparse()
+    routes = planner.single_payload_multi_dist([0, 1], 0, 200, 150, 11, strategy)
+    assert delivered_addresses(routes) == sorted(location.address for location in locations[2:])
+    assert all(route['Packages'] <= 150 for route in routes['Routes'])
+    # the plan is nearly as good as one made with every travel time known
+    dense = DeliveryLogistics.RoutePlanner.from_array(locations, travel_times).single_payload_multi_dist([0, 1], 0, 200, 150, 11, strategy)
+    assert routes['Total Travel Time'] <= 1.1 * dense['Total Travel Time']
+    assert routes == planner.single_payload_multi_dist([0, 1], 0, 200, 150, 11, strategy, workers=2)
+
+
+def test_the_builder_only_downloads_the_nearest_pairs(sparse_world):
+    locations, coordinates, travel_times = sparse_world
+    index = {location.address: i for i, location in enumerate(locations)}
+
+    class Client:
+        def distance_matrix(self, origins, destinations, mode=None, departure_time=None) -> dict:
+            return {'status': 'OK', 'rows': [{'elements': [{'status': 'OK', 'duration': {'value': int(travel_times[index[o], index[d]])}}
+                                                           for d in destinations]} for o in origins]}
+
+    built, sparse = DeliveryLogistics.GoogleMapsSparseMatrixBuilder.build(None, set(locations[2:]), set(locations[:2]), k=5, client=Client(),
+                                                                          coordinates={location.address: tuple(coordinates[index[location.address]]) for location in locations})
+    order = np.array([index[location.address] for location in built])
+    stored_origins, stored_destinations, stored = sparse.pairs()
+    assert np.array_equal(stored, travel_times[order[stored_origins], order[stored_destinations]])
+    # every pair with a distribution center and every customer's nearest neighbors are stored, and the tiles add only a few more
+    position = np.argsort(order)
+    origins, destinations, _ = k_nearest_pairs(coordinates, travel_times, 5)
+    assert sparse.is_stored(position[origins], position[destinations]).all()
+    assert sparse.nnz < 60 * 59 // 4
@@ -0,0 +1,14 @@
+import pytest
+
+import DeliveryLogistics
+
+
+@pytest.mark.parametrize('time_of_day, seconds', [('00:00', 0), ('07:30', 27000), ('23:59', 86340), ('23:59:59', 86399), (' 9:05 ', 32700)])
+def test_seconds_of_day(time_of_day, seconds):
+    assert DeliveryLogistics.seconds_of_day(time_of_day) == seconds
+
+
+@pytest.mark.parametrize('time_of_day', ['24:00', '25:00', '99:00', '12:60', '12:00:60', '12', '12:00:00:00', 'noon', '-1:00'])
+def test_seconds_of_day_rejects_times_outside_the_day(time_of_day):
+    with pytest.raises(ValueError, match='is not a time of day'):
+        DeliveryLogistics.seconds_of_day(time_of_day)
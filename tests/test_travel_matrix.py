@@ -0,0 +1,51 @@
+import DeliveryLogistics
+import numpy as np
+import pytest
+from conftest import synthetic_locations, synthetic_travel_times
+
+
+def test_from_array_matches_the_trip_set(make_planner):
+    planner = make_planner(25, distribution_centers=2)
+    from_trips = DeliveryLogistics.TravelMatrix(planner.trips())
+    order = [from_trips.location_store().id(address) for address in planner.location_store().addresses()]
+    assert np.array_equal(from_trips.array()[np.ix_(order, order)], planner.array())
+    assert from_trips.trips() == planner.trips()
+    assert sorted(from_trips.location(i).address for i in from_trips.delivery_locations()) == sorted(planner.location(i).address for i in planner.delivery_locations())
+
+
+def test_from_array_uses_the_array_as_is():
+    locations, matrix = synthetic_locations(10), synthetic_travel_times(10)
+    planner = DeliveryLogistics.RoutePlanner.from_array(locations, matrix)
+    assert isinstance(planner, DeliveryLogistics.RoutePlanner)
+    assert np.shares_memory(planner.array(), matrix)
+    assert planner.travel_time(3, 7) == matrix[3, 7]
+    assert planner.total_travel_time([0, 3, 7, 0]) == matrix[0, 3] + matrix[3, 7] + matrix[7, 0]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 65536])
+def test_from_triples_matches_from_array(chunk_size):
+    locations, matrix = synthetic_locations(12), synthetic_travel_times(12)
+    triples = ((x, y, int(matrix[x, y])) for x in range(12) for y in range(12) if x != y)
+    from_triples = DeliveryLogistics.TravelMatrix.from_triples(locations, triples, chunk_size)
+    assert np.array_equal(from_triples.array(), matrix)
+
+
+def test_from_triples_leaves_missing_pairs_at_zero():
+    matrix = DeliveryLogistics.TravelMatrix.from_triples(synthetic_locations(3), [(0, 1, 60), (2, 0, 90)])
+    assert matrix.array().tolist() == [[0, 60, 0], [0, 0, 0], [90, 0, 0]]
+    with pytest.raises(ValueError):
+        DeliveryLogistics.TravelMatrix.from_triples(synthetic_locations(3), [(0, 3, 60)])
+    with pytest.raises(ValueError):
+        DeliveryLogistics.TravelMatrix.from_triples(synthetic_locations(3), [], chunk_size=0)
+
+
+def test_from_array_rejects_bad_arrays():
+    locations = synthetic_locations(4)
+    with pytest.raises(ValueError, match='square'):
+        DeliveryLogistics.TravelMatrix.from_array(locations, np.zeros((4, 5), dtype=int))
+    with pytest.raises(TypeError, match='integers'):
+        DeliveryLogistics.TravelMatrix.from_array(locations, np.zeros((4, 4)))
+    with pytest.raises(TypeError):
+        DeliveryLogistics.TravelMatrix.from_array(tuple(locations), np.zeros((4, 4), dtype=int))
+    with pytest.raises(ValueError, match='layer_times'):
+        DeliveryLogistics.TravelMatrix.from_array(locations, np.zeros((2, 4, 4), dtype=int), ['08:00'])
@@ -0,0 +1,58 @@
+import DeliveryLogistics
+import numpy as np
+import pytest
+import sys
+
+
+def minimum_spanning_tree(planner, root_location: int, undelivered_locations, max_payload: int = sys.maxsize) -> tuple[list[int], list[int]]:
+    '''
+    The minimum_spanning_tree() that prim() replaced, which searches the whole tree for the nearest remaining location on every step.
+    Returns the locations in the order they were added to the tree and the parent of each of them.
+    '''
+    order, parents = [root_location], [-1]
+    remaining = [i for i in undelivered_locations if i != root_location]
+    num_packages = int(planner.packages([root_location])[0])
+    while remaining:
+        nearest = (None, None, sys.maxsize)
+        for node in order:
+            destination, travel_time = planner.nearest_neighbor(node, remaining)
+            if travel_time < nearest[2]:
+                nearest = (node, destination, travel_time)
+        num_packages += int(planner.packages([nearest[1]])[0])
+        if num_packages > max_payload:
+            break
+        order.append(nearest[1])
+        parents.append(nearest[0])
+        remaining.remove(nearest[1])
+    return order, parents
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('max_payload', [60, 250, sys.maxsize])
+def test_prim_matches_the_minimum_spanning_tree_search(make_planner, seed, max_payload):
+    planner = make_planner(50, seed=seed)
+    undelivered = planner.delivery_locations()
+    order, parents, overflow = DeliveryLogistics.TreeBuilder.prim(planner, 0, undelivered, max_payload)
+    expected_order, expected_parents = minimum_spanning_tree(planner, 0, undelivered, max_payload)
+    assert order == expected_order and parents == expected_parents
+    assert planner.total_packages(order) <= max_payload
+    if overflow is None:
+        assert sorted(order[1:]) == sorted(undelivered)
+    else:
+        assert overflow not in order and planner.total_packages(order + [overflow]) > max_payload
+
+
+def test_the_tree_links_every_location_to_its_parent(make_planner):
+    planner = make_planner(30)
+    order, parents, _ = DeliveryLogistics.TreeBuilder.prim(planner, 0, planner.delivery_locations())
+    root = DeliveryLogistics.TreeBuilder.minimum_spanning_tree(planner, 0, set(planner.delivery_locations()))
+    assert root.value == 0
+    linked = {child.value: node.value for node in root.preorder_traversal() for child in node.children}
+    assert linked == dict(zip(order[1:], parents[1:]))
+    assert sorted(node.value for node in root.preorder_traversal()) == sorted(order)
+
+
+def test_prim_of_a_single_location(make_planner):
+    planner = make_planner(5)
+    assert DeliveryLogistics.TreeBuilder.prim(planner, 0, [0]) == ([0], [-1], None)
+    assert DeliveryLogistics.TreeBuilder.prim(planner, 0, np.array([], dtype=np.intp)) == ([0], [-1], None)